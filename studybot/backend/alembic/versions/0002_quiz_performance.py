@@ -0,0 +1,64 @@
+"""Question pool, grading method, per-topic stats and response indexes
+
+Existing answers are not copied into user_topic_stats here; run
+scripts/rebuild_stats.py after upgrading a database that already has data.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-06-01 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns) -- built CONCURRENTLY on Postgres so writes are not blocked
+INDEXES = [
+    ("ix_questions_pool", "questions", ["topic_id", "difficulty_level", "served_at"]),
+    ("ix_user_responses_user_question", "user_responses", ["user_id", "question_id", "created_at"]),
+    ("ix_user_responses_question", "user_responses", ["question_id"]),
+]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_topic_stats",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("topic_id", sa.Integer(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("correct", sa.Integer(), nullable=False),
+        sa.Column("total_response_time", sa.Integer(), nullable=False),
+        sa.Column("streak", sa.Integer(), nullable=False),
+        sa.Column("last_seen", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["topic_id"], ["topics.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id", "topic_id")
+    )
+    with op.batch_alter_table("questions") as batch_op:
+        batch_op.add_column(sa.Column("served_at", sa.DateTime(), nullable=True))
+    with op.batch_alter_table("user_responses") as batch_op:
+        batch_op.add_column(sa.Column("grading_method", sa.String(), nullable=True))
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+    with op.batch_alter_table("user_responses") as batch_op:
+        batch_op.drop_column("grading_method")
+    with op.batch_alter_table("questions") as batch_op:
+        batch_op.drop_column("served_at")
+    op.drop_table("user_topic_stats")
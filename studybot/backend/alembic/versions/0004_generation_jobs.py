@@ -0,0 +1,50 @@
+"""Durable queue for question generation jobs
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2024-06-15 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "generation_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("topic_id", sa.Integer(), nullable=True),
+        sa.Column("difficulty_level", sa.Integer(), nullable=True),
+        sa.Column("count", sa.Integer(), nullable=True),
+        sa.Column("question_ids", sa.JSON(), nullable=True),
+        sa.Column("dedup_key", sa.String(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.Column("run_after", sa.DateTime(), nullable=True),
+        sa.Column("locked_until", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["topic_id"], ["topics.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("dedup_key")
+    )
+    op.create_index("ix_generation_jobs_id", "generation_jobs", ["id"])
+    op.create_index("ix_generation_jobs_claim", "generation_jobs", ["status", "run_after"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_generation_jobs_claim", table_name="generation_jobs")
+    op.drop_index("ix_generation_jobs_id", table_name="generation_jobs")
+    op.drop_table("generation_jobs")
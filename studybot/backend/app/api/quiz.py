@@ -1,136 +1,376 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime
+import asyncio
+import json
 import random
 
-from ..core.database import get_db
+from ..core.config import settings
+from ..core.database import get_async_db
+from ..core.http_cache import conditional_response
+from ..core.pagination import paginate
 from ..models import quiz as models
 from ..schemas import quiz as schemas
-from ..services.llm_service import generate_question, validate_answer
+from ..services.circuit_breaker import circuit_open
+from ..services.llm_backend import LLMBackend, get_llm_backend
+from ..services.llm_service import stream_questions
+from ..services.grading import grade_answer
+from ..services.generation_jobs import (
+    DONE,
+    FAILED,
+    QUEUED,
+    GenerationJobWorker,
+    claim_jobs,
+    enqueue_job,
+    find_job,
+    get_generation_job_worker,
+    job_questions,
+    run_job,
+    wait_for_job
+)
+from ..services.question_pool import (
+    QuestionPoolWorker,
+    build_question,
+    get_question_pool_worker,
+    reuse_questions,
+    take_questions
+)
+from ..services.quiz_stats import aggregate_results, record_answer, stats_to_result
+from ..services.topic_catalog import topic_catalog
 from ..core.auth import get_current_user
 
 router = APIRouter()
 
-@router.post("/session", response_model=List[schemas.Question])
+def _job_accepted(job: models.GenerationJob) -> JSONResponse:
+    """202 response pointing the client at a job that is still running."""
+    return JSONResponse(
+        status_code=202,
+        content=schemas.QuizSessionJob.model_validate(job).model_dump(mode="json"),
+        headers={"Location": f"/api/quiz/session/jobs/{job.id}"}
+    )
+
+@router.post(
+    "/session",
+    response_model=List[schemas.Question],
+    responses={202: {"model": schemas.QuizSessionJob, "description": "Questions still generating; poll the job"}}
+)
 async def start_quiz_session(
     session: schemas.QuizSession,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    wait: bool = True,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user),
+    llm: LLMBackend = Depends(get_llm_backend),
+    pool_worker: Optional[QuestionPoolWorker] = Depends(get_question_pool_worker),
+    job_worker: Optional[GenerationJobWorker] = Depends(get_generation_job_worker)
 ):
-    """Start a new quiz session with dynamically generated questions."""
+    """
+    Start a new quiz session, serving pooled questions before generating new ones.
+
+    Questions the pool cannot cover are generated by a queued job. The
+    request waits for it for up to GENERATION_JOB_WAIT_TIMEOUT seconds (not
+    at all with wait=false, unless no in-process worker would run the job)
+    and otherwise returns 202 with the job to poll at /session/jobs/{id}. Resending the same Idempotency-Key returns the same
+    session instead of generating another. While the LLM's circuit breaker
+    is open, previously served questions are reused instead of generating,
+    and the session may be shorter than requested.
+    """
     # Get topic
-    topic = db.query(models.Topic).filter(models.Topic.id == session.topic_id).first()
+    topic = await db.get(models.Topic, session.topic_id)
     if not topic:
         raise HTTPException(status_code=404, detail="Topic not found")
     
-    # Generate questions using LLM
-    questions = []
-    for _ in range(session.number_of_questions):
-        question_data = await generate_question(
-            topic=topic.name,
-            difficulty_level=session.difficulty_level or topic.difficulty_level
-        )
+    difficulty_level = session.difficulty_level or topic.difficulty_level
+    dedup_key = f"session:{current_user.id}:{idempotency_key}" if idempotency_key else None
+    job = await find_job(db, dedup_key) if dedup_key else None
+    
+    if job is None:
+        # Serve from the pre-generated pool first
+        questions = await take_questions(db, topic.id, difficulty_level, session.number_of_questions)
+        missing = session.number_of_questions - len(questions)
+        if missing > 0 and circuit_open(llm):
+            # Degraded mode: generation would only fail, so reuse stored questions
+            questions += await reuse_questions(
+                db, topic.id, difficulty_level, missing, [question.id for question in questions]
+            )
+            if not questions:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Question generation is temporarily unavailable",
+                    headers={"Retry-After": str(round(settings.LLM_BREAKER_RESET_TIMEOUT))}
+                )
+            missing = 0
+        if missing <= 0 and dedup_key is None:
+            await db.commit()
+            if pool_worker is not None:
+                pool_worker.notify(topic.id, difficulty_level)
+            return questions
         
-        # Create question in database
-        question = models.Question(
-            topic_id=topic.id,
-            question_text=question_data["question"],
-            options=question_data["options"],
-            correct_answer=question_data["correct_answer"],
-            explanation=question_data["explanation"],
-            difficulty_level=question_data["difficulty_level"]
+        # Queue whatever the pool could not cover for generation using LLM
+        job, created = await enqueue_job(
+            db,
+            current_user.id,
+            topic.id,
+            difficulty_level,
+            missing,
+            [question.id for question in questions],
+            dedup_key
         )
-        db.add(question)
-        questions.append(question)
+        if pool_worker is not None:
+            pool_worker.notify(topic.id, difficulty_level)
+        
+        if created and job.status == QUEUED:
+            # Without an in-process worker nobody else would run the job, even with wait=false
+            run_inline = settings.GENERATION_JOB_EXECUTION == "inline" and (wait or job_worker is None)
+            if run_inline and await claim_jobs(db, 1, job_id=job.id):
+                try:
+                    # Without an in-process worker nothing would pick a requeued job up again
+                    job = await run_job(llm, db, job.id, retry=job_worker is not None)
+                except Exception as e:
+                    job = await db.get(models.GenerationJob, job.id, populate_existing=True)
+                    if job.status != QUEUED:
+                        raise HTTPException(status_code=502, detail=str(e))
+                    # The worker retries it; hand out the job so its questions can be collected
+                    return _job_accepted(job)
+            elif job_worker is not None:
+                job_worker.notify()
     
-    db.commit()
-    return questions
+    if wait:
+        job = await wait_for_job(db, job.id, settings.GENERATION_JOB_WAIT_TIMEOUT)
+    if job.status == DONE:
+        return await job_questions(db, job)
+    if job.status == FAILED:
+        raise HTTPException(status_code=502, detail=job.last_error)
+    return _job_accepted(job)
+
+@router.get("/session/jobs/{job_id}", response_model=schemas.QuizSessionJob)
+async def get_quiz_session_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Poll a quiz session's generation job; its questions are included once it is done."""
+    job = await db.get(models.GenerationJob, job_id)
+    if not job or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    result = schemas.QuizSessionJob.model_validate(job)
+    if job.status == DONE:
+        result.questions = [schemas.Question.model_validate(question) for question in await job_questions(db, job)]
+    return result
+
+@router.post("/session/stream")
+async def stream_quiz_session(
+    session: schemas.QuizSession,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user),
+    llm: LLMBackend = Depends(get_llm_backend),
+    pool_worker: Optional[QuestionPoolWorker] = Depends(get_question_pool_worker)
+):
+    """
+    Start a quiz session, streaming each question as NDJSON once it is stored.
+
+    Every line is a JSON object: {"type": "question", "question": {...}} for
+    each question, then {"type": "done", "count": n}, or {"type": "error",
+    "detail": ...} if no question could be produced. While the LLM's circuit
+    breaker is open, previously served questions are reused instead.
+    """
+    topic = await db.get(models.Topic, session.topic_id)
+    if not topic:
+        raise HTTPException(status_code=404, detail="Topic not found")
+    
+    difficulty_level = session.difficulty_level or topic.difficulty_level
+    
+    def event(payload: dict) -> str:
+        return json.dumps(payload) + "\n"
+    
+    def question_event(question: models.Question) -> str:
+        return event({"type": "question", "question": schemas.Question.model_validate(question).model_dump(mode="json")})
+    
+    async def events():
+        # Pooled questions are already stored, so they go out immediately
+        pooled = await take_questions(db, topic.id, difficulty_level, session.number_of_questions)
+        await db.commit()
+        for question in pooled:
+            yield question_event(question)
+        
+        count = len(pooled)
+        missing = session.number_of_questions - count
+        if missing > 0 and circuit_open(llm):
+            reused = await reuse_questions(db, topic.id, difficulty_level, missing, [question.id for question in pooled])
+            await db.commit()
+            for question in reused:
+                yield question_event(question)
+            count += len(reused)
+        elif missing > 0:
+            generated = stream_questions(llm, topic.name, difficulty_level, missing)
+            try:
+                async for question_data in generated:
+                    question = build_question(topic.id, question_data, datetime.utcnow())
+                    db.add(question)
+                    await db.commit()
+                    count += 1
+                    yield question_event(question)
+            finally:
+                await generated.aclose()
+        
+        if pool_worker is not None:
+            pool_worker.notify(topic.id, difficulty_level)
+        if count:
+            yield event({"type": "done", "count": count})
+        else:
+            yield event({"type": "error", "detail": "Error generating questions: all generation attempts failed"})
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
 
 @router.post("/answer", response_model=schemas.UserResponse)
 async def submit_answer(
     response: schemas.UserResponseCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user),
+    llm: LLMBackend = Depends(get_llm_backend)
 ):
     """Submit an answer to a question and get immediate feedback."""
     # Get question
-    question = db.query(models.Question).filter(models.Question.id == response.question_id).first()
+    question = await db.get(models.Question, response.question_id)
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
+    # Release the connection in case grading waits on the LLM
+    await db.commit()
     
-    # Validate answer using LLM
-    is_correct = await validate_answer(
-        question=question.question_text,
-        correct_answer=question.correct_answer,
-        user_answer=response.selected_answer
-    )
+    # Grade locally when possible, falling back to the LLM
+    grade = await grade_answer(llm, question, response.selected_answer)
     
     # Create user response
     user_response = models.UserResponse(
         user_id=current_user.id,
         question_id=question.id,
         selected_answer=response.selected_answer,
-        is_correct=is_correct,
+        is_correct=grade.is_correct,
+        grading_method=grade.method,
         response_time=response.response_time
     )
     
     db.add(user_response)
-    db.commit()
-    db.refresh(user_response)
+    await record_answer(db, current_user.id, question.topic_id, grade.is_correct, response.response_time)
+    await db.commit()
+    await db.refresh(user_response)
     
     return user_response
 
+@router.post("/answers:batch", response_model=List[schemas.UserResponse])
+async def submit_answers_batch(
+    batch: schemas.UserResponseBatchCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user),
+    llm: LLMBackend = Depends(get_llm_backend)
+):
+    """Submit a whole session's answers in one request."""
+    # Load every referenced question in one query
+    question_ids = {answer.question_id for answer in batch.answers}
+    questions = {
+        question.id: question
+        for question in (await db.execute(
+            select(models.Question).where(models.Question.id.in_(question_ids))
+        )).scalars()
+    }
+    missing = sorted(question_ids - questions.keys())
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Questions not found: {missing}")
+    # Release the connection in case grading waits on the LLM
+    await db.commit()
+    
+    # Grade together; only answers that need the LLM actually wait on it
+    grades = await asyncio.gather(*(
+        grade_answer(llm, questions[answer.question_id], answer.selected_answer)
+        for answer in batch.answers
+    ))
+    
+    # Insert all responses in a single transaction
+    user_responses = [
+        models.UserResponse(
+            user_id=current_user.id,
+            question_id=answer.question_id,
+            selected_answer=answer.selected_answer,
+            is_correct=grade.is_correct,
+            grading_method=grade.method,
+            response_time=answer.response_time
+        )
+        for answer, grade in zip(batch.answers, grades)
+    ]
+    db.add_all(user_responses)
+    for answer, grade in zip(batch.answers, grades):
+        await record_answer(
+            db,
+            current_user.id,
+            questions[answer.question_id].topic_id,
+            grade.is_correct,
+            answer.response_time
+        )
+    await db.commit()
+    
+    return user_responses
+
 @router.get("/results/{topic_id}", response_model=schemas.QuizResult)
 async def get_quiz_results(
     topic_id: int,
-    db: Session = Depends(get_db),
+    by_difficulty: bool = False,
+    by_day: bool = False,
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    """Get quiz results for a specific topic."""
-    # Get all responses for the topic
-    responses = db.query(models.UserResponse).join(
-        models.Question
-    ).filter(
-        models.Question.topic_id == topic_id,
-        models.UserResponse.user_id == current_user.id
-    ).all()
-    
-    if not responses:
+    """Get quiz results for a specific topic, optionally broken down by difficulty and day."""
+    if by_difficulty or by_day:
+        # Breakdowns are not materialised, so aggregate the raw responses
+        result = await aggregate_results(
+            db,
+            user_id=current_user.id,
+            topic_id=topic_id,
+            by_difficulty=by_difficulty,
+            by_day=by_day
+        )
+    else:
+        stats = await db.get(models.UserTopicStats, (current_user.id, topic_id))
+        result = stats_to_result(stats) if stats is not None and stats.attempts else None
+    
+    if result is None:
         raise HTTPException(status_code=404, detail="No quiz results found for this topic")
     
-    # Calculate statistics
-    total_questions = len(responses)
-    correct_answers = sum(1 for r in responses if r.is_correct)
-    avg_response_time = sum(r.response_time for r in responses) / total_questions
-    
-    return schemas.QuizResult(
-        total_questions=total_questions,
-        correct_answers=correct_answers,
-        average_response_time=avg_response_time,
-        topic_id=topic_id,
-        completed_at=datetime.utcnow()
-    )
+    return result
 
 @router.get("/topics", response_model=List[schemas.Topic])
 async def get_topics(
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all available quiz topics."""
-    return db.query(models.Topic).all()
+    catalog = await topic_catalog.snapshot(db)
+    not_modified = conditional_response(request, response, catalog.etag, settings.TOPIC_CACHE_MAX_AGE)
+    if not_modified:
+        return not_modified
+    return catalog.topics
 
-@router.get("/questions/{topic_id}", response_model=List[schemas.Question])
+@router.get("/questions/{topic_id}", response_model=schemas.Page[schemas.Question])
 async def get_questions_by_topic(
     topic_id: int,
-    limit: Optional[int] = 10,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get questions for a specific topic."""
-    questions = db.query(models.Question).filter(
-        models.Question.topic_id == topic_id
-    ).limit(limit).all()
+    """Get questions for a specific topic, oldest first, one page at a time."""
+    questions, next_cursor = await paginate(
+        db,
+        select(models.Question).where(models.Question.topic_id == topic_id),
+        models.Question,
+        cursor,
+        limit
+    )
     
-    if not questions:
+    if not questions and cursor is None:
         raise HTTPException(status_code=404, detail="No questions found for this topic")
     
-    return questions 
\ No newline at end of file
+    return {"items": questions, "next_cursor": next_cursor} 
\ No newline at end of file
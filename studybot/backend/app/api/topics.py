@@ -1,44 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime
 
-from ..core.database import get_db
-from ..models.quiz import Topic
-from ..schemas.quiz import TopicCreate, Topic as TopicSchema
+from ..core.config import settings
+from ..core.database import get_async_db
+from ..core.http_cache import conditional_response, make_etag
+from ..models.quiz import Topic, User
+from ..schemas.quiz import Page, TopicCreate, Topic as TopicSchema
+from ..services.topic_catalog import topic_catalog
 from ..core.auth import get_current_active_user
 
 router = APIRouter()
 
-@router.get("/", response_model=List[TopicSchema])
+async def get_topic_by_name(db: AsyncSession, name: str) -> Optional[Topic]:
+    """Look up a topic by its unique name."""
+    result = await db.execute(select(Topic).where(Topic.name == name))
+    return result.scalars().first()
+
+@router.get("/", response_model=Page[TopicSchema])
 async def get_topics(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
-) -> List[Topic]:
-    """Get all available topics."""
-    return db.query(Topic).offset(skip).limit(limit).all()
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get available topics, oldest first, one page at a time."""
+    catalog = await topic_catalog.snapshot(db)
+    topics, next_cursor = catalog.page(cursor, limit)
+    etag = make_etag([(topic.id, topic.updated_at) for topic in topics], next_cursor)
+    not_modified = conditional_response(request, response, etag, settings.TOPIC_CACHE_MAX_AGE)
+    if not_modified:
+        return not_modified
+    return {"items": topics, "next_cursor": next_cursor}
 
 @router.get("/{topic_id}", response_model=TopicSchema)
 async def get_topic(
     topic_id: int,
-    db: Session = Depends(get_db)
-) -> Topic:
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
     """Get a specific topic by ID."""
-    topic = db.query(Topic).filter(Topic.id == topic_id).first()
+    catalog = await topic_catalog.snapshot(db)
+    # Fall back to the table for topics another process created since the load
+    topic = catalog.by_id.get(topic_id) or await db.get(Topic, topic_id)
     if not topic:
         raise HTTPException(status_code=404, detail="Topic not found")
+    
+    etag = make_etag(topic.id, topic.updated_at)
+    not_modified = conditional_response(request, response, etag, settings.TOPIC_CACHE_MAX_AGE)
+    if not_modified:
+        return not_modified
     return topic
 
 @router.post("/", response_model=TopicSchema)
 async def create_topic(
     topic: TopicCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ) -> Topic:
     """Create a new topic."""
     # Check if topic already exists
-    db_topic = db.query(Topic).filter(Topic.name == topic.name).first()
+    db_topic = await get_topic_by_name(db, topic.name)
     if db_topic:
         raise HTTPException(
             status_code=400,
@@ -52,26 +78,27 @@ async def create_topic(
         difficulty_level=topic.difficulty_level
     )
     db.add(db_topic)
-    db.commit()
-    db.refresh(db_topic)
+    await db.commit()
+    await db.refresh(db_topic)
+    topic_catalog.invalidate()
     return db_topic
 
 @router.put("/{topic_id}", response_model=TopicSchema)
 async def update_topic(
     topic_id: int,
     topic_update: TopicCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ) -> Topic:
     """Update a topic."""
     # Get existing topic
-    db_topic = db.query(Topic).filter(Topic.id == topic_id).first()
+    db_topic = await db.get(Topic, topic_id)
     if not db_topic:
         raise HTTPException(status_code=404, detail="Topic not found")
     
     # Check if new name is already taken
     if topic_update.name != db_topic.name:
-        existing_topic = db.query(Topic).filter(Topic.name == topic_update.name).first()
+        existing_topic = await get_topic_by_name(db, topic_update.name)
         if existing_topic:
             raise HTTPException(
                 status_code=400,
@@ -84,24 +111,26 @@ async def update_topic(
     db_topic.difficulty_level = topic_update.difficulty_level
     db_topic.updated_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(db_topic)
+    await db.commit()
+    await db.refresh(db_topic)
+    topic_catalog.invalidate()
     return db_topic
 
 @router.delete("/{topic_id}")
 async def delete_topic(
     topic_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ) -> dict:
     """Delete a topic."""
     # Get existing topic
-    db_topic = db.query(Topic).filter(Topic.id == topic_id).first()
+    db_topic = await db.get(Topic, topic_id)
     if not db_topic:
         raise HTTPException(status_code=404, detail="Topic not found")
     
     # Delete topic
-    db.delete(db_topic)
-    db.commit()
+    await db.delete(db_topic)
+    await db.commit()
+    topic_catalog.invalidate()
     
-    return {"message": "Topic deleted successfully"} 
\ No newline at end of file
+    return {"message": "Topic deleted successfully"}
\ No newline at end of file
@@ -1,15 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from typing import Any
 
-from ..core.database import get_db
+from ..core.database import get_async_db
 from ..core.auth import (
     authenticate_user,
     create_access_token,
     get_current_active_user,
-    get_password_hash
+    get_password_hash_async,
+    get_user_by_email,
+    invalidate_cached_user
 )
 from ..models.quiz import User
 from ..schemas.quiz import UserCreate, User as UserSchema
@@ -18,10 +20,10 @@ from ..core.config import settings
 router = APIRouter()
 
 @router.post("/register", response_model=UserSchema)
-def register_user(user: UserCreate, db: Session = Depends(get_db)) -> Any:
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)) -> Any:
     """Register a new user."""
     # Check if user already exists
-    db_user = db.query(User).filter(User.email == user.email).first()
+    db_user = await get_user_by_email(db, user.email)
     if db_user:
         raise HTTPException(
             status_code=400,
@@ -29,24 +31,24 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)) -> Any:
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     db_user = User(
         email=user.email,
         hashed_password=hashed_password,
         full_name=user.full_name
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 @router.post("/token")
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Any:
     """Login user and return access token."""
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -74,24 +76,32 @@ async def read_users_me(
 async def update_user(
     user_update: UserCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Any:
     """Update current user information."""
+    # current_user may be a cached copy, so change the stored row
+    db_user = await db.get(User, current_user.id)
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    previous_email = db_user.email
+    
     # Check if email is already taken by another user
-    if user_update.email != current_user.email:
-        db_user = db.query(User).filter(User.email == user_update.email).first()
-        if db_user:
+    if user_update.email != db_user.email:
+        existing_user = await get_user_by_email(db, user_update.email)
+        if existing_user:
             raise HTTPException(
                 status_code=400,
                 detail="Email already registered"
             )
     
     # Update user information
-    current_user.email = user_update.email
-    current_user.full_name = user_update.full_name
+    db_user.email = user_update.email
+    db_user.full_name = user_update.full_name
     if user_update.password:
-        current_user.hashed_password = get_password_hash(user_update.password)
+        db_user.hashed_password = await get_password_hash_async(user_update.password)
     
-    db.commit()
-    db.refresh(current_user)
-    return current_user 
\ No newline at end of file
+    await db.commit()
+    await db.refresh(db_user)
+    invalidate_cached_user(previous_email)
+    invalidate_cached_user(db_user.email)
+    return db_user 
\ No newline at end of file
@@ -1,21 +1,28 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..core.config import settings
-from ..core.database import get_db
+from ..core.database import get_async_db
 from ..models.quiz import User
+from ..services.llm_cache import LRUCache
+from .password_pool import PasswordHashPool, PasswordPoolFullError
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hash_pool = PasswordHashPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE)
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Recently authenticated users keyed by token subject, so most requests skip the users query
+_user_cache = LRUCache(settings.AUTH_USER_CACHE_MAX_ENTRIES, settings.AUTH_USER_CACHE_TTL)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
     return pwd_context.verify(plain_password, hashed_password)
@@ -24,6 +31,27 @@ def get_password_hash(password: str) -> str:
     """Generate password hash."""
     return pwd_context.hash(password)
 
+def _password_pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent password checks, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the bcrypt thread pool; 503 if its queue is full."""
+    try:
+        return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+    except PasswordPoolFullError:
+        raise _password_pool_busy()
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the bcrypt thread pool; 503 if its queue is full."""
+    try:
+        return await password_hash_pool.run(get_password_hash, password)
+    except PasswordPoolFullError:
+        raise _password_pool_busy()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token."""
     to_encode = data.copy()
@@ -37,7 +65,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """Get current user from JWT token."""
     credentials_exception = HTTPException(
@@ -53,9 +81,12 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
+    user = get_cached_user(email)
     if user is None:
-        raise credentials_exception
+        user = await get_user_by_email(db, email)
+        if user is None:
+            raise credentials_exception
+        cache_user(email, user)
     return user
 
 async def get_current_active_user(
@@ -66,11 +97,41 @@ async def get_current_active_user(
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+def _snapshot(user: User) -> Dict:
+    return {column.key: getattr(user, column.key) for column in User.__table__.columns}
+
+def get_cached_user(subject: str) -> Optional[User]:
+    """
+    Return a detached copy of a recently authenticated user.
+
+    The copy is not attached to any session; load the row before changing it.
+    """
+    if settings.AUTH_USER_CACHE_TTL <= 0:
+        return None
+    snapshot = _user_cache.get(subject)
+    return User(**snapshot) if snapshot is not None else None
+
+def cache_user(subject: str, user: User) -> None:
+    if settings.AUTH_USER_CACHE_TTL > 0:
+        _user_cache.set(subject, _snapshot(user))
+
+def invalidate_cached_user(subject: str) -> None:
+    """Drop a cached user, e.g. after their details change."""
+    _user_cache.delete(subject)
+
+def clear_user_cache() -> None:
+    _user_cache.clear()
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    """Look up a user by email."""
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
     """Authenticate a user by email and password."""
-    user = db.query(User).filter(User.email == email).first()
+    user = await get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return None
     return user 
\ No newline at end of file
@@ -0,0 +1,37 @@
+import hashlib
+import json
+from typing import Optional
+
+from fastapi import Request, Response
+
+def make_etag(*parts) -> str:
+    """
+    Weak ETag over the given values, e.g. row ids and updated_at timestamps.
+
+    Weak because it identifies the data, not the exact bytes sent (which
+    can differ with compression).
+    """
+    payload = json.dumps(parts, default=str, separators=(",", ":"))
+    return f'W/"{hashlib.sha256(payload.encode()).hexdigest()[:32]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+def conditional_response(request: Request, response: Response, etag: str, max_age: int) -> Optional[Response]:
+    """
+    Attach ETag and Cache-Control headers for a cacheable GET.
+
+    Returns a 304 response to send instead of the body when the client's
+    If-None-Match already names this version, otherwise None.
+    """
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}, must-revalidate"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
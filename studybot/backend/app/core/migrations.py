@@ -0,0 +1,59 @@
+import os
+from typing import Optional
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "alembic.ini")
+
+class SchemaVersionError(RuntimeError):
+    """Raised when the database is not migrated to the code's head revision."""
+
+def alembic_config(url: Optional[str] = None) -> Config:
+    """
+    Alembic config for this backend, optionally pointed at another database.
+    """
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "alembic"))
+    if url:
+        config.set_main_option("sqlalchemy.url", url)
+    return config
+
+def head_revision() -> Optional[str]:
+    """
+    Latest revision in alembic/versions; read from disk, no database access.
+    """
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+async def current_revision(bind: AsyncEngine) -> Optional[str]:
+    """
+    Revision recorded in the database's alembic_version table.
+    """
+    async with bind.connect() as connection:
+        return await connection.run_sync(
+            lambda sync_connection: MigrationContext.configure(sync_connection).get_current_revision()
+        )
+
+async def check_schema_version(bind: AsyncEngine) -> None:
+    """
+    Fail fast if the database schema does not match the code.
+
+    One SELECT against alembic_version; unlike create_all() it does not
+    inspect the catalog and never changes the schema.
+    """
+    current = await current_revision(bind)
+    head = head_revision()
+    if current != head:
+        raise SchemaVersionError(
+            f"Database schema is at revision {current or 'none'}, expected {head}; "
+            f"run `alembic upgrade head` from the backend directory"
+        )
+
+def upgrade_database(url: Optional[str] = None) -> None:
+    """
+    Apply all pending migrations, e.g. for scripts that set up a scratch database.
+    """
+    command.upgrade(alembic_config(url), "head")
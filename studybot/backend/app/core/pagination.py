@@ -0,0 +1,46 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque continuation token for the row a page ended on."""
+    payload = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def paginate(
+    db: AsyncSession,
+    statement: Select,
+    model,
+    cursor: Optional[str],
+    limit: int
+) -> Tuple[List, Optional[str]]:
+    """
+    Fetch one page of `statement` in (created_at, id) order.
+
+    Seeks past the cursor's row instead of using OFFSET, so with an index
+    ending in (created_at, id) every page costs the same however deep it is.
+    Returns the rows and the cursor for the next page (None on the last one).
+    """
+    if cursor is not None:
+        created_at, row_id = decode_cursor(cursor)
+        statement = statement.where(tuple_(model.created_at, model.id) > tuple_(created_at, row_id))
+    statement = statement.order_by(model.created_at, model.id).limit(limit + 1)
+
+    rows = list((await db.execute(statement)).scalars().all())
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(last.created_at, last.id)
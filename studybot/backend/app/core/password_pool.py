@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+class PasswordPoolFullError(Exception):
+    """Raised instead of queueing when `max_queue` calls are already waiting."""
+
+class PasswordHashPool:
+    """
+    Bounded thread pool for bcrypt work.
+
+    bcrypt takes a few hundred milliseconds per call and releases the GIL,
+    so running it here keeps the event loop free and lets several hashes run
+    on separate cores. At most `max_queue` calls may wait for a thread;
+    beyond that calls raise PasswordPoolFullError instead of piling up. The
+    threads are started on first use and stopped by `shutdown`.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    async def run(self, function: Callable[..., T], *args) -> T:
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise PasswordPoolFullError("Too many concurrent password checks")
+            self.queued += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+            executor = self._executor
+        submitted = time.perf_counter()
+        dequeued = False
+
+        def leave_queue() -> None:
+            # Called with the lock held, by whichever of the job and the caller gets there first
+            nonlocal dequeued
+            if not dequeued:
+                dequeued = True
+                self.queued -= 1
+
+        def job() -> T:
+            wait = time.perf_counter() - submitted
+            with self._lock:
+                leave_queue()
+                self.running += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+            try:
+                return function(*args)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, job)
+        finally:
+            # A caller cancelled before a thread picked the job up must not stay counted
+            with self._lock:
+                leave_queue()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            started = self.completed + self.running
+            return {
+                "workers": self.max_workers,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "average_wait_ms": round(self.total_wait / started * 1000, 3) if started else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
@@ -0,0 +1,72 @@
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+class PoolMetrics:
+    """Checkout counters for one connection pool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, wait: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def stats(self, pool: Pool) -> Dict:
+        with self._lock:
+            average = self.total_wait / self.checkouts if self.checkouts else 0.0
+            return {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                # QueuePool counts overflow from -pool_size until the pool is full
+                "overflow": max(0, pool.overflow()),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "average_wait_ms": round(average * 1000, 3),
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+class _InstrumentedPool:
+    """
+    Mixin timing every checkout, i.e. how long a request waited for a
+    connection, including opening a new one when the pool overflows.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - start)
+        return connection
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    pass
+
+def pool_stats(pool: Pool) -> Dict:
+    """Metrics for an engine's pool; only the size counters for uninstrumented pools."""
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        return metrics.stats(pool)
+    return {"status": pool.status()}
@@ -1,24 +1,65 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from contextlib import asynccontextmanager
 import os
 from dotenv import load_dotenv
 
 from .core.config import settings
 from .api import quiz, topics, users
-from .core.database import engine, Base, get_db
+from .core.database import async_engine, AsyncSessionLocal
+from .core.migrations import check_schema_version
+from .core.pool_metrics import pool_stats
+from .core.auth import password_hash_pool
+from .services.question_pool import QuestionPoolWorker
+from .services.circuit_breaker import circuit_open
+from .services.generation_jobs import GenerationJobWorker
+from .services.llm_cache import get_llm_cache
+from .services.llm_backend import create_llm_backend
+from .services.llm_service import llm_flights
+from .services.model_routing import llm_metrics
+from .services.topic_catalog import topic_catalog
 
 # Load environment variables
 load_dotenv()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema changes are applied with `alembic upgrade head`, not at startup
+    if settings.DB_SCHEMA_CHECK:
+        await check_schema_version(async_engine)
+    
+    # One LLM backend per process, shared by routes and the pool worker
+    app.state.llm_backend = create_llm_backend()
+    worker = None
+    if settings.QUESTION_POOL_WORKER_ENABLED:
+        worker = QuestionPoolWorker(AsyncSessionLocal, app.state.llm_backend)
+        worker.start()
+    app.state.question_pool_worker = worker
+    
+    # Picks up retries and jobs abandoned by other processes; worker.py runs the same loop standalone
+    job_worker = None
+    if settings.GENERATION_JOB_WORKER_ENABLED:
+        job_worker = GenerationJobWorker(AsyncSessionLocal, app.state.llm_backend, settings.GENERATION_JOB_WORKERS)
+        job_worker.start()
+    app.state.generation_job_worker = job_worker
+    
+    yield
+    
+    if job_worker is not None:
+        await job_worker.stop()
+    if worker is not None:
+        await worker.stop()
+    await app.state.llm_backend.aclose()
+    password_hash_pool.shutdown()
+    await async_engine.dispose()
 
 app = FastAPI(
     title="LLM Learning Bot API",
     description="API for the LLM Learning Bot application",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -44,9 +85,21 @@ async def root():
     }
 
 @app.get("/health")
-async def health_check():
+async def health_check(request: Request):
+    cache = get_llm_cache()
+    llm = request.app.state.llm_backend
+    rate_limiter = getattr(llm, "rate_limiter", None)
+    breaker = getattr(llm, "breaker", None)
     return {
         "status": "healthy",
         "database": "connected",
-        "llm_service": "available"
+        "database_pool": pool_stats(async_engine.pool),
+        "llm_service": "degraded" if circuit_open(llm) else "available",
+        "llm_circuit_breaker": breaker.stats() if breaker is not None else None,
+        "password_hashing": password_hash_pool.stats(),
+        "llm_cache": cache.stats() if cache is not None else None,
+        "llm_coalescing": llm_flights.stats(),
+        "llm_rate_limit": rate_limiter.stats() if rate_limiter is not None else None,
+        "llm_models": llm_metrics.stats(),
+        "topic_catalog": topic_catalog.stats()
     } 
\ No newline at end of file
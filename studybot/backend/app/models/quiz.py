@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, JSON
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, JSON, Index, PrimaryKeyConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..core.database import Base
@@ -14,6 +14,10 @@ class Topic(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     questions = relationship("Question", back_populates="topic")
+    
+    __table_args__ = (
+        Index("ix_topics_created", "created_at", "id"),  # keyset pagination
+    )
 
 class Question(Base):
     __tablename__ = "questions"
@@ -25,11 +29,18 @@ class Question(Base):
     correct_answer = Column(String)
     explanation = Column(String)
     difficulty_level = Column(Integer)
+    served_at = Column(DateTime, nullable=True)  # NULL while the question is in the pool
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     topic = relationship("Topic", back_populates="questions")
     user_responses = relationship("UserResponse", back_populates="question")
+    
+    __table_args__ = (
+        # Also serves plain topic_id and (topic_id, difficulty_level) lookups
+        Index("ix_questions_pool", "topic_id", "difficulty_level", "served_at"),
+        Index("ix_questions_topic_created", "topic_id", "created_at", "id"),  # keyset pagination
+    )
 
 class UserResponse(Base):
     __tablename__ = "user_responses"
@@ -39,11 +50,56 @@ class UserResponse(Base):
     question_id = Column(Integer, ForeignKey("questions.id"))
     selected_answer = Column(String)
     is_correct = Column(Boolean)
+    grading_method = Column(String)  # "local", "llm" or "degraded"
     response_time = Column(Integer)  # Time taken to answer in seconds
     created_at = Column(DateTime, default=datetime.utcnow)
     
     question = relationship("Question", back_populates="user_responses")
     user = relationship("User", back_populates="responses")
+    
+    __table_args__ = (
+        Index("ix_user_responses_user_question", "user_id", "question_id", "created_at"),
+        Index("ix_user_responses_question", "question_id"),
+    )
+
+class UserTopicStats(Base):
+    """Running totals of a user's answers for one topic, kept in step with user_responses."""
+    __tablename__ = "user_topic_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    topic_id = Column(Integer, ForeignKey("topics.id"), nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    total_response_time = Column(Integer, nullable=False, default=0)  # Seconds
+    streak = Column(Integer, nullable=False, default=0)  # Correct answers since the last wrong one
+    last_seen = Column(DateTime)
+    
+    __table_args__ = (
+        PrimaryKeyConstraint("user_id", "topic_id"),
+    )
+
+class GenerationJob(Base):
+    """A queued request to generate questions for a quiz session."""
+    __tablename__ = "generation_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    topic_id = Column(Integer, ForeignKey("topics.id"))
+    difficulty_level = Column(Integer)
+    count = Column(Integer)  # Questions still to generate
+    question_ids = Column(JSON)  # The session's questions: pooled ones at enqueue time, then generated ones
+    dedup_key = Column(String, unique=True, nullable=True)  # Resubmitting the same key returns this job
+    status = Column(String, nullable=False, default="queued")  # queued, running, done or failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String)
+    run_after = Column(DateTime, default=datetime.utcnow)  # Not claimed before this (retry backoff)
+    locked_until = Column(DateTime)  # A running job whose lease lapsed is claimed again
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_generation_jobs_claim", "status", "run_after"),
+    )
 
 class User(Base):
     __tablename__ = "users"
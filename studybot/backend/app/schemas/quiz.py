@@ -1,7 +1,14 @@
-from pydantic import BaseModel, EmailStr
-from typing import List, Optional, Dict
+from pydantic import BaseModel, EmailStr, Field
+from typing import Generic, List, Optional, Dict, TypeVar
 from datetime import datetime
 
+T = TypeVar("T")
+
+# Pagination
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None  # pass as ?cursor= to fetch the next page
+
 # Topic schemas
 class TopicBase(BaseModel):
     name: str
@@ -47,11 +54,15 @@ class UserResponseBase(BaseModel):
 class UserResponseCreate(UserResponseBase):
     question_id: int
 
+class UserResponseBatchCreate(BaseModel):
+    answers: List[UserResponseCreate] = Field(..., min_length=1)
+
 class UserResponse(UserResponseBase):
     id: int
     user_id: int
     question_id: int
     is_correct: bool
+    grading_method: Optional[str] = None
     created_at: datetime
 
     class Config:
@@ -80,12 +91,32 @@ class QuizSession(BaseModel):
     difficulty_level: Optional[int] = None
     number_of_questions: int = 10
 
+class QuizSessionJob(BaseModel):
+    id: int
+    status: str  # queued, running, done or failed
+    attempts: int
+    last_error: Optional[str] = None
+    questions: Optional[List[Question]] = None  # Set once the job is done
+
+    class Config:
+        from_attributes = True
+
+class QuizResultBreakdown(BaseModel):
+    key: str  # difficulty level or ISO date
+    total_questions: int
+    correct_answers: int
+    average_response_time: float
+
 class QuizResult(BaseModel):
     total_questions: int
     correct_answers: int
     average_response_time: float
     topic_id: int
     completed_at: datetime
+    streak: Optional[int] = None
+    last_seen: Optional[datetime] = None
+    by_difficulty: Optional[List[QuizResultBreakdown]] = None
+    by_day: Optional[List[QuizResultBreakdown]] = None
 
     class Config:
         from_attributes = True 
\ No newline at end of file
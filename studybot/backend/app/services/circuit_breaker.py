@@ -0,0 +1,202 @@
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional
+
+from ..core.config import settings
+
+# CircuitBreaker.state values
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the LLM while the circuit breaker is open."""
+
+def counts_as_failure(error: Exception) -> bool:
+    """
+    Whether an error says the backend is unhealthy. Rejected requests (4xx
+    other than 429) are the caller's fault and do not count.
+    """
+    status_code = getattr(error, "status_code", None)
+    return status_code is None or status_code == 429 or status_code >= 500
+
+class CircuitBreaker:
+    """
+    Tracks recent LLM call outcomes and stops calls while the backend is failing.
+
+    Once at least `min_calls` of the last `window` calls are recorded and
+    `failure_ratio` of them failed or took longer than `slow_call` seconds,
+    the breaker opens and calls are rejected. After `reset_timeout` seconds
+    one trial call is let through (half open): success closes the breaker,
+    failure opens it again.
+    """
+
+    def __init__(
+        self,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_ratio: float = 0.5,
+        slow_call: float = 20.0,
+        reset_timeout: float = 30.0
+    ):
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.slow_call = slow_call
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._outcomes: Deque[bool] = deque(maxlen=window)  # True for a failed or slow call
+        self._probing = False
+
+    @classmethod
+    def from_settings(cls) -> "CircuitBreaker":
+        return cls(
+            window=settings.LLM_BREAKER_WINDOW,
+            min_calls=settings.LLM_BREAKER_MIN_CALLS,
+            failure_ratio=settings.LLM_BREAKER_FAILURE_RATIO,
+            slow_call=settings.LLM_BREAKER_SLOW_CALL,
+            reset_timeout=settings.LLM_BREAKER_RESET_TIMEOUT
+        )
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls are being rejected without a trial call."""
+        if self.state == OPEN:
+            return time.monotonic() - self.opened_at < self.reset_timeout
+        return self.state == HALF_OPEN and self._probing
+
+    def before_call(self) -> bool:
+        """
+        Admit a call or raise CircuitOpenError. Returns True if the call is
+        the half-open trial, whose outcome decides the breaker's state.
+        """
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+        if self.state == CLOSED:
+            return False
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.rejected += 1
+        raise CircuitOpenError("LLM backend unavailable (circuit breaker open)")
+
+    def record(self, duration: float, failed: bool, trial: bool) -> None:
+        bad = failed or duration >= self.slow_call
+        if trial:
+            self._probing = False
+            self._open() if bad else self._close()
+        elif self.state == CLOSED:
+            self._outcomes.append(bad)
+            if len(self._outcomes) >= self.min_calls and self._ratio() >= self.failure_ratio:
+                self._open()
+
+    def release(self, trial: bool) -> None:
+        """Forget a call that ended without an outcome, e.g. was cancelled."""
+        if trial:
+            self._probing = False
+
+    def _ratio(self) -> float:
+        return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._outcomes.clear()
+
+    def _close(self) -> None:
+        self.state = CLOSED
+        self._outcomes.clear()
+
+    def stats(self) -> Dict:
+        retry_in = self.reset_timeout - (time.monotonic() - self.opened_at) if self.state == OPEN else 0.0
+        return {
+            "state": self.state,
+            "calls_in_window": len(self._outcomes),
+            "failure_ratio": round(self._ratio(), 3),
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "retry_in_ms": round(max(0.0, retry_in) * 1000)
+        }
+
+class CircuitBreakerBackend:
+    """
+    LLMBackend wrapper that records every call with a CircuitBreaker and
+    fails fast with CircuitOpenError while it is open. Other attributes are
+    those of the wrapped backend.
+    """
+
+    def __init__(self, backend, breaker: CircuitBreaker):
+        self.backend = backend
+        self.breaker = breaker
+
+    def __getattr__(self, name: str):
+        return getattr(self.backend, name)
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: Optional[float] = None,
+        task: str = "chat",
+        json_mode: bool = False
+    ) -> str:
+        trial = self.breaker.before_call()
+        started = time.monotonic()
+        try:
+            content = await self.backend.chat(
+                messages, model, temperature, max_tokens, timeout=timeout, task=task, json_mode=json_mode
+            )
+        except Exception as e:
+            self.breaker.record(time.monotonic() - started, counts_as_failure(e), trial)
+            raise
+        except BaseException:
+            self.breaker.release(trial)
+            raise
+        self.breaker.record(time.monotonic() - started, False, trial)
+        return content
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: Optional[float] = None,
+        task: str = "chat",
+        json_mode: bool = False
+    ) -> AsyncIterator[str]:
+        trial = self.breaker.before_call()
+        started = time.monotonic()
+        stream = self.backend.stream(
+            messages, model, temperature, max_tokens, timeout=timeout, task=task, json_mode=json_mode
+        )
+        try:
+            async for chunk in stream:
+                yield chunk
+        except GeneratorExit:
+            # The caller stopped reading; the backend was working
+            self.breaker.record(time.monotonic() - started, False, trial)
+            raise
+        except Exception as e:
+            self.breaker.record(time.monotonic() - started, counts_as_failure(e), trial)
+            raise
+        except BaseException:
+            self.breaker.release(trial)
+            raise
+        else:
+            self.breaker.record(time.monotonic() - started, False, trial)
+        finally:
+            await stream.aclose()
+
+    async def aclose(self) -> None:
+        await self.backend.aclose()
+
+def circuit_open(client) -> bool:
+    """Whether calls to `client` are currently being rejected by its breaker."""
+    breaker = getattr(client, "breaker", None)
+    return isinstance(breaker, CircuitBreaker) and breaker.is_open
@@ -0,0 +1,293 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+from fastapi import Request
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..models.quiz import GenerationJob, Question, Topic
+from .circuit_breaker import circuit_open
+from .llm_backend import LLMBackend
+from .llm_service import generate_questions
+from .question_pool import build_question
+
+logger = logging.getLogger(__name__)
+
+# GenerationJob.status values
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+async def find_job(db: AsyncSession, dedup_key: str) -> Optional[GenerationJob]:
+    """Look up a job by its dedup key."""
+    result = await db.execute(select(GenerationJob).where(GenerationJob.dedup_key == dedup_key))
+    return result.scalars().first()
+
+async def enqueue_job(
+    db: AsyncSession,
+    user_id: int,
+    topic_id: int,
+    difficulty_level: int,
+    count: int,
+    question_ids: List[int],
+    dedup_key: Optional[str] = None
+) -> Tuple[GenerationJob, bool]:
+    """
+    Queue a job generating `count` questions for a session that already holds `question_ids`.
+
+    Commits, together with anything else pending in the session (e.g. the
+    pooled questions just claimed). A job with nothing to generate is stored
+    as done. If a job with the same dedup_key exists, the new one is
+    discarded (and the pending changes rolled back) and the existing job is
+    returned. Returns the job and whether it was created.
+    """
+    job = GenerationJob(
+        user_id=user_id,
+        topic_id=topic_id,
+        difficulty_level=difficulty_level,
+        count=count,
+        question_ids=question_ids,
+        dedup_key=dedup_key,
+        status=QUEUED if count > 0 else DONE
+    )
+    db.add(job)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # An identical submission got there first
+        await db.rollback()
+        if dedup_key is None:
+            raise
+        return await find_job(db, dedup_key), False
+    return job, True
+
+def _runnable(now: datetime):
+    return or_(
+        and_(GenerationJob.status == QUEUED, GenerationJob.run_after <= now),
+        # Claimed by a worker that stopped before finishing
+        and_(GenerationJob.status == RUNNING, GenerationJob.locked_until < now)
+    )
+
+async def claim_jobs(db: AsyncSession, limit: int, job_id: Optional[int] = None) -> List[int]:
+    """
+    Mark up to `limit` runnable jobs (or only `job_id`) as running and commit.
+
+    On Postgres, FOR UPDATE SKIP LOCKED lets concurrent workers pass over
+    each other's candidates instead of queueing behind them; the conditional
+    UPDATE keeps the claim exclusive on SQLite as well. Each claim holds a
+    lease of GENERATION_JOB_LEASE seconds. Returns the claimed job ids.
+    """
+    now = datetime.utcnow()
+    statement = select(GenerationJob.id).where(_runnable(now))
+    if job_id is not None:
+        statement = statement.where(GenerationJob.id == job_id)
+    candidates = (await db.execute(
+        statement.order_by(GenerationJob.id).limit(limit).with_for_update(skip_locked=True)
+    )).scalars().all()
+
+    claimed = []
+    for candidate in candidates:
+        result = await db.execute(
+            update(GenerationJob)
+            .where(GenerationJob.id == candidate, _runnable(now))
+            .values(
+                status=RUNNING,
+                attempts=GenerationJob.attempts + 1,
+                locked_until=now + timedelta(seconds=settings.GENERATION_JOB_LEASE),
+                updated_at=now
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            claimed.append(candidate)
+    await db.commit()
+    return claimed
+
+def _holds_lease(job_id: int, lease: datetime):
+    """Condition matching the job only while the claim that set `lease` still owns it."""
+    return and_(GenerationJob.id == job_id, GenerationJob.status == RUNNING, GenerationJob.locked_until == lease)
+
+async def fail_job(
+    db: AsyncSession,
+    job_id: int,
+    error: str,
+    retry: bool = True,
+    lease: Optional[datetime] = None
+) -> GenerationJob:
+    """
+    Record a failed attempt: requeue the job with exponential backoff, or
+    mark it failed after GENERATION_JOB_MAX_ATTEMPTS attempts (or at once
+    without `retry`). A failed job's pooled questions go back to the pool.
+    With `lease`, nothing is recorded if the job has since been claimed
+    again. Commits.
+    """
+    job = await db.get(GenerationJob, job_id, populate_existing=True)
+    if lease is not None and (job.status != RUNNING or job.locked_until != lease):
+        await db.commit()
+        return job
+    job.last_error = error[:1000]
+    job.locked_until = None
+    if not retry or job.attempts >= settings.GENERATION_JOB_MAX_ATTEMPTS:
+        job.status = FAILED
+        if job.question_ids:
+            # Only pooled questions are stored before a job succeeds
+            await db.execute(
+                update(Question)
+                .where(Question.id.in_(job.question_ids))
+                .values(served_at=None)
+                .execution_options(synchronize_session=False)
+            )
+    else:
+        job.status = QUEUED
+        delay = settings.GENERATION_JOB_RETRY_DELAY * 2 ** max(0, job.attempts - 1)
+        job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+    await db.commit()
+    return job
+
+async def run_job(client: LLMBackend, db: AsyncSession, job_id: int, retry: bool = True) -> GenerationJob:
+    """
+    Generate the questions for a claimed job and store them with the result.
+
+    The questions and the finished job are committed together, so work that
+    completes is kept even if whoever enqueued the job has gone away. The
+    job is only finished while this claim's lease holds; if generation
+    outlasted it and the job was claimed again, the new questions go to the
+    pool instead and the job is returned as the other claim left it. On
+    failure the attempt is recorded with fail_job (which requeues the job
+    only with `retry`) and the error re-raised.
+    """
+    job = await db.get(GenerationJob, job_id, populate_existing=True)
+    lease = job.locked_until
+    try:
+        topic = await db.get(Topic, job.topic_id)
+        if topic is None:
+            raise ValueError("Topic not found")
+        # Do not hold a pooled connection while waiting on the LLM
+        await db.commit()
+        generated = await generate_questions(
+            client,
+            topic=topic.name,
+            difficulty_level=job.difficulty_level,
+            count=job.count
+        )
+    except Exception as e:
+        await db.rollback()
+        await fail_job(db, job_id, str(e), retry, lease)
+        raise
+
+    served_at = datetime.utcnow()
+    fresh = [build_question(topic.id, question_data, served_at) for question_data in generated]
+    db.add_all(fresh)
+    await db.flush()
+    finished = await db.execute(
+        update(GenerationJob)
+        .where(_holds_lease(job_id, lease))
+        .values(
+            question_ids=list(job.question_ids or []) + [question.id for question in fresh],
+            status=DONE,
+            locked_until=None,
+            updated_at=served_at
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if not finished.rowcount:
+        # Another worker reclaimed the job after the lease ran out and owns its result
+        logger.warning("Generation job %s outlived its lease; pooling its questions", job_id)
+        for question in fresh:
+            question.served_at = None
+    await db.commit()
+    return await db.get(GenerationJob, job_id, populate_existing=True)
+
+async def wait_for_job(db: AsyncSession, job_id: int, timeout: float) -> GenerationJob:
+    """
+    Poll a job until it is done or failed, or `timeout` seconds have passed.
+
+    The transaction is ended between polls so a waiting request does not
+    hold a pooled connection. Returns the job in its latest state.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        job = await db.get(GenerationJob, job_id, populate_existing=True)
+        remaining = deadline - loop.time()
+        if job.status in (DONE, FAILED) or remaining <= 0:
+            return job
+        await db.commit()
+        await asyncio.sleep(min(settings.GENERATION_JOB_POLL_INTERVAL, remaining))
+
+async def job_questions(db: AsyncSession, job: GenerationJob) -> List[Question]:
+    """The session's questions, pooled ones first, in the order they were added."""
+    ids = job.question_ids or []
+    result = await db.execute(select(Question).where(Question.id.in_(ids)))
+    by_id = {question.id: question for question in result.scalars().all()}
+    return [by_id[question_id] for question_id in ids if question_id in by_id]
+
+class GenerationJobWorker:
+    """
+    Runs queued generation jobs, up to `concurrency` at a time.
+
+    Each slot claims one job at a time. Idle slots poll the queue every
+    GENERATION_JOB_POLL_INTERVAL seconds; `notify` wakes them at once for
+    jobs enqueued in the same process. Jobs interrupted by a shutdown are
+    claimed again once their lease lapses.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession], client: LLMBackend, concurrency: int = 1):
+        self.session_factory = session_factory
+        self.client = client
+        self.concurrency = max(1, concurrency)
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle slots to look for new jobs."""
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            if await self.run_next():
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.GENERATION_JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def run_next(self) -> bool:
+        """
+        Claim and run one job. Returns False if none was runnable, or while
+        the LLM's circuit breaker is open so jobs keep their attempts.
+        """
+        if circuit_open(self.client):
+            return False
+        async with self.session_factory() as db:
+            try:
+                claimed = await claim_jobs(db, 1)
+            except Exception:
+                logger.exception("Failed to claim a generation job")
+                return False
+            if not claimed:
+                return False
+            try:
+                await run_job(self.client, db, claimed[0])
+            except Exception:
+                logger.exception("Generation job %s failed", claimed[0])
+        return True
+
+def get_generation_job_worker(request: Request) -> Optional[GenerationJobWorker]:
+    """Dependency returning the app's in-process job worker, if one is running."""
+    return getattr(request.app.state, "generation_job_worker", None)
@@ -0,0 +1,121 @@
+import re
+import string
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from ..models.quiz import Question
+from .circuit_breaker import circuit_open
+from .llm_backend import LLMBackend
+from .llm_service import validate_answer
+
+GRADED_LOCALLY = "local"
+GRADED_BY_LLM = "llm"
+GRADED_DEGRADED = "degraded"  # strict local comparison while the LLM was unavailable
+
+# "A", "a)", "(B)", "C.", "D:" -- optionally followed by the option text
+_LETTER_PREFIX = re.compile(r"^\(?([a-z])(?:\s*[).:\]]\s*(.*)|\s*)$", re.IGNORECASE)
+
+@dataclass
+class Grade:
+    is_correct: bool
+    method: str
+
+def normalize(text: str) -> str:
+    """Casefold, collapse whitespace and drop trailing punctuation."""
+    return " ".join(text.split()).casefold().rstrip(string.punctuation + " ")
+
+def _split_letter(text: str, option_count: int) -> Tuple[Optional[str], str]:
+    """
+    Split "B) Some text" into ("B", "some text").
+
+    Only letters that address an existing option count, so an answer such as
+    "I. e. the retriever" is not mistaken for option I.
+    """
+    match = _LETTER_PREFIX.match(" ".join(text.split()))
+    if match is None or ord(match.group(1).upper()) - ord("A") >= option_count:
+        return None, normalize(text)
+    return match.group(1).upper(), normalize(match.group(2) or "")
+
+def resolve_choice(answer: str, options: List[str]) -> Optional[str]:
+    """
+    Map an answer to the letter of the option it selects.
+
+    Accepts a bare letter ("a", "A)", "(A)"), an option's full text with or
+    without its letter prefix, or a letter followed by that option's text.
+    Returns None when the answer matches no option or could mean more than one.
+    """
+    if not options:
+        return None
+
+    letters = [chr(ord("A") + index) for index in range(len(options))]
+    bodies = []
+    for letter, option in zip(letters, options):
+        prefix, body = _split_letter(option, len(options))
+        bodies.append(body if prefix == letter and body else normalize(option))
+
+    normalized_answer = normalize(answer)
+    candidates = {
+        letter
+        for letter, option, body in zip(letters, options, bodies)
+        if normalized_answer in (normalize(option), body)
+    }
+
+    prefix, body = _split_letter(answer, len(options))
+    if prefix is not None:
+        if body and body != bodies[letters.index(prefix)]:
+            # A letter followed by some other text, e.g. "B) <text of option C>"
+            return None
+        candidates.add(prefix)
+
+    if len(candidates) != 1:
+        return None
+    return candidates.pop()
+
+def grade_locally(question: Question, answer: str) -> Optional[bool]:
+    """
+    Grade a multiple-choice answer without calling the LLM.
+
+    Returns None when either the stored correct answer or the user's answer
+    cannot be resolved to exactly one option.
+    """
+    options = question.options or []
+    correct = resolve_choice(question.correct_answer or "", options)
+    if correct is None:
+        return None
+    selected = resolve_choice(answer, options)
+    if selected is None:
+        return None
+    return selected == correct
+
+def grade_strictly(question: Question, answer: str) -> bool:
+    """
+    Grade an answer no option resolves by comparing it with the stored
+    correct answer as text. Errs towards marking paraphrases wrong.
+    """
+    return normalize(answer) == normalize(question.correct_answer or "")
+
+async def grade_answer(client: LLMBackend, question: Question, answer: str) -> Grade:
+    """
+    Grade an answer locally when possible, escalating to the LLM otherwise.
+
+    While the LLM's circuit breaker is open, or if the call fails because it
+    just opened, the answer is graded with grade_strictly instead.
+    """
+    is_correct = grade_locally(question, answer)
+    if is_correct is not None:
+        return Grade(is_correct=is_correct, method=GRADED_LOCALLY)
+
+    if circuit_open(client):
+        return Grade(is_correct=grade_strictly(question, answer), method=GRADED_DEGRADED)
+    try:
+        is_correct = await validate_answer(
+            client,
+            question=question.question_text,
+            correct_answer=question.correct_answer,
+            user_answer=answer
+        )
+    except Exception:
+        if not circuit_open(client):
+            raise
+        return Grade(is_correct=grade_strictly(question, answer), method=GRADED_DEGRADED)
+    return Grade(is_correct=is_correct, method=GRADED_BY_LLM)
@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import json
+import random
+import re
+from typing import AsyncIterator, Dict, List, Optional, Protocol
+
+from fastapi import Request
+
+from ..core.config import settings
+from .circuit_breaker import CircuitBreaker, CircuitBreakerBackend
+from .llm_client import OpenAIBackend
+
+# Task names passed to LLMBackend.chat
+TASK_GENERATE_QUESTION = "generate_question"
+TASK_GENERATE_QUESTIONS = "generate_questions"
+TASK_VALIDATE_ANSWER = "validate_answer"
+TASK_GENERATE_EXPLANATION = "generate_explanation"
+
+class LLMBackend(Protocol):
+    """
+    Chat-completion backend used by llm_service.
+
+    `task` names the kind of work (one of the TASK_* constants) so a backend
+    can tell question generation from answer validation without parsing the
+    prompt. `json_mode` asks the model to emit a single JSON object.
+    """
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: Optional[float] = None,
+        task: str = "chat",
+        json_mode: bool = False
+    ) -> str: ...
+
+    def stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: Optional[float] = None,
+        task: str = "chat",
+        json_mode: bool = False
+    ) -> AsyncIterator[str]: ...
+
+    async def aclose(self) -> None: ...
+
+class StubLLMError(Exception):
+    """Synthetic failure injected by StubLLMBackend."""
+
+class StubLLMBackend:
+    """
+    Offline backend that returns deterministic, schema-valid completions.
+
+    Replies depend only on the seed and the order of calls, so benchmark runs
+    are reproducible. `latency_ms` adds a synthetic delay (plus up to
+    `latency_jitter_ms` of seeded jitter) and `error_rate` makes that fraction
+    of calls raise StubLLMError.
+    """
+
+    STREAM_CHUNK_CHARS = 16
+    CONCEPTS = [
+        "embeddings", "chunking", "reranking", "context windows", "tokenization",
+        "temperature", "retrieval latency", "vector indexes", "prompt templates",
+        "evaluation metrics", "fine-tuning data", "hallucination checks",
+        "caching", "batching", "guardrails", "routing", "quantization", "recall",
+    ]
+
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        latency_jitter_ms: float = 0,
+        error_rate: float = 0.0,
+        seed: int = 0
+    ):
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_settings(cls) -> "StubLLMBackend":
+        return cls(
+            latency_ms=settings.STUB_LLM_LATENCY_MS,
+            latency_jitter_ms=settings.STUB_LLM_LATENCY_JITTER_MS,
+            error_rate=settings.STUB_LLM_ERROR_RATE,
+            seed=settings.STUB_LLM_SEED
+        )
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: Optional[float] = None,
+        task: str = "chat",
+        json_mode: bool = False
+    ) -> str:
+        return await self._reply(messages, task)
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: Optional[float] = None,
+        task: str = "chat",
+        json_mode: bool = False
+    ) -> AsyncIterator[str]:
+        content = await self._reply(messages, task)
+        for start in range(0, len(content), self.STREAM_CHUNK_CHARS):
+            yield content[start:start + self.STREAM_CHUNK_CHARS]
+            await asyncio.sleep(0)
+
+    async def _reply(self, messages: List[Dict[str, str]], task: str) -> str:
+        self.calls += 1
+        call = self.calls
+        delay = self.latency_ms + self._random.uniform(0, self.latency_jitter_ms)
+        fail = self._random.random() < self.error_rate
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if fail:
+            raise StubLLMError(f"Synthetic LLM failure on call {call}")
+
+        prompt = messages[-1]["content"]
+        if task == TASK_GENERATE_QUESTION:
+            return json.dumps(self._question(prompt, call, 0))
+        if task == TASK_GENERATE_QUESTIONS:
+            match = re.search(r"Generate (\d+) distinct", prompt)
+            count = int(match.group(1)) if match else 1
+            return json.dumps({"questions": [self._question(prompt, call, index) for index in range(count)]})
+        if task == TASK_VALIDATE_ANSWER:
+            return self._validation(prompt)
+        return f"Stub explanation #{call}: the answer follows from the core concept in the question."
+
+    def _question(self, prompt: str, call: int, index: int) -> Dict:
+        match = re.search(r"about (.+?) at difficulty level (\d)", prompt)
+        topic = match.group(1) if match else "LLMs"
+        difficulty_level = int(match.group(2)) if match else 3
+        digest = hashlib.sha256(f"{topic}:{call}:{index}".encode()).digest()
+        first, second, third = (self.CONCEPTS[byte % len(self.CONCEPTS)] for byte in digest[:3])
+        correct = "ABCD"[digest[3] % 4]
+        return {
+            "question_text": f"In {topic}, how does {first} interact with {second} when tuning {third}? (#{digest[4:8].hex()})",
+            "options": [f"{letter}) Statement {letter} about {topic}" for letter in "ABCD"],
+            "correct_answer": correct,
+            "explanation": f"Statement {correct} is the accurate description of {topic}.",
+            "difficulty_level": difficulty_level
+        }
+
+    def _validation(self, prompt: str) -> str:
+        correct = re.search(r"Correct Answer:\s*(.*)", prompt)
+        answer = re.search(r"User's Answer:\s*(.*)", prompt)
+        if not correct or not answer:
+            return "false"
+        return "true" if correct.group(1).strip().lower() == answer.group(1).strip().lower() else "false"
+
+    async def aclose(self) -> None:
+        pass
+
+def create_llm_backend() -> LLMBackend:
+    """
+    Build the backend selected by the LLM_BACKEND setting, behind a circuit
+    breaker unless LLM_BREAKER_ENABLED is off.
+    """
+    if settings.LLM_BACKEND == "stub":
+        backend = StubLLMBackend.from_settings()
+    elif settings.LLM_BACKEND == "openai":
+        backend = OpenAIBackend.from_settings()
+    else:
+        raise ValueError(f"Unknown LLM_BACKEND: {settings.LLM_BACKEND!r}")
+    if settings.LLM_BREAKER_ENABLED:
+        return CircuitBreakerBackend(backend, CircuitBreaker.from_settings())
+    return backend
+
+def get_llm_backend(request: Request) -> LLMBackend:
+    """Dependency returning the backend created in the app lifespan."""
+    return request.app.state.llm_backend
@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Protocol, Tuple
+
+from ..core.config import settings
+
+class CacheBackend(Protocol):
+    """Storage tier for cached LLM completions."""
+
+    def get(self, key: str) -> Optional[str]: ...
+
+    def set(self, key: str, value: str) -> None: ...
+
+class LRUCache:
+    """
+    In-process LRU cache whose entries expire after `ttl` seconds.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class SQLiteCache:
+    """
+    Disk-backed cache tier that survives restarts.
+
+    Expired rows are deleted when the cache is opened and after every
+    `sweep_every` writes, so the file does not keep growing.
+    """
+
+    def __init__(self, path: str, ttl: float, sweep_every: int = 1000):
+        self.ttl = ttl
+        self.sweep_every = sweep_every
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_expires ON llm_cache (expires_at)")
+            self._sweep()
+
+    def _sweep(self) -> None:
+        # Callers hold the lock inside a transaction
+        self._conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND expires_at >= ?",
+                (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + self.ttl)
+            )
+            self._writes += 1
+            if self._writes % self.sweep_every == 0:
+                self._sweep()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+class LLMCache:
+    """
+    Two-tier completion cache: an in-process LRU in front of an optional disk tier.
+
+    Disk hits are promoted into memory. The disk tier does blocking I/O, so
+    it runs on a dedicated thread instead of the event loop. Hit and miss
+    counters are kept for the health endpoint.
+    """
+
+    def __init__(self, memory: CacheBackend, disk: Optional[CacheBackend] = None):
+        self.memory = memory
+        self.disk = disk
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._disk_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-cache") if disk else None
+
+    async def _on_disk(self, call: Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._disk_executor, call, *args)
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = await self._on_disk(self.disk.get, key)
+            if value is not None:
+                self.disk_hits += 1
+                self.memory.set(key, value)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            await self._on_disk(self.disk.set, key, value)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses
+        }
+
+def make_cache_key(prompt: str, **params) -> str:
+    """
+    Hash a prompt and its model parameters into a cache key.
+
+    Whitespace in the prompt is collapsed so formatting differences in the
+    template do not split otherwise identical requests.
+    """
+    normalized = " ".join(prompt.split())
+    payload = json.dumps({"prompt": normalized, "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def create_llm_cache() -> Optional[LLMCache]:
+    """Build the completion cache described by the LLM_CACHE_* settings."""
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    memory = LRUCache(settings.LLM_CACHE_MAX_ENTRIES, settings.LLM_CACHE_TTL)
+    disk = SQLiteCache(settings.LLM_CACHE_PATH, settings.LLM_CACHE_TTL) if settings.LLM_CACHE_PATH else None
+    return LLMCache(memory, disk)
+
+llm_cache: Optional[LLMCache] = create_llm_cache()
+
+def get_llm_cache() -> Optional[LLMCache]:
+    return llm_cache
+
+def set_llm_cache(cache: Optional[LLMCache]) -> None:
+    """Swap in a different cache (or None to disable caching)."""
+    global llm_cache
+    llm_cache = cache
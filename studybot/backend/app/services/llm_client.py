@@ -0,0 +1,185 @@
+import asyncio
+import random
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+import openai
+
+from ..core.config import settings
+from .rate_limiter import RateLimiter, estimate_tokens, priority_for
+
+# Errors worth another attempt: rate limiting, 5xx, timeouts and dropped connections
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+)
+
+class OpenAIBackend:
+    """
+    LLMBackend for the OpenAI API, shared by the whole process.
+
+    Wraps a single AsyncOpenAI instance on a pooled, keep-alive httpx transport.
+    Every call gets a timeout, at most `max_concurrency` calls are in flight at
+    once, and rate-limit/5xx/timeout failures are retried with jittered
+    exponential backoff. With a `rate_limiter`, each attempt is first admitted
+    against the RPM/TPM budgets, and every response's rate-limit headers are
+    fed back to it.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        max_concurrency: int = 10,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        rate_limiter: Optional[RateLimiter] = None
+    ):
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections
+            ),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            transport=transport,
+            event_hooks={"response": [self._observe_response]}
+        )
+        self._openai = openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url or None,
+            http_client=self._http,
+            max_retries=0  # retries are handled here so they respect the semaphore
+        )
+
+    @classmethod
+    def from_settings(cls, **overrides) -> "OpenAIBackend":
+        options = dict(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            timeout=settings.LLM_REQUEST_TIMEOUT,
+            connect_timeout=settings.LLM_CONNECT_TIMEOUT,
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            max_retries=settings.LLM_MAX_RETRIES,
+            backoff_base=settings.LLM_RETRY_BACKOFF_BASE,
+            backoff_max=settings.LLM_RETRY_BACKOFF_MAX,
+            rate_limiter=RateLimiter.from_settings() if settings.LLM_RATE_LIMIT_ENABLED else None
+        )
+        options.update(overrides)
+        return cls(**options)
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: Optional[float] = None,
+        task: str = "chat",
+        json_mode: bool = False
+    ) -> str:
+        """Run a chat completion and return the message content."""
+        tokens = estimate_tokens(messages, max_tokens)
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self._admit(tokens, task)
+                async with self._semaphore:
+                    response = await self._openai.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        timeout=timeout or self.timeout,
+                        **self._response_format(json_mode)
+                    )
+                if self.rate_limiter is not None and response.usage is not None:
+                    self.rate_limiter.refund(tokens - response.usage.total_tokens)
+                return response.choices[0].message.content
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt, e))
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: Optional[float] = None,
+        task: str = "chat",
+        json_mode: bool = False
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion, yielding content deltas as they arrive.
+
+        Failures are only retried before the first delta; after that the
+        caller has already consumed part of the output.
+        """
+        tokens = estimate_tokens(messages, max_tokens)
+        for attempt in range(self.max_retries + 1):
+            received = False
+            try:
+                await self._admit(tokens, task)
+                async with self._semaphore:
+                    response = await self._openai.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        timeout=timeout or self.timeout,
+                        stream=True,
+                        **self._response_format(json_mode)
+                    )
+                    try:
+                        async for event in response:
+                            if event.choices and event.choices[0].delta.content:
+                                received = True
+                                yield event.choices[0].delta.content
+                    finally:
+                        await response.response.aclose()
+                return
+            except RETRYABLE_ERRORS as e:
+                if received or attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt, e))
+
+    async def _admit(self, tokens: int, task: str) -> None:
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(tokens, priority_for(task))
+
+    async def _observe_response(self, response: httpx.Response) -> None:
+        if self.rate_limiter is not None:
+            self.rate_limiter.observe(response.status_code, response.headers)
+
+    @staticmethod
+    def _response_format(json_mode: bool) -> Dict:
+        return {"response_format": {"type": "json_object"}} if json_mode else {}
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, never shorter than a Retry-After header."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            return max(delay, min(float(retry_after), self.backoff_max)) if retry_after else delay
+        except ValueError:
+            return delay
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
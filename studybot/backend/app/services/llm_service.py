@@ -1,47 +1,447 @@
-from typing import Dict, List
-import openai
+from contextvars import ContextVar
+from difflib import SequenceMatcher
+from typing import AsyncIterator, Callable, Hashable, List, Optional, Tuple
+import asyncio
+import itertools
+import re
+import string
+import time
 from ..core.config import settings
+from ..schemas.quiz import QuestionBase
+from .llm_cache import get_llm_cache, make_cache_key
+from .model_routing import llm_metrics, models_for
+from .single_flight import SingleFlight
+from .structured_output import JSONObjectStream, StructuredOutputError, parse_question
+from .llm_backend import (
+    LLMBackend,
+    TASK_GENERATE_EXPLANATION,
+    TASK_GENERATE_QUESTION,
+    TASK_GENERATE_QUESTIONS,
+    TASK_VALIDATE_ANSWER
+)
 
-# Initialize OpenAI client
-openai.api_key = settings.OPENAI_API_KEY
+# Completion budget per question when several are generated in one call
+QUESTION_BATCH_TOKENS_PER_QUESTION = 400
 
-async def generate_question(topic: str, difficulty_level: int) -> Dict:
+# Identical LLM calls in flight at the same moment share one upstream request
+llm_flights = SingleFlight()
+
+# Generation calls only share a completion when this also matches. Callers
+# that need distinct questions from concurrent calls (one quiz session asking
+# for several batches at once) set a different value in each task, and
+# callers that must not share with user sessions at all (pool refills) set
+# their own value around generate_questions, which keeps it in every task.
+generation_variant: ContextVar[Optional[Hashable]] = ContextVar("generation_variant", default=None)
+
+def _coalescing() -> bool:
+    return settings.LLM_COALESCING_ENABLED
+
+async def _chat_completion(
+    client: LLMBackend,
+    task: str,
+    system_prompt: str,
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+    model: str,
+    cacheable: bool = False,
+    usable: Callable[[str], bool] = lambda content: bool(content.strip()),
+    escalated: bool = False
+) -> str:
     """
-    Generate a question using OpenAI's GPT model.
+    Run a chat completion and return the message content.
+
+    Cacheable completions are looked up in the LLM cache by a hash of the
+    normalized prompt and model parameters before calling the API, and
+    identical cacheable completions already in flight are awaited instead of
+    being requested again. Only replies passing `usable` are cached, so a
+    bad reply is not served again until it expires. Every upstream call is
+    recorded in llm_metrics, along with whether its reply was unusable and,
+    if so, `escalated`: whether the caller then tries a stronger model.
     """
-    prompt = f"""Generate a multiple-choice question about {topic} at difficulty level {difficulty_level}/5.
-    The question should be challenging but fair, and the options should be plausible.
-    Format the response as a JSON object with the following structure:
-    {{
-        "question": "The question text",
+    cache = get_llm_cache() if cacheable else None
+    key = make_cache_key(
+        prompt,
+        system=system_prompt,
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens
+    ) if cacheable else None
+    if cache is not None:
+        cached = await cache.get(key)
+        if cached is not None:
+            return cached
+    
+    async def complete() -> str:
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+        started = time.monotonic()
+        try:
+            content = await client.chat(
+                messages=messages,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                task=task
+            )
+        except Exception:
+            llm_metrics.record(task, model, time.monotonic() - started, messages, "", failed=True)
+            raise
+        llm_metrics.record(task, model, time.monotonic() - started, messages, content)
+        if not usable(content):
+            llm_metrics.record_invalid(task, model, escalated=escalated)
+        elif cache is not None:
+            await cache.set(key, content)
+        return content
+    
+    if cacheable and _coalescing():
+        return await llm_flights.call((task, client, key), complete)
+    return await complete()
+
+GENERATION_SYSTEM_PROMPT = "You are an expert quiz generator specializing in LLM and AI topics."
+
+QUESTION_FORMAT = """{{
+        "question_text": "The question text",
         "options": ["Option A", "Option B", "Option C", "Option D"],
         "correct_answer": "The correct option letter (A, B, C, or D)",
         "explanation": "A detailed explanation of why the correct answer is right",
         "difficulty_level": {difficulty_level}
-    }}
+    }}"""
+
+async def _stream_json_objects(
+    client: LLMBackend,
+    parser: JSONObjectStream,
+    task: str,
+    prompt: str,
+    max_tokens: int,
+    model: str
+) -> AsyncIterator[str]:
+    """
+    Stream a JSON-mode generation completion, yielding each complete object.
+
+    Whatever arrived is left in `parser.buffer` for callers that want to
+    repair an incomplete response. The call is recorded in llm_metrics once
+    the stream ends.
+    """
+    messages = [
+        {"role": "system", "content": GENERATION_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+    started = time.monotonic()
+    received = []
+    failed = False
+    stream = client.stream(
+        messages=messages,
+        model=model,
+        temperature=0.7,
+        max_tokens=max_tokens,
+        task=task,
+        json_mode=settings.LLM_JSON_MODE
+    )
+    try:
+        async for chunk in stream:
+            received.append(chunk)
+            for text in parser.feed(chunk):
+                yield text
+    except Exception as e:
+        # Output that is not JSON is the model's answer, not a failed call
+        failed = not isinstance(e, StructuredOutputError)
+        raise
+    finally:
+        await stream.aclose()
+        llm_metrics.record(task, model, time.monotonic() - started, messages, "".join(received), failed)
+
+async def generate_question(client: LLMBackend, topic: str, difficulty_level: int) -> QuestionBase:
+    """
+    Generate a question using OpenAI's GPT model.
+
+    The completion is requested in JSON mode and streamed; the question is
+    validated as soon as its closing brace arrives, and a stream that does not
+    start with JSON is abandoned early instead of being read to the end.
+    Output that still does not validate is retried on the next model in
+    models_for(TASK_GENERATE_QUESTION). Concurrent calls with the same
+    arguments and generation_variant share one completion and each get a
+    copy of its question.
+    """
+    if not _coalescing():
+        return await _generate_question(client, topic, difficulty_level)
+    key = (TASK_GENERATE_QUESTION, client, topic, difficulty_level, generation_variant.get())
+    question = await llm_flights.call(key, lambda: _generate_question(client, topic, difficulty_level))
+    return question.model_copy(deep=True)
+
+async def _generate_question(client: LLMBackend, topic: str, difficulty_level: int) -> QuestionBase:
+    prompt = f"""Generate a multiple-choice question about {topic} at difficulty level {difficulty_level}/5.
+    The question should be challenging but fair, and the options should be plausible.
+    Format the response as a JSON object with the following structure:
+    {QUESTION_FORMAT.format(difficulty_level=difficulty_level)}
     """
     
     try:
-        response = await openai.ChatCompletion.acreate(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an expert quiz generator specializing in LLM and AI topics."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=500
-        )
-        
-        # Parse the response and return the question data
-        question_data = eval(response.choices[0].message.content)
-        return question_data
+        models = models_for(TASK_GENERATE_QUESTION)
+        for model in models:
+            try:
+                question = await _stream_question(client, prompt, model)
+            except StructuredOutputError:
+                escalate = model != models[-1]
+                llm_metrics.record_invalid(TASK_GENERATE_QUESTION, model, escalated=escalate)
+                if not escalate:
+                    raise
+                continue
+            question.difficulty_level = difficulty_level
+            return question
     
     except Exception as e:
         raise Exception(f"Error generating question: {str(e)}")
 
-async def validate_answer(question: str, correct_answer: str, user_answer: str) -> bool:
+async def _stream_question(client: LLMBackend, prompt: str, model: str) -> QuestionBase:
+    parser = JSONObjectStream()
+    question = None
+    objects = _stream_json_objects(client, parser, TASK_GENERATE_QUESTION, prompt, max_tokens=500, model=model)
+    try:
+        async for text in objects:
+            if question is None:
+                question = parse_question(text)
+    finally:
+        await objects.aclose()
+    
+    # Fall back to repairing whatever arrived if no complete object was seen
+    if question is None:
+        question = parse_question(parser.buffer)
+    return question
+
+async def iter_question_batch(
+    client: LLMBackend,
+    topic: str,
+    difficulty_level: int,
+    count: int
+) -> AsyncIterator[QuestionBase]:
+    """
+    Generate up to `count` questions in a single completion, yielding each one
+    as soon as it has streamed in and validated.
+
+    Invalid entries are skipped, so fewer than `count` questions may be
+    yielded; _generate_tagged makes up the shortfall with generate_question,
+    which escalates to a stronger model. Concurrent calls with the same
+    arguments and generation_variant share one completion; each caller
+    receives copies of every question from the start, including ones that
+    arrived before it joined.
+    """
+    if not _coalescing():
+        batch = _iter_question_batch(client, topic, difficulty_level, count)
+    else:
+        key = (TASK_GENERATE_QUESTIONS, client, topic, difficulty_level, count, generation_variant.get())
+        batch = llm_flights.stream(key, lambda: _iter_question_batch(client, topic, difficulty_level, count))
+    try:
+        async for question in batch:
+            yield question.model_copy(deep=True)
+    finally:
+        await batch.aclose()
+
+async def _iter_question_batch(
+    client: LLMBackend,
+    topic: str,
+    difficulty_level: int,
+    count: int
+) -> AsyncIterator[QuestionBase]:
+    prompt = f"""Generate {count} distinct multiple-choice questions about {topic} at difficulty level {difficulty_level}/5.
+    Each question should be challenging but fair, cover a different aspect of the topic, and have plausible options.
+    Format the response as a JSON object with a "questions" array of {count} objects, each with the following structure:
+    {QUESTION_FORMAT.format(difficulty_level=difficulty_level)}
+    """
+    
+    try:
+        yielded = 0
+        objects = _stream_json_objects(
+            client,
+            JSONObjectStream(),
+            TASK_GENERATE_QUESTIONS,
+            prompt,
+            max_tokens=QUESTION_BATCH_TOKENS_PER_QUESTION * count + 100,
+            model=models_for(TASK_GENERATE_QUESTIONS)[0]
+        )
+        try:
+            async for text in objects:
+                try:
+                    question = parse_question(text)
+                except StructuredOutputError:
+                    continue
+                question.difficulty_level = difficulty_level
+                yield question
+                yielded += 1
+                if yielded == count:
+                    break
+        finally:
+            await objects.aclose()
+    
+    except Exception as e:
+        raise Exception(f"Error generating questions: {str(e)}")
+
+async def generate_question_batch(client: LLMBackend, topic: str, difficulty_level: int, count: int) -> List[QuestionBase]:
+    """
+    Generate up to `count` questions in a single completion.
+
+    Invalid entries and near-duplicates are dropped, so the result can be
+    shorter than `count`.
+    """
+    questions = []
+    batch = iter_question_batch(client, topic, difficulty_level, count)
+    try:
+        async for question in batch:
+            questions.append(question)
+    finally:
+        await batch.aclose()
+    return dedupe_questions(questions)
+
+def _question_key(question: QuestionBase) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", question.question_text.lower()))
+
+def _is_near_duplicate(key: str, keys: List[str], threshold: float = 0.9) -> bool:
+    return any(key == other or SequenceMatcher(None, key, other).ratio() >= threshold for other in keys)
+
+def dedupe_questions(questions: List[QuestionBase], threshold: float = 0.9) -> List[QuestionBase]:
+    """
+    Drop questions whose text is near-identical to an earlier one.
+
+    Texts are compared after lowercasing and stripping punctuation, using
+    difflib's similarity ratio.
+    """
+    kept = []
+    keys = []
+    for question in questions:
+        key = _question_key(question)
+        if _is_near_duplicate(key, keys, threshold):
+            continue
+        kept.append(question)
+        keys.append(key)
+    return kept
+
+async def _generate_tagged(
+    client: LLMBackend,
+    topic: str,
+    difficulty_level: int,
+    count: int
+) -> AsyncIterator[Tuple[int, QuestionBase]]:
+    """
+    Yield (batch index, question) pairs in the order questions finish.
+
+    Questions are requested QUESTION_BATCH_SIZE at a time, with at most
+    QUESTION_GENERATION_CONCURRENCY requests in flight. Whatever a batch fails
+    to deliver is generated one question at a time; such a slot is retried up
+    to QUESTION_GENERATION_RETRIES times and dropped if it still fails, so one
+    bad completion does not sink the whole session. Near-duplicates are
+    dropped as they arrive.
+
+    Each request runs under its own generation_variant, combined with the
+    caller's, so this session's requests never share a completion with each
+    other, while the same request from another session started at the same
+    moment can (but not one from a caller with a different variant).
+    """
+    semaphore = asyncio.Semaphore(max(1, settings.QUESTION_GENERATION_CONCURRENCY))
+    batch_size = max(1, settings.QUESTION_BATCH_SIZE)
+    results: asyncio.Queue = asyncio.Queue()
+    keys: List[str] = []
+    slot_numbers = itertools.count()
+    caller = generation_variant.get()
+    
+    def deliver(index: int, question: QuestionBase) -> bool:
+        key = _question_key(question)
+        if _is_near_duplicate(key, keys):
+            return False
+        keys.append(key)
+        results.put_nowait((index, question))
+        return True
+    
+    async def generate_slot(index: int) -> None:
+        for _ in range(settings.QUESTION_GENERATION_RETRIES + 1):
+            generation_variant.set((caller, "slot", next(slot_numbers)))
+            async with semaphore:
+                try:
+                    question = await generate_question(client, topic, difficulty_level)
+                except Exception:
+                    continue
+            deliver(index, question)
+            return
+    
+    async def generate_batch(index: int, size: int) -> None:
+        delivered = 0
+        if size > 1:
+            generation_variant.set((caller, "batch", index))
+            async with semaphore:
+                batch = iter_question_batch(client, topic, difficulty_level, size)
+                try:
+                    async for question in batch:
+                        delivered += deliver(index, question)
+                except Exception:
+                    pass
+                finally:
+                    await batch.aclose()
+        # Fall back to single-question generation for whatever the batch missed
+        await asyncio.gather(*(generate_slot(index) for _ in range(size - delivered)))
+    
+    async def generate_all() -> None:
+        sizes = [min(batch_size, count - start) for start in range(0, count, batch_size)]
+        try:
+            await asyncio.gather(*(generate_batch(index, size) for index, size in enumerate(sizes)))
+        finally:
+            results.put_nowait(None)
+    
+    producer = asyncio.create_task(generate_all())
+    try:
+        while True:
+            item = await results.get()
+            if item is None:
+                break
+            yield item
+        await producer
+    finally:
+        producer.cancel()
+
+async def stream_questions(client: LLMBackend, topic: str, difficulty_level: int, count: int) -> AsyncIterator[QuestionBase]:
+    """
+    Generate questions concurrently, yielding each one as soon as it is ready.
+
+    Same batching, retry and dedupe behaviour as generate_questions, but in
+    completion order, so the first question is available after one partial
+    completion instead of after the whole session.
+    """
+    tagged = _generate_tagged(client, topic, difficulty_level, count)
+    try:
+        async for _, question in tagged:
+            yield question
+    finally:
+        await tagged.aclose()
+
+async def generate_questions(client: LLMBackend, topic: str, difficulty_level: int, count: int) -> List[QuestionBase]:
+    """
+    Generate several questions concurrently, preserving batch order.
+
+    See `_generate_tagged` for how requests are batched, retried and deduped.
+    """
+    results = []
+    tagged = _generate_tagged(client, topic, difficulty_level, count)
+    try:
+        async for index, question in tagged:
+            results.append((index, question))
+    finally:
+        await tagged.aclose()
+    if count and not results:
+        raise Exception("Error generating questions: all generation attempts failed")
+    results.sort(key=lambda item: item[0])
+    return [question for _, question in results]
+
+def parse_verdict(content: str) -> Optional[bool]:
+    """Read a 'true'/'false' reply; None if the model said anything else."""
+    return {"true": True, "false": False}.get(content.strip().strip(string.punctuation + " ").lower())
+
+async def validate_answer(client: LLMBackend, question: str, correct_answer: str, user_answer: str) -> bool:
     """
     Validate a user's answer using OpenAI's GPT model.
+
+    Runs on the validation tier; a reply other than true/false is retried on
+    the next model in models_for(TASK_VALIDATE_ANSWER), and counts as
+    incorrect if the last model gives one too.
     """
     prompt = f"""Given the following question and answers, determine if the user's answer is correct.
     Question: {question}
@@ -53,26 +453,36 @@ async def validate_answer(question: str, correct_answer: str, user_answer: str)
     """
     
     try:
-        response = await openai.ChatCompletion.acreate(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an expert answer validator for LLM and AI topics."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=10
-        )
-        
-        # Parse the response and return the boolean result
-        result = response.choices[0].message.content.strip().lower()
-        return result == "true"
+        models = models_for(TASK_VALIDATE_ANSWER)
+        for model in models:
+            content = await _chat_completion(
+                client,
+                TASK_VALIDATE_ANSWER,
+                "You are an expert answer validator for LLM and AI topics.",
+                prompt,
+                temperature=0.3,
+                max_tokens=10,
+                model=model,
+                cacheable=True,
+                usable=lambda content: parse_verdict(content) is not None,
+                escalated=model != models[-1]
+            )
+            
+            # Parse the response and return the boolean result
+            verdict = parse_verdict(content)
+            if verdict is not None:
+                return verdict
+        return False
     
     except Exception as e:
         raise Exception(f"Error validating answer: {str(e)}")
 
-async def generate_explanation(question: str, answer: str) -> str:
+async def generate_explanation(client: LLMBackend, question: str, answer: str) -> str:
     """
     Generate a detailed explanation for a question and answer.
+
+    Runs on the explanation tier; an empty reply is retried on the next
+    model in models_for(TASK_GENERATE_EXPLANATION).
     """
     prompt = f"""Generate a detailed explanation for the following question and answer:
     Question: {question}
@@ -85,17 +495,22 @@ async def generate_explanation(question: str, answer: str) -> str:
     """
     
     try:
-        response = await openai.ChatCompletion.acreate(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an expert teacher explaining LLM and AI concepts."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=500
-        )
-        
-        return response.choices[0].message.content
+        models = models_for(TASK_GENERATE_EXPLANATION)
+        for model in models:
+            content = await _chat_completion(
+                client,
+                TASK_GENERATE_EXPLANATION,
+                "You are an expert teacher explaining LLM and AI concepts.",
+                prompt,
+                temperature=0.7,
+                max_tokens=500,
+                model=model,
+                cacheable=True,
+                escalated=model != models[-1]
+            )
+            if content.strip():
+                return content
+        return content
     
     except Exception as e:
         raise Exception(f"Error generating explanation: {str(e)}") 
\ No newline at end of file
@@ -0,0 +1,141 @@
+from typing import Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from .llm_backend import (
+    TASK_GENERATE_EXPLANATION,
+    TASK_GENERATE_QUESTION,
+    TASK_GENERATE_QUESTIONS,
+    TASK_VALIDATE_ANSWER
+)
+from .rate_limiter import estimate_tokens
+
+# Model tiers
+FAST = "fast"
+STRONG = "strong"
+
+# USD per million (prompt, completion) tokens, matched by the longest model name prefix
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4": (30.00, 60.00),
+    "gpt-3.5-turbo": (0.50, 1.50)
+}
+
+def tier_model(tier: str) -> str:
+    if tier == FAST:
+        return settings.LLM_FAST_MODEL
+    if tier == STRONG:
+        return settings.LLM_STRONG_MODEL
+    raise ValueError(f"Unknown model tier: {tier!r}")
+
+def task_tier(task: str) -> str:
+    """The configured tier for one of the llm_backend.TASK_* names."""
+    tiers = {
+        TASK_GENERATE_QUESTION: settings.LLM_GENERATION_TIER,
+        TASK_GENERATE_QUESTIONS: settings.LLM_GENERATION_TIER,
+        TASK_VALIDATE_ANSWER: settings.LLM_VALIDATION_TIER,
+        TASK_GENERATE_EXPLANATION: settings.LLM_EXPLANATION_TIER
+    }
+    return tiers.get(task, STRONG)
+
+def models_for(task: str) -> List[str]:
+    """
+    Models to try for `task`, in order: its tier's model, then, with
+    LLM_ESCALATION_ENABLED, the strong model for when that output fails
+    validation.
+    """
+    models = [tier_model(task_tier(task))]
+    if settings.LLM_ESCALATION_ENABLED and settings.LLM_STRONG_MODEL not in models:
+        models.append(settings.LLM_STRONG_MODEL)
+    return models
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """USD cost of a call by MODEL_PRICES, or None for a model without a price."""
+    for prefix in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model.startswith(prefix):
+            prompt_price, completion_price = MODEL_PRICES[prefix]
+            return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+    return None
+
+class _CallStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.invalid = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "invalid": self.invalid,
+            "average_latency_ms": round(self.total_latency / self.calls * 1000, 3) if self.calls else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 3),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost, 6)
+        }
+
+class ModelMetrics:
+    """
+    Latency, token and cost totals per task and model, plus how often each
+    task escalated to a stronger model.
+
+    Tokens are estimated from text length the same way the rate limiter
+    does, so costs are approximate but comparable between models.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[str, str], _CallStats] = {}
+        self._escalations: Dict[str, int] = {}
+
+    def _stats(self, task: str, model: str) -> _CallStats:
+        return self._calls.setdefault((task, model), _CallStats())
+
+    def record(
+        self,
+        task: str,
+        model: str,
+        duration: float,
+        messages: List[Dict[str, str]],
+        completion: str,
+        failed: bool = False
+    ) -> None:
+        """Record one upstream call and what it returned."""
+        stats = self._stats(task, model)
+        prompt_tokens = estimate_tokens(messages, 0)
+        completion_tokens = len(completion) // 4
+        stats.calls += 1
+        stats.errors += failed
+        stats.total_latency += duration
+        stats.max_latency = max(stats.max_latency, duration)
+        stats.prompt_tokens += prompt_tokens
+        stats.completion_tokens += completion_tokens
+        stats.cost += estimate_cost(model, prompt_tokens, completion_tokens) or 0.0
+
+    def record_invalid(self, task: str, model: str, escalated: bool) -> None:
+        """Record output that failed validation and whether a stronger model was tried next."""
+        self._stats(task, model).invalid += 1
+        if escalated:
+            self._escalations[task] = self._escalations.get(task, 0) + 1
+
+    def reset(self) -> None:
+        self._calls.clear()
+        self._escalations.clear()
+
+    def stats(self) -> Dict:
+        tasks: Dict[str, Dict] = {}
+        for (task, model), stats in sorted(self._calls.items()):
+            entry = tasks.setdefault(task, {"escalations": 0, "models": {}})
+            entry["models"][model] = stats.as_dict()
+        for task, escalations in self._escalations.items():
+            tasks.setdefault(task, {"escalations": 0, "models": {}})["escalations"] = escalations
+        return tasks
+
+# Process-wide metrics for every call llm_service makes
+llm_metrics = ModelMetrics()
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence, Set, Tuple
+from fastapi import Request
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..models.quiz import Question, Topic
+from ..schemas.quiz import QuestionBase
+from .circuit_breaker import circuit_open
+from .llm_backend import LLMBackend
+from .llm_service import generate_questions, generation_variant
+from .rate_limiter import PRIORITY_BACKGROUND, llm_priority
+
+logger = logging.getLogger(__name__)
+
+PoolKey = Tuple[int, int]  # (topic_id, difficulty_level)
+
+def build_question(topic_id: int, question_data: QuestionBase, served_at: Optional[datetime] = None) -> Question:
+    """
+    Build a Question row from a generated question.
+    """
+    return Question(topic_id=topic_id, served_at=served_at, **question_data.model_dump())
+
+async def take_questions(db: AsyncSession, topic_id: int, difficulty_level: int, count: int) -> List[Question]:
+    """
+    Claim up to `count` unserved questions from the pool, oldest first.
+
+    The claimed rows are stamped with served_at but not committed; the caller
+    commits them together with any freshly generated questions. On Postgres
+    concurrent sessions skip each other's locked rows instead of double-serving.
+    """
+    result = await db.execute(select(Question).where(
+        Question.topic_id == topic_id,
+        Question.difficulty_level == difficulty_level,
+        Question.served_at.is_(None)
+    ).order_by(Question.id).limit(count).with_for_update(skip_locked=True))
+    questions = list(result.scalars().all())
+
+    now = datetime.utcnow()
+    for question in questions:
+        question.served_at = now
+    return questions
+
+async def reuse_questions(
+    db: AsyncSession,
+    topic_id: int,
+    difficulty_level: int,
+    count: int,
+    exclude: Sequence[int] = ()
+) -> List[Question]:
+    """
+    Pick up to `count` questions that were already served, least recently
+    served first, for sessions that cannot wait for new ones to be generated.
+
+    The picked rows are stamped with served_at so the next degraded session
+    gets different ones; the caller commits.
+    """
+    statement = select(Question).where(
+        Question.topic_id == topic_id,
+        Question.difficulty_level == difficulty_level,
+        Question.served_at.is_not(None)
+    )
+    if exclude:
+        statement = statement.where(Question.id.not_in(exclude))
+    result = await db.execute(statement.order_by(Question.served_at, Question.id).limit(count))
+    questions = list(result.scalars().all())
+
+    now = datetime.utcnow()
+    for question in questions:
+        question.served_at = now
+    return questions
+
+async def count_available(db: AsyncSession, topic_id: int, difficulty_level: int) -> int:
+    """
+    Count the unserved questions in the pool for a topic and difficulty.
+    """
+    return await db.scalar(select(func.count(Question.id)).where(
+        Question.topic_id == topic_id,
+        Question.difficulty_level == difficulty_level,
+        Question.served_at.is_(None)
+    ))
+
+async def refill_pool(client: LLMBackend, db: AsyncSession, topic: Topic, difficulty_level: int) -> int:
+    """
+    Top the pool up to QUESTION_POOL_TARGET if it is below QUESTION_POOL_LOW_WATER.
+
+    Returns the number of questions added. Refills never share a completion
+    with a quiz session generating at the same time, which would stock the
+    pool with copies of questions that were just served.
+    """
+    available = await count_available(db, topic.id, difficulty_level)
+    # Do not hold a pooled connection while waiting on the LLM
+    await db.commit()
+    if available >= settings.QUESTION_POOL_LOW_WATER:
+        return 0
+
+    variant = generation_variant.set("pool")
+    try:
+        generated = await generate_questions(
+            client,
+            topic=topic.name,
+            difficulty_level=difficulty_level,
+            count=settings.QUESTION_POOL_TARGET - available
+        )
+    finally:
+        generation_variant.reset(variant)
+    db.add_all([build_question(topic.id, question_data) for question_data in generated])
+    await db.commit()
+    return len(generated)
+
+class QuestionPoolWorker:
+    """
+    Background task that keeps the question pool stocked.
+
+    Every QUESTION_POOL_REFILL_INTERVAL seconds the worker checks each topic at
+    its default difficulty. Keys passed to `notify` (typically right after a
+    session drew from the pool) are checked immediately.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession], client: LLMBackend):
+        self.session_factory = session_factory
+        self.client = client
+        self._pending: Set[PoolKey] = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self, topic_id: int, difficulty_level: int) -> None:
+        """Ask the worker to check a (topic, difficulty) pool soon."""
+        self._pending.add((topic_id, difficulty_level))
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        # Refills yield the LLM rate limit to calls a user is waiting on
+        llm_priority.set(PRIORITY_BACKGROUND)
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.QUESTION_POOL_REFILL_INTERVAL)
+                sweep = False
+            except asyncio.TimeoutError:
+                sweep = True
+            self._wakeup.clear()
+
+            keys, self._pending = self._pending, set()
+            try:
+                await self._refill(keys, sweep)
+            except Exception:
+                # e.g. the database is restarting; keep the keys and try again next pass
+                self._pending |= keys
+                logger.exception("Question pool refill pass failed")
+
+    async def _refill(self, keys: Set[PoolKey], sweep: bool) -> None:
+        if circuit_open(self.client):
+            # Keep the keys for when the LLM is back instead of failing each one
+            self._pending |= keys
+            return
+        async with self.session_factory() as db:
+            if sweep:
+                for topic in (await db.execute(select(Topic))).scalars():
+                    keys.add((topic.id, topic.difficulty_level))
+            for topic_id, difficulty_level in sorted(keys):
+                topic = await db.get(Topic, topic_id)
+                if topic is None:
+                    continue
+                try:
+                    await refill_pool(self.client, db, topic, difficulty_level)
+                except Exception:
+                    await db.rollback()
+                    logger.exception("Failed to refill question pool for topic %s", topic_id)
+
+def get_question_pool_worker(request: Request) -> Optional[QuestionPoolWorker]:
+    """Dependency returning the app's pool worker, if one is running."""
+    return getattr(request.app.state, "question_pool_worker", None)
@@ -0,0 +1,196 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, and_, case, cast, delete, false, func, insert, literal, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.quiz import Question, UserResponse, UserTopicStats
+from ..schemas.quiz import QuizResult, QuizResultBreakdown
+
+# Dialect-specific INSERTs that support ON CONFLICT DO UPDATE
+_INSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+# Values of the `dimension` column in the aggregate query
+OVERALL = "overall"
+BY_DIFFICULTY = "difficulty"
+BY_DAY = "day"
+
+def _aggregate(user_id: int, topic_id: int, dimension: str, key=None):
+    """
+    SELECT one aggregate row per `key` (a single row when key is None).
+    """
+    key_column = literal("") if key is None else cast(key, String)
+    statement = select(
+        literal(dimension).label("dimension"),
+        key_column.label("key"),
+        func.count(UserResponse.id).label("total_questions"),
+        func.coalesce(func.sum(case((UserResponse.is_correct, 1), else_=0)), 0).label("correct_answers"),
+        func.coalesce(func.avg(UserResponse.response_time), 0).label("average_response_time")
+    ).select_from(UserResponse).join(
+        Question, UserResponse.question_id == Question.id
+    ).where(
+        Question.topic_id == topic_id,
+        UserResponse.user_id == user_id
+    )
+    if key is not None:
+        statement = statement.group_by(key)
+    return statement
+
+async def aggregate_results(
+    db: AsyncSession,
+    user_id: int,
+    topic_id: int,
+    by_difficulty: bool = False,
+    by_day: bool = False
+) -> Optional[QuizResult]:
+    """
+    Summarise a user's answers for a topic without loading them.
+
+    The totals and the requested breakdowns are UNION ALLed into one query,
+    so there is a single round trip and the result size depends only on the
+    number of difficulty levels and days. Returns None if nothing was answered.
+    """
+    statements = [_aggregate(user_id, topic_id, OVERALL)]
+    if by_difficulty:
+        statements.append(_aggregate(user_id, topic_id, BY_DIFFICULTY, Question.difficulty_level))
+    if by_day:
+        statements.append(_aggregate(user_id, topic_id, BY_DAY, func.date(UserResponse.created_at)))
+
+    rows = (await db.execute(union_all(*statements))).all()
+    breakdowns = {BY_DIFFICULTY: [], BY_DAY: []}
+    overall = None
+    for row in rows:
+        if row.dimension == OVERALL:
+            overall = row
+        else:
+            breakdowns[row.dimension].append(QuizResultBreakdown(
+                key=row.key or "",
+                total_questions=row.total_questions,
+                correct_answers=row.correct_answers,
+                average_response_time=float(row.average_response_time)
+            ))
+
+    if overall is None or not overall.total_questions:
+        return None
+
+    return QuizResult(
+        total_questions=overall.total_questions,
+        correct_answers=overall.correct_answers,
+        average_response_time=float(overall.average_response_time),
+        topic_id=topic_id,
+        completed_at=datetime.utcnow(),
+        by_difficulty=sorted(breakdowns[BY_DIFFICULTY], key=lambda b: b.key) if by_difficulty else None,
+        by_day=sorted(breakdowns[BY_DAY], key=lambda b: b.key) if by_day else None
+    )
+
+async def record_answer(
+    db: AsyncSession,
+    user_id: int,
+    topic_id: int,
+    is_correct: bool,
+    response_time: int,
+    answered_at: Optional[datetime] = None
+) -> None:
+    """
+    Fold one answer into the user's stats for the topic.
+
+    Call it in the transaction that inserts the UserResponse; it does not
+    commit. A single INSERT ... ON CONFLICT DO UPDATE creates or increments
+    the row, so concurrent answers (even the first ones) cannot lose updates.
+    """
+    upsert = _INSERT_DIALECTS[db.get_bind().dialect.name]
+    response_time = response_time or 0
+    statement = upsert(UserTopicStats).values(
+        user_id=user_id,
+        topic_id=topic_id,
+        attempts=1,
+        correct=1 if is_correct else 0,
+        total_response_time=response_time,
+        streak=1 if is_correct else 0,
+        last_seen=answered_at or datetime.utcnow()
+    )
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[UserTopicStats.user_id, UserTopicStats.topic_id],
+        set_={
+            "attempts": UserTopicStats.attempts + 1,
+            "correct": UserTopicStats.correct + statement.excluded.correct,
+            "total_response_time": UserTopicStats.total_response_time + response_time,
+            "streak": UserTopicStats.streak + 1 if is_correct else 0,
+            "last_seen": statement.excluded.last_seen,
+        }
+    ))
+
+def stats_to_result(stats: UserTopicStats) -> QuizResult:
+    """
+    Build the results payload from a stats row.
+    """
+    return QuizResult(
+        total_questions=stats.attempts,
+        correct_answers=stats.correct,
+        average_response_time=stats.total_response_time / stats.attempts,
+        topic_id=stats.topic_id,
+        completed_at=datetime.utcnow(),
+        streak=stats.streak,
+        last_seen=stats.last_seen
+    )
+
+async def rebuild_user_topic_stats(db: AsyncSession, user_id: Optional[int] = None, topic_id: Optional[int] = None) -> int:
+    """
+    Recompute user_topic_stats from user_responses, e.g. after a backfill.
+
+    Limit the rebuild with `user_id` and/or `topic_id`. Runs as one
+    DELETE plus one INSERT ... SELECT, so no responses are loaded into
+    Python. Does not commit. Returns the number of stats rows written.
+    """
+    filters = []
+    if user_id is not None:
+        filters.append(UserResponse.user_id == user_id)
+    if topic_id is not None:
+        filters.append(Question.topic_id == topic_id)
+
+    # The streak is every answer after the user's last wrong answer for the topic
+    last_wrong = select(
+        UserResponse.user_id,
+        Question.topic_id,
+        func.max(UserResponse.id).label("last_wrong_id")
+    ).join(
+        Question, UserResponse.question_id == Question.id
+    ).where(
+        func.coalesce(UserResponse.is_correct, false()).is_(false()),
+        *filters
+    ).group_by(UserResponse.user_id, Question.topic_id).subquery()
+
+    totals = select(
+        UserResponse.user_id,
+        Question.topic_id,
+        func.count(UserResponse.id),
+        func.sum(case((UserResponse.is_correct, 1), else_=0)),
+        func.coalesce(func.sum(UserResponse.response_time), 0),
+        func.sum(case((UserResponse.id > func.coalesce(last_wrong.c.last_wrong_id, 0), 1), else_=0)),
+        func.max(UserResponse.created_at)
+    ).join(
+        Question, UserResponse.question_id == Question.id
+    ).outerjoin(
+        last_wrong,
+        and_(
+            last_wrong.c.user_id == UserResponse.user_id,
+            last_wrong.c.topic_id == Question.topic_id
+        )
+    ).where(*filters).group_by(UserResponse.user_id, Question.topic_id)
+
+    stale = delete(UserTopicStats)
+    if user_id is not None:
+        stale = stale.where(UserTopicStats.user_id == user_id)
+    if topic_id is not None:
+        stale = stale.where(UserTopicStats.topic_id == topic_id)
+    await db.execute(stale)
+
+    result = await db.execute(insert(UserTopicStats).from_select(
+        ["user_id", "topic_id", "attempts", "correct", "total_response_time", "streak", "last_seen"],
+        totals
+    ))
+    return result.rowcount
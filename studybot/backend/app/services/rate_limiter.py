@@ -0,0 +1,239 @@
+import asyncio
+import heapq
+import itertools
+import re
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from ..core.config import settings
+
+# Admission priorities; lower values go first
+PRIORITY_INTERACTIVE = 0  # a user is waiting on this call (grading, explanations)
+PRIORITY_NORMAL = 1  # quiz session question generation
+PRIORITY_BACKGROUND = 2  # question pool refills
+
+# llm_backend.TASK_* names whose calls a user is waiting on
+INTERACTIVE_TASKS = {"validate_answer", "generate_explanation"}
+
+# Overrides the task-based priority for LLM calls made in this context,
+# e.g. the question pool worker marks all of its calls as background work
+llm_priority: ContextVar[Optional[int]] = ContextVar("llm_priority", default=None)
+
+def priority_for(task: str) -> int:
+    explicit = llm_priority.get()
+    if explicit is not None:
+        return explicit
+    return PRIORITY_INTERACTIVE if task in INTERACTIVE_TASKS else PRIORITY_NORMAL
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """
+    Tokens a call counts against the TPM budget: the prompt, at roughly four
+    characters per token plus per-message overhead, and the full completion
+    budget, which is what the API reserves when it admits the request.
+    """
+    prompt = sum(len(message["content"]) // 4 + 4 for message in messages) + 3
+    return prompt + max_tokens
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds in a rate-limit reset header such as "1s", "6m0s" or "20ms"."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+def _number(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+class TokenBucket:
+    """
+    A budget of `per_minute` units refilled continuously, holding at most
+    `burst_seconds` worth. A per_minute of 0 leaves the unit unmetered.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float):
+        self.burst_seconds = burst_seconds
+        self.configured = per_minute
+        self.set_limit(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def metered(self) -> bool:
+        return self.per_minute > 0
+
+    def set_limit(self, per_minute: float) -> None:
+        self.per_minute = per_minute
+        self.rate = per_minute / 60
+        self.capacity = self.rate * self.burst_seconds
+        self.level = min(getattr(self, "level", self.capacity), self.capacity)
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, floor: float = 0.0) -> float:
+        """
+        Seconds until `amount` can be taken leaving `floor` of the capacity
+        behind. Amounts larger than the bucket go through once it is full.
+        """
+        if not self.metered:
+            return 0.0
+        needed = min(amount + floor * self.capacity, self.capacity) - self.level
+        return max(0.0, needed / self.rate)
+
+    def take(self, amount: float) -> None:
+        if self.metered:
+            self.level -= amount
+
+    def give(self, amount: float) -> None:
+        if self.metered:
+            self.level = min(self.capacity, self.level + amount)
+
+class RateLimiter:
+    """
+    Admits LLM calls against requests-per-minute and tokens-per-minute budgets.
+
+    Callers wait in one queue ordered by priority, then arrival, and only the
+    head of the queue is admitted, so interactive calls overtake queued
+    background work. Background calls also leave `background_reserve` of
+    each budget untouched. With `adaptive` set, the x-ratelimit-* headers on
+    every response lower the budgets to the account's real limits and
+    remaining allowance, and a 429 pauses all admissions until the service
+    says the limit resets.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        burst_seconds: float = 10.0,
+        background_reserve: float = 0.2,
+        adaptive: bool = True
+    ):
+        self.requests = TokenBucket(requests_per_minute, burst_seconds)
+        self.tokens = TokenBucket(tokens_per_minute, burst_seconds)
+        self.background_reserve = background_reserve
+        self.adaptive = adaptive
+        self.admitted = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self._paused_until = 0.0
+        self._waiters: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._changed = asyncio.Event()
+
+    @classmethod
+    def from_settings(cls) -> "RateLimiter":
+        return cls(
+            requests_per_minute=settings.LLM_RATE_LIMIT_RPM,
+            tokens_per_minute=settings.LLM_RATE_LIMIT_TPM,
+            burst_seconds=settings.LLM_RATE_LIMIT_BURST,
+            background_reserve=settings.LLM_RATE_LIMIT_BACKGROUND_RESERVE,
+            adaptive=settings.LLM_RATE_LIMIT_ADAPTIVE
+        )
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _admission_delay(self, tokens: int, priority: int, now: float) -> float:
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        floor = self.background_reserve if priority >= PRIORITY_BACKGROUND else 0.0
+        return max(
+            self._paused_until - now,
+            self.requests.wait_time(1, floor),
+            self.tokens.wait_time(tokens, floor)
+        )
+
+    async def acquire(self, tokens: int, priority: int = PRIORITY_NORMAL) -> None:
+        """Wait until a call costing `tokens` fits the budgets, then charge it."""
+        ticket = (priority, next(self._sequence))
+        heapq.heappush(self._waiters, ticket)
+        started = time.monotonic()
+        try:
+            while True:
+                delay = None
+                if self._waiters[0] == ticket:
+                    now = time.monotonic()
+                    delay = self._admission_delay(tokens, priority, now)
+                    if delay <= 0:
+                        heapq.heappop(self._waiters)
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        self.admitted += 1
+                        self.total_wait += now - started
+                        self._notify()
+                        return
+                try:
+                    await asyncio.wait_for(self._changed.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            if ticket in self._waiters:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._notify()
+            raise
+
+    def refund(self, tokens: int) -> None:
+        """Return tokens charged by acquire that the call did not use."""
+        if tokens > 0:
+            self.tokens.give(tokens)
+            self._notify()
+
+    def observe(self, status_code: int, headers: Mapping[str, str]) -> None:
+        """Adapt the budgets to the rate-limit headers of an API response."""
+        if not self.adaptive:
+            return
+        now = time.monotonic()
+        for bucket, unit in ((self.requests, "requests"), (self.tokens, "tokens")):
+            limit = _number(headers.get(f"x-ratelimit-limit-{unit}"))
+            if limit:
+                # Never above the configured budget, which may leave room for other clients
+                target = min(limit, bucket.configured) if bucket.configured > 0 else limit
+                if target != bucket.per_minute:
+                    bucket.refill(now)
+                    bucket.set_limit(target)
+            remaining = _number(headers.get(f"x-ratelimit-remaining-{unit}"))
+            if remaining is not None and bucket.metered:
+                bucket.refill(now)
+                bucket.level = min(bucket.level, remaining)
+
+        if status_code == 429:
+            self.throttled += 1
+            pause = parse_duration(headers.get("retry-after")) or max(
+                parse_duration(headers.get("x-ratelimit-reset-requests")) or 0.0,
+                parse_duration(headers.get("x-ratelimit-reset-tokens")) or 0.0
+            ) or 1.0
+            self._paused_until = max(self._paused_until, now + pause)
+        self._notify()
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        return {
+            "requests_per_minute": self.requests.per_minute,
+            "tokens_per_minute": self.tokens.per_minute,
+            "requests_available": round(self.requests.level, 1),
+            "tokens_available": round(self.tokens.level),
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "throttled": self.throttled,
+            "average_wait_ms": round(self.total_wait / self.admitted * 1000, 3) if self.admitted else 0.0,
+            "paused_for_ms": round(max(0.0, self._paused_until - now) * 1000)
+        }
@@ -0,0 +1,110 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional
+
+class SharedStream:
+    """
+    Runs one async iterator and replays its items to every subscriber.
+
+    Subscribers that join late first receive what has already arrived. The
+    source is cancelled once the last subscriber leaves before it finishes.
+    """
+
+    def __init__(self, source: AsyncIterator):
+        self.items: List[Any] = []
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.closed = False
+        self._subscribers = 0
+        self._changed = asyncio.Event()
+        self.task = asyncio.create_task(self._run(source))
+
+    async def _run(self, source: AsyncIterator) -> None:
+        try:
+            async for item in source:
+                self.items.append(item)
+                self._notify()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+            await source.aclose()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self) -> AsyncIterator:
+        self._subscribers += 1
+        index = 0
+        try:
+            while True:
+                if index < len(self.items):
+                    index += 1
+                    yield self.items[index - 1]
+                elif self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                else:
+                    await self._changed.wait()
+        finally:
+            self._subscribers -= 1
+            if not self._subscribers and not self.done:
+                self.closed = True
+                self.task.cancel()
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+
+    Only calls in flight at the same moment are shared; once a call finishes
+    its key is forgotten, so this is not a cache. Keys must include anything
+    that makes results differ, including the backend they run on.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._streams: Dict[Hashable, SharedStream] = {}
+        self.flights = 0
+        self.shared = 0
+
+    async def call(self, key: Hashable, function: Callable[[], Awaitable]) -> Any:
+        """Await `function()`, or the run of it already in flight for `key`."""
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(function())
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._forget(self._calls, key, done))
+            self.flights += 1
+        else:
+            self.shared += 1
+        # A cancelled caller must not cancel the run other callers are waiting on
+        return await asyncio.shield(future)
+
+    def stream(self, key: Hashable, function: Callable[[], AsyncIterator]) -> AsyncIterator:
+        """Iterate `function()`, or subscribe to the run already in flight for `key`."""
+        shared = self._streams.get(key)
+        if shared is None or shared.done or shared.closed:
+            shared = SharedStream(function())
+            self._streams[key] = shared
+            shared.task.add_done_callback(lambda done: self._forget(self._streams, key, shared))
+            self.flights += 1
+        else:
+            self.shared += 1
+        return shared.subscribe()
+
+    @staticmethod
+    def _forget(flights: Dict, key: Hashable, flight) -> None:
+        if flights.get(key) is flight:
+            del flights[key]
+        # Nobody may be left to see the error; retrieve it so asyncio does not log it
+        if isinstance(flight, asyncio.Future) and not flight.cancelled():
+            flight.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "flights": self.flights,
+            "shared": self.shared,
+            "in_flight": len(self._calls) + len(self._streams)
+        }
@@ -0,0 +1,130 @@
+import re
+from typing import Any, List
+
+from pydantic import ValidationError
+
+from ..schemas.quiz import QuestionBase
+
+try:
+    import orjson
+
+    def loads(text: str) -> Any:
+        return orjson.loads(text)
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    import json
+
+    def loads(text: str) -> Any:
+        return json.loads(text)
+
+class StructuredOutputError(ValueError):
+    """Raised when model output cannot be turned into the expected schema."""
+
+_CODE_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+
+# Keys models commonly use instead of the schema's field names
+_FIELD_ALIASES = {
+    "question": "question_text",
+    "answer": "correct_answer",
+    "correct_option": "correct_answer",
+    "difficulty": "difficulty_level",
+}
+
+# Give up on a stream that has produced this much text without starting a JSON value
+MAX_PREAMBLE_CHARS = 200
+
+def repair_json(text: str) -> str:
+    """
+    Fix the formatting mistakes models make most often.
+
+    Strips Markdown code fences and any prose around the outermost JSON value,
+    straightens curly double quotes and removes trailing commas.
+    """
+    text = _CODE_FENCE.sub("", text.strip()).translate(_SMART_QUOTES)
+    starts = [index for index in (text.find("{"), text.find("[")) if index != -1]
+    if starts:
+        start = min(starts)
+        end = text.rfind("}" if text[start] == "{" else "]")
+        if end > start:
+            text = text[start:end + 1]
+    return _TRAILING_COMMA.sub(r"\1", text)
+
+def parse_json(text: str) -> Any:
+    """Parse JSON, retrying once on the repaired text."""
+    try:
+        return loads(text)
+    except ValueError:
+        pass
+    try:
+        return loads(repair_json(text))
+    except ValueError as e:
+        raise StructuredOutputError(f"Invalid response format: {e}")
+
+def to_question(data: Any) -> QuestionBase:
+    """Validate one decoded question object against QuestionBase."""
+    if not isinstance(data, dict):
+        raise StructuredOutputError("Invalid response format: expected a JSON object")
+    data = {_FIELD_ALIASES.get(key, key): value for key, value in data.items()}
+    try:
+        question = QuestionBase.model_validate(data)
+    except ValidationError as e:
+        raise StructuredOutputError(f"Invalid response format: {e}")
+    if not question.question_text.strip() or len(question.options) < 2 or not question.correct_answer.strip():
+        raise StructuredOutputError("Invalid response format: incomplete question")
+    return question
+
+def parse_question(text: str) -> QuestionBase:
+    """Parse a completion holding a single question."""
+    return to_question(parse_json(text))
+
+class JSONObjectStream:
+    """
+    Incremental scanner that pulls complete JSON objects out of streamed text.
+
+    Feed it chunks as they arrive; it returns the text of every object that
+    closed in that chunk. Objects that are items of an array are emitted as
+    soon as they close, so `[{...}, {...}]` and `{"questions": [{...}]}`
+    completions can be validated item by item before the stream finishes. A
+    top-level object with no such items is emitted whole.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._stack = []  # [opening char, start index] per open container
+        self._root_has_items = False
+        self._started = False
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> List[str]:
+        objects = []
+        offset = len(self.buffer)
+        self.buffer += chunk
+        for index in range(offset, len(self.buffer)):
+            char = self.buffer[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"' and self._stack:
+                self._in_string = True
+            elif char in "{[":
+                self._started = True
+                self._stack.append((char, index))
+            elif char in "}]" and self._stack:
+                opening, start = self._stack.pop()
+                if opening != "{":
+                    continue
+                parent = self._stack[-1][0] if self._stack else None
+                if parent == "[":
+                    self._root_has_items = True
+                    objects.append(self.buffer[start:index + 1])
+                elif parent is None and not self._root_has_items:
+                    objects.append(self.buffer[start:index + 1])
+        if not self._started and len(self.buffer) > MAX_PREAMBLE_CHARS:
+            raise StructuredOutputError("Invalid response format: no JSON in model output")
+        return objects
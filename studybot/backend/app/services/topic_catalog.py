@@ -0,0 +1,78 @@
+import bisect
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..core.http_cache import make_etag
+from ..core.pagination import decode_cursor, encode_cursor
+from ..models.quiz import Topic
+from ..schemas.quiz import Topic as TopicSchema
+
+class CatalogSnapshot:
+    """
+    Every topic as of one load, in (created_at, id) order.
+    """
+
+    def __init__(self, topics: List[TopicSchema]):
+        self.topics = topics
+        self.by_id: Dict[int, TopicSchema] = {topic.id: topic for topic in topics}
+        self.etag = make_etag([(topic.id, topic.updated_at) for topic in topics])
+        self.loaded_at = time.monotonic()
+        self._keys = [(topic.created_at, topic.id) for topic in topics]
+
+    def page(self, cursor: Optional[str], limit: int) -> Tuple[List[TopicSchema], Optional[str]]:
+        """Same pages and cursors as paginate() would return from the table."""
+        start = bisect.bisect_right(self._keys, decode_cursor(cursor)) if cursor is not None else 0
+        items = self.topics[start:start + limit]
+        if start + limit >= len(self.topics):
+            return items, None
+        return items, encode_cursor(items[-1].created_at, items[-1].id)
+
+class TopicCatalog:
+    """
+    In-process copy of the topics table.
+
+    Topics change rarely, so reads are answered from memory. The table is
+    reloaded after invalidate(), which the topic write routes call, or once
+    `ttl` seconds have passed, which bounds how long writes made by another
+    process go unseen.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.hits = 0
+        self.loads = 0
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._generation = 0
+
+    async def snapshot(self, db: AsyncSession) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.loaded_at < self.ttl:
+            self.hits += 1
+            return snapshot
+
+        # A write committed while this load runs must not be hidden by it
+        generation = self._generation
+        result = await db.execute(select(Topic).order_by(Topic.created_at, Topic.id))
+        snapshot = CatalogSnapshot([TopicSchema.model_validate(topic) for topic in result.scalars().all()])
+        self.loads += 1
+        if generation == self._generation:
+            self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self) -> None:
+        """Drop the snapshot; call after committing a topic change."""
+        self._generation += 1
+        self._snapshot = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "loads": self.loads,
+            "topics": len(self._snapshot.topics) if self._snapshot is not None else 0
+        }
+
+topic_catalog = TopicCatalog(settings.TOPIC_CACHE_TTL)
@@ -0,0 +1,114 @@
+"""
+Login throughput benchmark for the bcrypt thread pool.
+
+Sends concurrent logins while probing a cheap endpoint, once per worker count,
+to show login throughput scaling with cores while other requests stay fast.
+`--workers 0` verifies passwords inline on the event loop for comparison:
+
+    python scripts/benchmark_auth.py --logins 40 --concurrency 16 --workers 0 1 2 4
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=40, help="logins per run")
+    parser.add_argument("--concurrency", type=int, default=16, help="logins in flight at once")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4],
+                        help="bcrypt thread counts to compare; 0 hashes on the event loop")
+    parser.add_argument("--probe-interval-ms", type=float, default=10, help="gap between probe requests")
+    parser.add_argument("--database", default="sqlite:///./benchmark.db")
+    return parser.parse_args()
+
+def configure_environment(args: argparse.Namespace) -> None:
+    # Settings are read at import time, so these must be set before importing the app
+    os.environ.update({
+        "DATABASE_URL": args.database,
+        "LLM_BACKEND": "stub",
+        "QUESTION_POOL_WORKER_ENABLED": "false",
+        "AUTH_USER_CACHE_TTL": "0",
+    })
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+async def run(args: argparse.Namespace) -> None:
+    import httpx
+    from app.main import app
+    from app.core import auth
+    from app.core.database import SessionLocal
+    from app.core.migrations import upgrade_database
+    from app.core.password_pool import PasswordHashPool
+    from app.models.quiz import User
+
+    upgrade_database()
+    db = SessionLocal()
+    if db.query(User).filter(User.email == "login@example.com").first() is None:
+        db.add(User(email="login@example.com", hashed_password=auth.get_password_hash("benchmark"), full_name="Login"))
+        db.commit()
+    db.close()
+
+    verify_in_pool = auth.verify_password_async
+
+    async def verify_inline(plain_password: str, hashed_password: str) -> bool:
+        return auth.verify_password(plain_password, hashed_password)
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(app=app, base_url="http://benchmark", timeout=None) as client:
+            for workers in args.workers:
+                if workers:
+                    auth.password_hash_pool = PasswordHashPool(workers, max_queue=args.logins)
+                    auth.verify_password_async = verify_in_pool
+                else:
+                    auth.verify_password_async = verify_inline
+
+                semaphore = asyncio.Semaphore(args.concurrency)
+                done = asyncio.Event()
+                probes = []
+
+                async def login() -> None:
+                    async with semaphore:
+                        response = await client.post(
+                            "/api/users/token",
+                            data={"username": "login@example.com", "password": "benchmark"}
+                        )
+                        response.raise_for_status()
+
+                async def probe() -> None:
+                    # Latency is counted from when the probe was due, so time the
+                    # event loop spent blocked before sending it is included
+                    due = time.perf_counter()
+                    while not done.is_set():
+                        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                        await client.get("/")
+                        probes.append(time.perf_counter() - due)
+                        due = time.perf_counter() + args.probe_interval_ms / 1000
+
+                prober = asyncio.create_task(probe())
+                start = time.perf_counter()
+                await asyncio.gather(*(login() for _ in range(args.logins)))
+                elapsed = time.perf_counter() - start
+                done.set()
+                await prober
+
+                label = f"{workers} workers" if workers else "inline"
+                print(
+                    f"{label:>10}: {args.logins / elapsed:6.1f} logins/s, "
+                    f"probe p50 {percentile(probes, 0.50):6.1f} ms, p95 {percentile(probes, 0.95):6.1f} ms, "
+                    f"max {max(probes) * 1000:6.1f} ms, mean {statistics.mean(probes) * 1000:6.1f} ms"
+                )
+                if workers:
+                    auth.password_hash_pool.shutdown()
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    configure_environment(arguments)
+    asyncio.run(run(arguments))
@@ -0,0 +1,168 @@
+"""
+Throughput benchmark for the quiz endpoints using the offline stub LLM backend.
+
+Runs the app in-process against a scratch SQLite database, so it needs no
+OpenAI key and no running server:
+
+    python scripts/benchmark_quiz.py --requests 200 --concurrency 20 --latency-ms 300
+
+With --target-rps it doubles as a load test for the connection pool: it exits
+non-zero if an endpoint falls below the target or any pool checkout timed out.
+
+    python scripts/benchmark_quiz.py --database postgresql://... --pool-size 5 \
+        --max-overflow 5 --concurrency 50 --target-rps 100
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Awaitable, Callable, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100, help="session requests to send")
+    parser.add_argument("--concurrency", type=int, default=10, help="requests in flight at once")
+    parser.add_argument("--questions", type=int, default=10, help="questions per session")
+    parser.add_argument("--latency-ms", type=float, default=200, help="synthetic LLM latency")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="extra random LLM latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of LLM calls that fail")
+    parser.add_argument("--free-text-ratio", type=float, default=0.2,
+                        help="fraction of answers that need LLM grading")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database", default="sqlite:///./benchmark.db")
+    parser.add_argument("--pool-size", type=int, help="override DB_POOL_SIZE")
+    parser.add_argument("--max-overflow", type=int, help="override DB_MAX_OVERFLOW")
+    parser.add_argument("--pool-timeout", type=float, help="override DB_POOL_TIMEOUT")
+    parser.add_argument("--target-rps", type=float, help="fail unless every endpoint sustains this rate")
+    return parser.parse_args()
+
+def configure_environment(args: argparse.Namespace) -> None:
+    # Settings are read at import time, so these must be set before importing the app
+    os.environ.update({
+        "DATABASE_URL": args.database,
+        "LLM_BACKEND": "stub",
+        "STUB_LLM_LATENCY_MS": str(args.latency_ms),
+        "STUB_LLM_LATENCY_JITTER_MS": str(args.jitter_ms),
+        "STUB_LLM_ERROR_RATE": str(args.error_rate),
+        "STUB_LLM_SEED": str(args.seed),
+        "QUESTION_POOL_WORKER_ENABLED": "false",
+    })
+    for option, name in [("pool_size", "DB_POOL_SIZE"), ("max_overflow", "DB_MAX_OVERFLOW"), ("pool_timeout", "DB_POOL_TIMEOUT")]:
+        if getattr(args, option) is not None:
+            os.environ[name] = str(getattr(args, option))
+
+async def timed_batch(
+    count: int,
+    concurrency: int,
+    make_request: Callable[[int], Awaitable[int]]
+) -> List[float]:
+    """Run `count` requests with at most `concurrency` in flight; return latencies of the 2xx ones."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(index: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            status = await make_request(index)
+            if 200 <= status < 300:
+                latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(index) for index in range(count)))
+    return latencies
+
+def report(name: str, count: int, latencies: List[float], elapsed: float) -> float:
+    """Print latency stats and return the achieved requests per second."""
+    if not latencies:
+        print(f"{name}: all {count} requests failed")
+        return 0.0
+    ordered = sorted(latencies)
+    percentile = lambda p: ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+    print(
+        f"{name}: {len(latencies)}/{count} ok, {len(latencies) / elapsed:.1f} req/s, "
+        f"p50 {percentile(0.50):.0f} ms, p95 {percentile(0.95):.0f} ms, p99 {percentile(0.99):.0f} ms, "
+        f"mean {statistics.mean(latencies) * 1000:.0f} ms"
+    )
+    return len(latencies) / elapsed
+
+async def run(args: argparse.Namespace) -> bool:
+    import httpx
+    from app.main import app
+    from app.core.auth import create_access_token, get_password_hash
+    from app.core.database import SessionLocal, async_engine
+    from app.core.pool_metrics import pool_stats
+    from app.core.migrations import upgrade_database
+    from app.models.quiz import Topic, User
+    from app.services.llm_service import llm_flights
+    from app.services.model_routing import llm_metrics
+
+    upgrade_database()
+    db = SessionLocal()
+    user = db.query(User).filter(User.email == "benchmark@example.com").first()
+    if user is None:
+        user = User(email="benchmark@example.com", hashed_password=get_password_hash("benchmark"), full_name="Benchmark")
+        db.add(user)
+    topic = db.query(Topic).filter(Topic.name == "Benchmark Topic").first()
+    if topic is None:
+        topic = Topic(name="Benchmark Topic", description="Synthetic load", difficulty_level=3)
+        db.add(topic)
+    db.commit()
+    topic_id = topic.id
+    db.close()
+
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'benchmark@example.com'})}"}
+    questions = []
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(app=app, base_url="http://benchmark", timeout=None) as client:
+            async def start_session(index: int) -> int:
+                response = await client.post(
+                    "/api/quiz/session",
+                    headers=headers,
+                    json={"topic_id": topic_id, "number_of_questions": args.questions}
+                )
+                if response.status_code == 200:
+                    questions.extend(response.json())
+                return response.status_code
+
+            start = time.perf_counter()
+            latencies = await timed_batch(args.requests, args.concurrency, start_session)
+            rates = [report("POST /api/quiz/session", args.requests, latencies, time.perf_counter() - start)]
+
+            async def submit_answer(index: int) -> int:
+                question = questions[index]
+                free_text = (index * 7919 % 1000) / 1000 < args.free_text_ratio
+                response = await client.post(
+                    "/api/quiz/answer",
+                    headers=headers,
+                    json={
+                        "question_id": question["id"],
+                        "selected_answer": "I think it is the retrieval step" if free_text else question["options"][0],
+                        "response_time": 5
+                    }
+                )
+                return response.status_code
+
+            start = time.perf_counter()
+            latencies = await timed_batch(len(questions), args.concurrency, submit_answer)
+            rates.append(report("POST /api/quiz/answer", len(questions), latencies, time.perf_counter() - start))
+        
+        stats = pool_stats(async_engine.pool)
+    print(f"database pool: {stats}")
+    print(f"llm coalescing: {llm_flights.stats()}")
+    for task, task_stats in llm_metrics.stats().items():
+        print(f"llm {task}: {task_stats}")
+    
+    if args.target_rps is None:
+        return True
+    passed = min(rates) >= args.target_rps and not stats.get("timeouts")
+    print(f"target {args.target_rps:.1f} req/s: {'PASS' if passed else 'FAIL'}")
+    return passed
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    configure_environment(arguments)
+    sys.exit(0 if asyncio.run(run(arguments)) else 1)
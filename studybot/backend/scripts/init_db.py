@@ -2,13 +2,14 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.core.database import SessionLocal, engine
-from app.models.quiz import Base, Topic
+from app.core.database import SessionLocal
+from app.core.migrations import upgrade_database
+from app.models.quiz import Topic
 from app.core.config import settings
 
 def init_db():
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
+    # Create or upgrade all tables
+    upgrade_database()
     
     # Create a new session
     db = SessionLocal()
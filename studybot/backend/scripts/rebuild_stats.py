@@ -0,0 +1,33 @@
+"""
+Recompute the user_topic_stats summary table from user_responses.
+
+Run after backfilling or editing responses outside the API:
+
+    python scripts/rebuild_stats.py [--user-id ID] [--topic-id ID]
+"""
+import argparse
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import AsyncSessionLocal, async_engine
+from app.services.quiz_stats import rebuild_user_topic_stats
+
+async def rebuild_stats(user_id=None, topic_id=None):
+    async with AsyncSessionLocal() as db:
+        try:
+            rows = await rebuild_user_topic_stats(db, user_id=user_id, topic_id=topic_id)
+            await db.commit()
+            print(f"Rebuilt {rows} user topic stats rows")
+        except Exception as e:
+            print(f"Error rebuilding stats: {e}")
+            await db.rollback()
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=int)
+    parser.add_argument("--topic-id", type=int)
+    args = parser.parse_args()
+    asyncio.run(rebuild_stats(user_id=args.user_id, topic_id=args.topic_id))
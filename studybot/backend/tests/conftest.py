@@ -1,49 +1,234 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import tempfile
 import pytest
+import httpx
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
-from app.core.database import Base, get_db
+from app.core.auth import clear_user_cache, create_access_token
+from app.core.config import settings
+from app.core.database import Base, get_async_db, to_async_url
 from app.main import app
+from app.models.quiz import Topic, User
+from app.schemas.quiz import QuestionBase
+from app.services.llm_backend import get_llm_backend
+from app.services.llm_cache import LLMCache, LRUCache, get_llm_cache, set_llm_cache
+from app.services.llm_client import OpenAIBackend
+from app.services.topic_catalog import topic_catalog
 
-# Create test database
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# Keep the background pool refill away from the real database during tests
+settings.QUESTION_POOL_WORKER_ENABLED = False
+settings.GENERATION_JOB_WORKER_ENABLED = False
+# Tests build their schema with create_all on a scratch database
+settings.DB_SCHEMA_CHECK = False
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
+# Create test database. The app talks to it through aiosqlite while fixtures
+# seed and inspect it synchronously, so it has to be a file both can open.
+TEST_DATABASE_PATH = os.path.join(tempfile.mkdtemp(prefix="studybot-tests-"), "test.db")
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{TEST_DATABASE_PATH}"
+
+# Autocommit so fixture queries always see what the app just committed
+engine = create_engine(SQLALCHEMY_DATABASE_URL, isolation_level="AUTOCOMMIT")
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# NullPool: every test runs its own event loop, so connections must not outlive it
+async_engine = create_async_engine(to_async_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def make_question(text: str, difficulty_level: int = 3) -> QuestionBase:
+    """A valid generated question; import with `from conftest import make_question`."""
+    return QuestionBase(
+        question_text=text,
+        options=["A) one", "B) two", "C) three", "D) four"],
+        correct_answer="A",
+        explanation="Because.",
+        difficulty_level=difficulty_level
+    )
+
+@pytest.fixture(autouse=True)
+def llm_cache():
+    """Give every test an empty in-memory completion cache so cached replies do not leak between tests."""
+    previous = get_llm_cache()
+    cache = LLMCache(LRUCache(settings.LLM_CACHE_MAX_ENTRIES, settings.LLM_CACHE_TTL))
+    set_llm_cache(cache)
+    yield cache
+    set_llm_cache(previous)
+
 @pytest.fixture(scope="session")
 def db_engine():
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA journal_mode=WAL")
     Base.metadata.create_all(bind=engine)
     yield engine
     Base.metadata.drop_all(bind=engine)
 
 @pytest.fixture(scope="function")
 def db_session(db_engine):
-    connection = db_engine.connect()
-    transaction = connection.begin()
-    session = TestingSessionLocal(bind=connection)
+    session = TestingSessionLocal()
 
     yield session
 
     session.close()
-    transaction.rollback()
-    connection.close()
+    clear_user_cache()
+    topic_catalog.invalidate()
+    with db_engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+
+@pytest.fixture(scope="function")
+def run_db(db_session):
+    """
+    Call async services from a sync test: run_db(lambda db: service(db, ...))
+    awaits the call on a fresh AsyncSession and returns its result.
+    """
+    def run(work):
+        async def main():
+            async with TestingAsyncSessionLocal() as session:
+                return await work(session)
+        return asyncio.run(main())
+    return run
+
+@pytest.fixture(scope="function")
+def async_session_factory(db_session):
+    """Session factory for background workers under test."""
+    return TestingAsyncSessionLocal
+
+# Tables that grow with usage; a full scan of one of these is a missing index
+LARGE_TABLES = {"questions", "user_responses", "user_topic_stats", "generation_jobs"}
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+
+class QueryPlanAudit:
+    """
+    Runs EXPLAIN QUERY PLAN on every read/update statement the app issues
+    and records the ones that fully scan a large table.
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.full_scans = []
+        self._explain = sqlite3.connect(TEST_DATABASE_PATH, check_same_thread=False)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if executemany or not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            return
+        self.statements += 1
+        plan = self._explain.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        for row in plan:
+            match = _FULL_SCAN.match(row[-1])
+            if match and match.group(1) in LARGE_TABLES:
+                self.full_scans.append((row[-1], statement))
+
+    def close(self):
+        self._explain.close()
+
+@pytest.fixture(scope="function")
+def query_plan_audit(db_session):
+    """Fail the test if any query the app runs fully scans a large table."""
+    audit = QueryPlanAudit()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", audit.before_cursor_execute)
+    yield audit
+    event.remove(async_engine.sync_engine, "before_cursor_execute", audit.before_cursor_execute)
+    audit.close()
+    assert not audit.full_scans, "Full table scans:\n" + "\n\n".join(
+        f"{detail}\n  {statement}" for detail, statement in audit.full_scans
+    )
+
+class FakeOpenAIServer:
+    """
+    In-process stand-in for the OpenAI chat completions API.
+
+    Queue replies as strings (message content) or httpx.Response objects;
+    once the queue is empty `default_reply` is returned.
+    """
+
+    def __init__(self):
+        self.replies = []
+        self.default_reply = "true"
+        self.requests = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(json.loads(request.content))
+        reply = self.replies.pop(0) if self.replies else self.default_reply
+        if isinstance(reply, httpx.Response):
+            return reply
+        return httpx.Response(200, json={
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "gpt-4",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop"
+            }]
+        })
+
+def sse_response(content: str, chunk_size: int = 20) -> httpx.Response:
+    """
+    A streamed reply for FakeOpenAIServer: `content` encoded as an OpenAI
+    chat-completion event stream; import with `from conftest import sse_response`.
+    """
+    events = [
+        {"id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0, "model": "gpt-4-turbo",
+         "choices": [{"index": 0, "delta": {"content": content[start:start + chunk_size]}, "finish_reason": None}]}
+        for start in range(0, len(content), chunk_size)
+    ]
+    body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+    return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+@pytest.fixture(scope="function")
+def fake_openai():
+    return FakeOpenAIServer()
+
+@pytest.fixture(scope="function")
+def openai_backend(fake_openai):
+    return OpenAIBackend(
+        api_key="test-key",
+        transport=httpx.MockTransport(fake_openai.handle),
+        backoff_base=0
+    )
 
 @pytest.fixture(scope="function")
-def client(db_session):
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            pass
+def client(db_session, openai_backend):
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
 
-    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_llm_backend] = lambda: openai_backend
     with TestClient(app) as test_client:
         yield test_client
-    app.dependency_overrides.clear() 
\ No newline at end of file
+    app.dependency_overrides.clear() 
+
+@pytest.fixture(scope="function")
+def user(db_session):
+    user = User(email="quiz@example.com", hashed_password="test_password", full_name="Quiz User")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+@pytest.fixture(scope="function")
+def auth_headers(user):
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': user.email})}"}
+
+@pytest.fixture(scope="function")
+def topic(db_session):
+    topic = Topic(name="RAG Systems", description="Retrieval", difficulty_level=3)
+    db_session.add(topic)
+    db_session.commit()
+    return topic
+
+@pytest.fixture(scope="function")
+def single_question_generation(monkeypatch):
+    """
+    Skip the batched generation path, for tests that mock generate_question.
+    Opt a module in with pytestmark = pytest.mark.usefixtures("single_question_generation").
+    """
+    monkeypatch.setattr(settings, "QUESTION_BATCH_SIZE", 1)
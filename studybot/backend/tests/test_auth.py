@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.core import auth
+from app.core.auth import create_access_token
+from app.core.config import settings
+from app.core.password_pool import PasswordHashPool, PasswordPoolFullError
+from app.models.quiz import User
+
+def make_user(db_session: Session) -> dict:
+    user = User(email="cached@example.com", hashed_password="x", full_name="Cached User")
+    db_session.add(user)
+    db_session.commit()
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': user.email})}"}
+
+def test_authenticated_user_is_cached(client: TestClient, db_session: Session):
+    headers = make_user(db_session)
+
+    with patch.object(auth, "get_user_by_email", wraps=auth.get_user_by_email) as lookup:
+        for _ in range(3):
+            response = client.get("/api/users/me", headers=headers)
+            assert response.status_code == 200
+            assert response.json()["email"] == "cached@example.com"
+
+    assert lookup.await_count == 1
+
+def test_user_cache_disabled(client: TestClient, db_session: Session, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_USER_CACHE_TTL", 0)
+    headers = make_user(db_session)
+
+    with patch.object(auth, "get_user_by_email", wraps=auth.get_user_by_email) as lookup:
+        client.get("/api/users/me", headers=headers)
+        client.get("/api/users/me", headers=headers)
+
+    assert lookup.await_count == 2
+
+def test_update_user_invalidates_cache(client: TestClient, db_session: Session):
+    headers = make_user(db_session)
+    assert client.get("/api/users/me", headers=headers).json()["full_name"] == "Cached User"
+
+    response = client.put(
+        "/api/users/me",
+        headers=headers,
+        json={"email": "cached@example.com", "full_name": "Renamed User", "password": ""}
+    )
+
+    assert response.status_code == 200
+    assert client.get("/api/users/me", headers=headers).json()["full_name"] == "Renamed User"
+    db_session.expire_all()
+    assert db_session.query(User).filter(User.email == "cached@example.com").one().full_name == "Renamed User"
+
+def test_password_hash_pool_keeps_event_loop_free():
+    pool = PasswordHashPool(max_workers=2, max_queue=10)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        return await asyncio.gather(pool.run(time.sleep, 0.1), pool.run(time.sleep, 0.1), ticker())
+
+    start = time.perf_counter()
+    asyncio.run(main())
+
+    assert len(ticks) == 5 and ticks[-1] - start < 0.1
+    assert pool.stats()["completed"] == 2
+    pool.shutdown()
+
+def test_password_hash_pool_rejects_when_queue_is_full():
+    pool = PasswordHashPool(max_workers=1, max_queue=1)
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    async def main():
+        running = asyncio.ensure_future(pool.run(block))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        queued = asyncio.ensure_future(pool.run(len, "queued"))
+        await asyncio.sleep(0)
+        with pytest.raises(PasswordPoolFullError):
+            await pool.run(len, "rejected")
+        release.set()
+        await asyncio.gather(running, queued)
+
+    asyncio.run(main())
+
+    assert pool.stats()["rejected"] == 1
+    assert pool.stats()["completed"] == 2
+    pool.shutdown()
+
+def test_password_hash_pool_forgets_cancelled_waiters():
+    pool = PasswordHashPool(max_workers=1, max_queue=1)
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    async def main():
+        running = asyncio.ensure_future(pool.run(block))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        # The client goes away while its check is still waiting for a thread
+        abandoned = asyncio.ensure_future(pool.run(len, "abandoned"))
+        await asyncio.sleep(0)
+        abandoned.cancel()
+        await asyncio.gather(abandoned, return_exceptions=True)
+        assert pool.stats()["queued"] == 0
+        release.set()
+        await running
+        return await pool.run(len, "next")
+
+    assert asyncio.run(main()) == 4
+    assert pool.stats()["queued"] == 0
+    assert pool.stats()["rejected"] == 0
+    pool.shutdown()
+
+def test_register_and_login_hash_off_the_event_loop(client: TestClient, db_session: Session):
+    with patch.object(auth.password_hash_pool, "run", wraps=auth.password_hash_pool.run) as run:
+        response = client.post(
+            "/api/users/register",
+            json={"email": "bcrypt@example.com", "password": "s3cret-pass", "full_name": "Bcrypt User"}
+        )
+        assert response.status_code == 200
+        response = client.post(
+            "/api/users/token",
+            data={"username": "bcrypt@example.com", "password": "s3cret-pass"}
+        )
+
+    assert response.status_code == 200
+    assert response.json()["token_type"] == "bearer"
+    assert [call.args[0] for call in run.call_args_list] == [auth.get_password_hash, auth.verify_password]
+
+def test_full_password_pool_returns_503(client: TestClient):
+    with patch.object(auth.password_hash_pool, "run", AsyncMock(side_effect=PasswordPoolFullError())):
+        response = client.post(
+            "/api/users/register",
+            json={"email": "busy@example.com", "password": "s3cret-pass", "full_name": "Busy User"}
+        )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
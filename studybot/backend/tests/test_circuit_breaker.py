@@ -0,0 +1,178 @@
+import asyncio
+import httpx
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.main import app
+from app.models.quiz import Question, UserResponse
+from app.services.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitBreakerBackend,
+    CircuitOpenError
+)
+from app.services.llm_backend import get_llm_backend
+
+MESSAGES = [{"role": "user", "content": "Hi"}]
+
+def open_breaker(breaker: CircuitBreaker) -> CircuitBreaker:
+    for _ in range(breaker.min_calls):
+        breaker.record(0.0, True, False)
+    assert breaker.state == OPEN
+    return breaker
+
+@pytest.fixture
+def degraded_llm(client: TestClient, openai_backend):
+    """Route LLM calls through a breaker that is already open."""
+    backend = CircuitBreakerBackend(openai_backend, open_breaker(CircuitBreaker(min_calls=1)))
+    app.dependency_overrides[get_llm_backend] = lambda: backend
+    return backend
+
+def test_breaker_opens_on_failures_and_closes_after_a_good_trial():
+    breaker = CircuitBreaker(window=4, min_calls=4, failure_ratio=0.5, reset_timeout=60)
+    for failed in (False, True, False):
+        breaker.record(0.1, failed, breaker.before_call())
+    assert breaker.state == CLOSED
+
+    breaker.record(0.1, True, breaker.before_call())
+    assert breaker.state == OPEN and breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # Once the reset timeout has passed exactly one trial call goes through
+    breaker.opened_at -= 60
+    assert breaker.before_call() is True
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record(0.1, False, True)
+    assert breaker.state == CLOSED and not breaker.is_open
+    assert breaker.stats()["rejected"] == 2
+
+def test_failed_trial_reopens_the_breaker():
+    breaker = open_breaker(CircuitBreaker(min_calls=1, reset_timeout=60))
+    breaker.opened_at -= 60
+
+    breaker.record(0.1, True, breaker.before_call())
+
+    assert breaker.is_open
+    assert breaker.times_opened == 2
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker(min_calls=2, failure_ratio=1.0, slow_call=1.0)
+
+    breaker.record(1.5, False, False)
+    breaker.record(2.0, False, False)
+
+    assert breaker.state == OPEN
+
+def test_backend_fails_fast_once_open(fake_openai, openai_backend):
+    backend = CircuitBreakerBackend(openai_backend, CircuitBreaker(min_calls=2, failure_ratio=1.0))
+    fake_openai.default_reply = httpx.Response(500, json={"error": {"message": "down"}})
+
+    async def main():
+        for _ in range(2):
+            with pytest.raises(Exception):
+                await backend.chat(MESSAGES, "gpt-4", 0.0, 10)
+        attempts = len(fake_openai.requests)
+        with pytest.raises(CircuitOpenError):
+            await backend.chat(MESSAGES, "gpt-4", 0.0, 10)
+        with pytest.raises(CircuitOpenError):
+            async for _ in backend.stream(MESSAGES, "gpt-4", 0.0, 10):
+                pass
+        return attempts
+
+    assert asyncio.run(main()) == len(fake_openai.requests)
+
+def test_rejected_requests_do_not_open_the_breaker(fake_openai, openai_backend):
+    backend = CircuitBreakerBackend(openai_backend, CircuitBreaker(min_calls=1))
+    fake_openai.default_reply = httpx.Response(400, json={"error": {"message": "bad request"}})
+
+    with pytest.raises(Exception):
+        asyncio.run(backend.chat(MESSAGES, "gpt-4", 0.0, 10))
+
+    assert backend.breaker.state == CLOSED
+
+def test_answers_are_graded_strictly_while_open(
+    client: TestClient,
+    db_session: Session,
+    fake_openai,
+    degraded_llm,
+    auth_headers,
+    topic
+):
+    question = Question(
+        topic_id=topic.id,
+        question_text="What is the capital of France?",
+        options=[],
+        correct_answer="Paris",
+        explanation="",
+        difficulty_level=topic.difficulty_level
+    )
+    db_session.add(question)
+    db_session.commit()
+
+    right = client.post("/api/quiz/answer", headers=auth_headers, json={
+        "question_id": question.id, "selected_answer": "  paris.", "response_time": 3
+    })
+    paraphrase = client.post("/api/quiz/answer", headers=auth_headers, json={
+        "question_id": question.id, "selected_answer": "The city of Paris", "response_time": 3
+    })
+
+    assert right.status_code == 200 and right.json()["is_correct"] is True
+    assert paraphrase.status_code == 200 and paraphrase.json()["is_correct"] is False
+    assert {response.grading_method for response in db_session.query(UserResponse)} == {"degraded"}
+    assert fake_openai.requests == []
+
+def test_sessions_reuse_stored_questions_while_open(
+    client: TestClient,
+    db_session: Session,
+    fake_openai,
+    degraded_llm,
+    auth_headers,
+    topic
+):
+    served_at = datetime(2024, 1, 1)
+    db_session.add_all([
+        Question(
+            topic_id=topic.id,
+            question_text=f"Stored {n}?",
+            options=["A) yes", "B) no"],
+            correct_answer="A",
+            explanation="",
+            difficulty_level=topic.difficulty_level,
+            served_at=served_at
+        )
+        for n in range(3)
+    ])
+    db_session.commit()
+
+    response = client.post("/api/quiz/session", headers=auth_headers, json={"topic_id": topic.id, "number_of_questions": 2})
+
+    assert response.status_code == 200
+    assert [question["question_text"] for question in response.json()] == ["Stored 0?", "Stored 1?"]
+    assert fake_openai.requests == []
+
+    # The least recently served question goes out first next time
+    response = client.post("/api/quiz/session", headers=auth_headers, json={"topic_id": topic.id, "number_of_questions": 1})
+    assert [question["question_text"] for question in response.json()] == ["Stored 2?"]
+
+def test_session_without_stored_questions_is_unavailable_while_open(client: TestClient, degraded_llm, auth_headers, topic):
+    response = client.post("/api/quiz/session", headers=auth_headers, json={"topic_id": topic.id, "number_of_questions": 2})
+
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+def test_health_reports_breaker_state(client: TestClient, openai_backend, monkeypatch):
+    backend = CircuitBreakerBackend(openai_backend, open_breaker(CircuitBreaker(min_calls=1)))
+    monkeypatch.setattr(app.state, "llm_backend", backend)
+
+    health = client.get("/health").json()
+
+    assert health["llm_service"] == "degraded"
+    assert health["llm_circuit_breaker"]["state"] == OPEN
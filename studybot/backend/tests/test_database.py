@@ -0,0 +1,56 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc
+
+from app.core.config import settings
+from app.core.database import pool_options, to_async_url
+from app.core.pool_metrics import InstrumentedQueuePool, pool_stats
+
+def test_to_async_url():
+    assert to_async_url("postgresql://user:secret@db/quiz") == "postgresql+asyncpg://user:secret@db/quiz"
+    assert to_async_url("sqlite:///./quiz.db") == "sqlite+aiosqlite:///./quiz.db"
+    assert to_async_url("sqlite+aiosqlite:///./quiz.db") == "sqlite+aiosqlite:///./quiz.db"
+
+def test_pool_options_follow_settings(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 3)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 4)
+
+    options = pool_options("postgresql://db/quiz", InstrumentedQueuePool)
+
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert (options["pool_size"], options["max_overflow"]) == (3, 4)
+    assert options["pool_pre_ping"] is settings.DB_POOL_PRE_PING
+    assert options["pool_recycle"] == settings.DB_POOL_RECYCLE
+    assert pool_options("sqlite:///:memory:", InstrumentedQueuePool) == {}
+
+def test_pool_metrics_track_checkouts_overflow_and_timeouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.05
+    )
+    first = engine.connect()
+    second = engine.connect()
+
+    stats = pool_stats(engine.pool)
+    assert (stats["size"], stats["checked_out"], stats["overflow"]) == (1, 2, 1)
+    assert stats["checkouts"] == 2
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    stats = pool_stats(engine.pool)
+    assert stats["timeouts"] == 1
+    assert stats["max_wait_ms"] >= 50
+
+    first.close()
+    second.close()
+    assert pool_stats(engine.pool)["checked_out"] == 0
+    engine.dispose()
+
+def test_health_reports_pool(client: TestClient):
+    response = client.get("/health")
+
+    assert response.status_code == 200
+    assert {"checked_out", "overflow", "timeouts", "average_wait_ms"} <= response.json()["database_pool"].keys()
@@ -0,0 +1,159 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.quiz import GenerationJob, Question
+from app.services import llm_service
+from app.main import app
+from app.services.generation_jobs import (
+    GenerationJobWorker,
+    claim_jobs,
+    enqueue_job,
+    get_generation_job_worker,
+    run_job
+)
+from app.services.llm_backend import StubLLMBackend
+from conftest import make_question
+
+pytestmark = pytest.mark.usefixtures("single_question_generation")
+
+def test_idempotency_key_returns_the_same_session(client: TestClient, db_session: Session, auth_headers, topic):
+    mock_generate = AsyncMock(side_effect=[make_question("First"), make_question("Second")])
+    headers = {**auth_headers, "Idempotency-Key": "retry-me"}
+
+    with patch.object(llm_service, "generate_question", mock_generate):
+        first = client.post("/api/quiz/session", headers=headers, json={"topic_id": topic.id, "number_of_questions": 1})
+        second = client.post("/api/quiz/session", headers=headers, json={"topic_id": topic.id, "number_of_questions": 1})
+
+    assert first.json() == second.json()
+    assert mock_generate.await_count == 1
+    assert db_session.query(GenerationJob).count() == 1
+
+def test_failed_inline_generation_is_requeued_for_the_worker(
+    client: TestClient,
+    db_session: Session,
+    async_session_factory,
+    openai_backend,
+    auth_headers,
+    topic
+):
+    worker = GenerationJobWorker(async_session_factory, openai_backend)
+    app.dependency_overrides[get_generation_job_worker] = lambda: worker
+
+    with patch.object(llm_service, "generate_question", AsyncMock(side_effect=Exception("API Error"))):
+        response = client.post("/api/quiz/session", headers=auth_headers, json={"topic_id": topic.id, "number_of_questions": 1})
+
+    assert response.status_code == 202
+    job = db_session.query(GenerationJob).one()
+    assert response.headers["Location"] == f"/api/quiz/session/jobs/{job.id}"
+    assert (job.status, job.attempts) == ("queued", 1)
+    assert "all generation attempts failed" in job.last_error
+    assert job.run_after > datetime.utcnow()
+
+def test_failed_inline_generation_without_worker_returns_pooled_questions(
+    client: TestClient,
+    db_session: Session,
+    auth_headers,
+    topic
+):
+    pooled = Question(topic_id=topic.id, **make_question("Pooled").model_dump())
+    db_session.add(pooled)
+    db_session.commit()
+
+    with patch.object(llm_service, "generate_question", AsyncMock(side_effect=Exception("API Error"))):
+        response = client.post("/api/quiz/session", headers=auth_headers, json={"topic_id": topic.id, "number_of_questions": 2})
+
+    assert response.status_code == 502
+    job = db_session.query(GenerationJob).one()
+    assert (job.status, job.question_ids) == ("failed", [pooled.id])
+    db_session.refresh(pooled)
+    assert pooled.served_at is None
+
+def test_inline_job_runs_without_waiting_when_no_worker_would(client: TestClient, db_session: Session, auth_headers, topic):
+    with patch.object(llm_service, "generate_question", AsyncMock(return_value=make_question("Inline"))):
+        response = client.post(
+            "/api/quiz/session",
+            params={"wait": False},
+            headers=auth_headers,
+            json={"topic_id": topic.id, "number_of_questions": 1}
+        )
+
+    assert response.status_code == 200
+    assert [question["question_text"] for question in response.json()] == ["Inline"]
+    assert db_session.query(GenerationJob).one().status == "done"
+
+def test_worker_runs_queued_session_jobs(
+    client: TestClient,
+    db_session: Session,
+    async_session_factory,
+    monkeypatch,
+    auth_headers,
+    topic
+):
+    monkeypatch.setattr(settings, "GENERATION_JOB_EXECUTION", "worker")
+
+    response = client.post(
+        "/api/quiz/session",
+        params={"wait": False},
+        headers=auth_headers,
+        json={"topic_id": topic.id, "number_of_questions": 2}
+    )
+    assert response.status_code == 202
+    assert response.json()["status"] == "queued"
+    location = response.headers["location"]
+
+    worker = GenerationJobWorker(async_session_factory, StubLLMBackend())
+    assert asyncio.run(worker.run_next()) is True
+    assert asyncio.run(worker.run_next()) is False
+
+    job = client.get(location, headers=auth_headers).json()
+    assert (job["status"], job["attempts"]) == ("done", 1)
+    assert len(job["questions"]) == 2
+    assert db_session.query(Question).filter(Question.served_at.isnot(None)).count() == 2
+
+def test_jobs_are_claimed_once_and_reclaimed_after_the_lease(run_db, user, topic):
+    job, created = run_db(lambda db: enqueue_job(db, user.id, topic.id, 3, 2, []))
+    assert created
+
+    assert run_db(lambda db: claim_jobs(db, 5)) == [job.id]
+    assert run_db(lambda db: claim_jobs(db, 5)) == []
+
+    async def expire_lease(db):
+        claimed = await db.get(GenerationJob, job.id)
+        claimed.locked_until = datetime.utcnow() - timedelta(seconds=1)
+        await db.commit()
+
+    run_db(expire_lease)
+    assert run_db(lambda db: claim_jobs(db, 5)) == [job.id]
+
+def test_job_that_outlived_its_lease_pools_its_questions(run_db, db_session: Session, user, topic):
+    job, _ = run_db(lambda db: enqueue_job(db, user.id, topic.id, 3, 1, []))
+    run_db(lambda db: claim_jobs(db, 1))
+
+    async def generate_after_reclaim(*args, **kwargs):
+        # Another worker claims the job again while this one is still generating
+        db_session.query(GenerationJob).update({"locked_until": datetime.utcnow() + timedelta(seconds=60)})
+        db_session.commit()
+        return [make_question("Late")]
+
+    with patch("app.services.generation_jobs.generate_questions", generate_after_reclaim):
+        finished = run_db(lambda db: run_job(StubLLMBackend(), db, job.id))
+
+    assert (finished.status, finished.question_ids) == ("running", [])
+    assert db_session.query(Question).one().served_at is None
+
+def test_job_queries_use_indexes(client: TestClient, query_plan_audit, auth_headers, user, topic, run_db):
+    run_db(lambda db: enqueue_job(db, user.id, topic.id, 3, 2, []))
+    run_db(lambda db: claim_jobs(db, 1))
+
+    client.post(
+        "/api/quiz/session",
+        params={"wait": False},
+        headers={**auth_headers, "Idempotency-Key": "plan"},
+        json={"topic_id": topic.id, "number_of_questions": 1}
+    )
+    assert query_plan_audit.statements > 0
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock
+
+from app.models.quiz import Question
+from app.services import grading
+from app.services.grading import GRADED_LOCALLY, GRADED_BY_LLM, grade_answer, grade_locally, resolve_choice
+
+OPTIONS = ["A) Retrieval", "B) Fine-tuning", "C) Prompting", "D) Distillation"]
+
+def make_question(correct_answer: str = "A", options=OPTIONS) -> Question:
+    return Question(
+        question_text="What does the R in RAG stand for?",
+        options=options,
+        correct_answer=correct_answer,
+        explanation="Retrieval Augmented Generation",
+        difficulty_level=3
+    )
+
+@pytest.mark.parametrize("answer", ["A", "a", " A) ", "(A)", "A.", "A) Retrieval", "retrieval", "Retrieval."])
+def test_resolve_choice_accepts_letter_and_option_text(answer):
+    assert resolve_choice(answer, OPTIONS) == "A"
+
+@pytest.mark.parametrize("answer", ["", "Retrieval Augmented Generation", "E", "B) Retrieval"])
+def test_resolve_choice_rejects_unknown_or_ambiguous(answer):
+    assert resolve_choice(answer, OPTIONS) is None
+
+def test_resolve_choice_without_letter_prefixes():
+    assert resolve_choice("Fine-tuning", ["Retrieval", "Fine-tuning"]) == "B"
+    assert resolve_choice("b)", ["Retrieval", "Fine-tuning"]) == "B"
+
+def test_grade_locally():
+    question = make_question()
+    assert grade_locally(question, "A) Retrieval") is True
+    assert grade_locally(question, "c") is False
+    assert grade_locally(question, "It retrieves documents") is None
+
+def test_grade_locally_with_full_text_correct_answer():
+    assert grade_locally(make_question(correct_answer="B) Fine-tuning"), "B") is True
+
+def test_grade_answer_fast_path_skips_llm():
+    mock_validate = AsyncMock()
+    with patch.object(grading, "validate_answer", mock_validate):
+        grade = asyncio.run(grade_answer(None, make_question(), "Prompting"))
+
+    assert grade.is_correct is False
+    assert grade.method == GRADED_LOCALLY
+    mock_validate.assert_not_awaited()
+
+def test_grade_answer_escalates_free_text():
+    mock_validate = AsyncMock(return_value=True)
+    with patch.object(grading, "validate_answer", mock_validate):
+        grade = asyncio.run(grade_answer(None, make_question(), "Retrieving documents first"))
+
+    assert grade.is_correct is True
+    assert grade.method == GRADED_BY_LLM
+    mock_validate.assert_awaited_once()
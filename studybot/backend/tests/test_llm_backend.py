@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+
+from app.core.config import settings
+from app.services import llm_service
+from app.services.circuit_breaker import CircuitBreakerBackend
+from app.services.llm_backend import StubLLMBackend, StubLLMError, create_llm_backend
+from app.services.llm_client import OpenAIBackend
+
+def test_stub_generates_schema_valid_questions():
+    backend = StubLLMBackend()
+
+    question = asyncio.run(llm_service.generate_question(backend, "RAG Systems", 4))
+
+    assert question.difficulty_level == 4
+    assert len(question.options) == 4
+    assert question.correct_answer in "ABCD"
+    assert "RAG Systems" in question.question_text
+
+def test_stub_is_deterministic_for_a_seed():
+    async def generate(seed):
+        backend = StubLLMBackend(seed=seed, latency_jitter_ms=1)
+        return [await llm_service.generate_question(backend, "RAG Systems", 3) for _ in range(3)]
+
+    first = asyncio.run(generate(7))
+    assert first == asyncio.run(generate(7))
+    assert len({q.question_text for q in first}) == 3
+
+def test_stub_validates_answers():
+    backend = StubLLMBackend()
+
+    assert asyncio.run(llm_service.validate_answer(backend, "Q?", "B", "b")) is True
+    assert asyncio.run(llm_service.validate_answer(backend, "Q?", "B", "C")) is False
+
+def test_stub_injects_errors():
+    backend = StubLLMBackend(error_rate=1.0)
+
+    with pytest.raises(StubLLMError):
+        asyncio.run(backend.chat([{"role": "user", "content": "Hi"}], "gpt-4", 0.3, 10))
+
+@pytest.mark.parametrize("name, backend_type", [("stub", StubLLMBackend), ("openai", OpenAIBackend)])
+def test_create_llm_backend_uses_setting(monkeypatch, name, backend_type):
+    monkeypatch.setattr(settings, "LLM_BACKEND", name)
+
+    backend = create_llm_backend()
+
+    assert isinstance(backend, CircuitBreakerBackend)
+    assert isinstance(backend.backend, backend_type)
+    asyncio.run(backend.aclose())
+
+def test_create_llm_backend_without_breaker(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_BACKEND", "stub")
+    monkeypatch.setattr(settings, "LLM_BREAKER_ENABLED", False)
+
+    assert isinstance(create_llm_backend(), StubLLMBackend)
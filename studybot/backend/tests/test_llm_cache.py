@@ -0,0 +1,92 @@
+import asyncio
+import threading
+
+from app.core.config import settings
+from app.services import llm_service
+from app.services.llm_cache import LLMCache, LRUCache, SQLiteCache, make_cache_key
+
+def test_make_cache_key_normalizes_whitespace():
+    assert make_cache_key("What  is\n RAG?", model="gpt-4") == make_cache_key("What is RAG?", model="gpt-4")
+    assert make_cache_key("What is RAG?", model="gpt-4") != make_cache_key("What is RAG?", model="gpt-3.5-turbo")
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2, ttl=60)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+
+    assert cache.get("a") == "1"
+    assert cache.get("b") is None
+    assert cache.get("c") == "3"
+
+def test_lru_cache_expires_entries():
+    cache = LRUCache(max_entries=2, ttl=0)
+    cache.set("a", "1")
+
+    assert cache.get("a") is None
+
+def test_disk_tier_survives_new_memory_tier(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite")
+    asyncio.run(LLMCache(LRUCache(10, 60), SQLiteCache(path, 60)).set("key", "true"))
+
+    cache = LLMCache(LRUCache(10, 60), SQLiteCache(path, 60))
+    assert asyncio.run(cache.get("key")) == "true"
+    assert asyncio.run(cache.get("key")) == "true"
+    assert cache.stats() == {"hits": 2, "disk_hits": 1, "misses": 0}
+
+def test_disk_tier_runs_off_the_event_loop_thread():
+    class RecordingTier(LRUCache):
+        threads = set()
+
+        def get(self, key):
+            self.threads.add(threading.get_ident())
+            return super().get(key)
+
+        def set(self, key, value):
+            self.threads.add(threading.get_ident())
+            super().set(key, value)
+
+    cache = LLMCache(LRUCache(10, 60), RecordingTier(10, 60))
+
+    async def main():
+        await cache.set("key", "true")
+        await cache.get("other")
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(main())
+    assert RecordingTier.threads and loop_thread not in RecordingTier.threads
+
+def test_disk_tier_deletes_expired_rows(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite")
+    expired = SQLiteCache(path, ttl=-1, sweep_every=3)
+    for key in ["a", "b"]:
+        expired.set(key, "stale")
+    assert len(expired) == 2
+
+    # Every third write sweeps
+    expired.set("c", "stale")
+    assert len(expired) == 0
+    expired.set("d", "stale")
+    expired.close()
+
+    # So does opening the file again
+    assert len(SQLiteCache(path, ttl=60)) == 0
+
+def test_validate_answer_uses_cache(fake_openai, openai_backend, llm_cache):
+    fake_openai.default_reply = "true"
+
+    for _ in range(3):
+        assert asyncio.run(llm_service.validate_answer(openai_backend, "What is RAG?", "A", "A")) is True
+    assert len(fake_openai.requests) == 1
+    assert llm_cache.stats() == {"hits": 2, "disk_hits": 0, "misses": 1}
+
+def test_unusable_replies_are_not_cached(fake_openai, openai_backend, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_ESCALATION_ENABLED", False)
+    fake_openai.replies = ["It depends"]
+    fake_openai.default_reply = "true"
+
+    assert asyncio.run(llm_service.validate_answer(openai_backend, "Is it cached?", "A", "A")) is False
+    # The unusable verdict was not stored, so the model is asked again
+    assert asyncio.run(llm_service.validate_answer(openai_backend, "Is it cached?", "A", "A")) is True
+    assert len(fake_openai.requests) == 2
@@ -0,0 +1,61 @@
+import asyncio
+import httpx
+import openai
+import pytest
+
+def test_chat_returns_message_content(fake_openai, openai_backend):
+    fake_openai.replies = ["Hello"]
+
+    result = asyncio.run(openai_backend.chat(
+        messages=[{"role": "user", "content": "Hi"}],
+        model="gpt-4",
+        temperature=0.3,
+        max_tokens=10
+    ))
+
+    assert result == "Hello"
+    assert fake_openai.requests[0]["model"] == "gpt-4"
+    assert fake_openai.requests[0]["max_tokens"] == 10
+
+def test_chat_retries_rate_limits_and_server_errors(fake_openai, openai_backend):
+    fake_openai.replies = [
+        httpx.Response(429, json={"error": {"message": "Rate limited"}}),
+        httpx.Response(503, json={"error": {"message": "Unavailable"}}),
+        "true",
+    ]
+
+    result = asyncio.run(openai_backend.chat(
+        messages=[{"role": "user", "content": "Hi"}],
+        model="gpt-4",
+        temperature=0.3,
+        max_tokens=10
+    ))
+
+    assert result == "true"
+    assert len(fake_openai.requests) == 3
+
+def test_chat_does_not_retry_client_errors(fake_openai, openai_backend):
+    fake_openai.replies = [httpx.Response(400, json={"error": {"message": "Bad request"}})]
+
+    with pytest.raises(openai.BadRequestError):
+        asyncio.run(openai_backend.chat(
+            messages=[{"role": "user", "content": "Hi"}],
+            model="gpt-4",
+            temperature=0.3,
+            max_tokens=10
+        ))
+
+    assert len(fake_openai.requests) == 1
+
+def test_chat_gives_up_after_max_retries(fake_openai, openai_backend):
+    fake_openai.default_reply = httpx.Response(500, json={"error": {"message": "Boom"}})
+
+    with pytest.raises(openai.InternalServerError):
+        asyncio.run(openai_backend.chat(
+            messages=[{"role": "user", "content": "Hi"}],
+            model="gpt-4",
+            temperature=0.3,
+            max_tokens=10
+        ))
+
+    assert len(fake_openai.requests) == openai_backend.max_retries + 1
@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.database import Base, to_async_url
+from app.core.migrations import SchemaVersionError, alembic_config, check_schema_version, head_revision
+
+@pytest.fixture
+def database_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'migrations.db'}"
+
+def check(database_url: str) -> None:
+    async def run():
+        engine = create_async_engine(to_async_url(database_url))
+        try:
+            await check_schema_version(engine)
+        finally:
+            await engine.dispose()
+    asyncio.run(run())
+
+def test_migrations_match_models(database_url):
+    command.upgrade(alembic_config(database_url), "head")
+    engine = create_engine(database_url)
+
+    with engine.connect() as connection:
+        assert compare_metadata(MigrationContext.configure(connection), Base.metadata) == []
+    engine.dispose()
+    check(database_url)
+
+def test_schema_check_rejects_outdated_database(database_url):
+    command.upgrade(alembic_config(database_url), "0001")
+
+    with pytest.raises(SchemaVersionError, match=f"revision 0001, expected {head_revision()}"):
+        check(database_url)
+
+def test_schema_check_rejects_unmigrated_database(database_url):
+    with pytest.raises(SchemaVersionError, match="revision none"):
+        check(database_url)
+
+def test_downgrade_to_base(database_url):
+    config = alembic_config(database_url)
+    command.upgrade(config, "head")
+    command.downgrade(config, "base")
+    engine = create_engine(database_url)
+
+    assert inspect(engine).get_table_names() == ["alembic_version"]
+    engine.dispose()
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import pytest
+
+from app.core.config import settings
+from app.services import llm_service
+from app.services.model_routing import estimate_cost, llm_metrics, models_for
+
+VALID_QUESTION = json.dumps({
+    "question_text": "What does RAG retrieve?",
+    "options": ["A) Documents", "B) Weights", "C) Gradients", "D) Tokens"],
+    "correct_answer": "A",
+    "explanation": "Retrieval-augmented generation looks up documents.",
+    "difficulty_level": 2
+})
+
+class ScriptedBackend:
+    """Replies with a fixed completion per model and records the models called."""
+
+    def __init__(self, replies, latency=0.0):
+        self.replies = replies
+        self.latency = latency
+        self.models = []
+
+    async def chat(self, messages, model, temperature, max_tokens, timeout=None, task="chat", json_mode=False):
+        self.models.append(model)
+        await asyncio.sleep(self.latency)
+        return self.replies[model]
+
+    async def stream(self, messages, model, temperature, max_tokens, timeout=None, task="chat", json_mode=False):
+        self.models.append(model)
+        yield self.replies[model]
+
+    async def aclose(self):
+        pass
+
+@pytest.fixture(autouse=True)
+def routing(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_FAST_MODEL", "gpt-4o-mini")
+    monkeypatch.setattr(settings, "LLM_STRONG_MODEL", "gpt-4-turbo")
+    monkeypatch.setattr(settings, "LLM_COALESCING_ENABLED", False)
+    llm_metrics.reset()
+    yield
+    llm_metrics.reset()
+
+def test_tasks_route_to_their_tiers(monkeypatch):
+    assert models_for("validate_answer") == ["gpt-4o-mini", "gpt-4-turbo"]
+    assert models_for("generate_explanation") == ["gpt-4o-mini", "gpt-4-turbo"]
+    assert models_for("generate_questions") == ["gpt-4-turbo"]
+
+    monkeypatch.setattr(settings, "LLM_ESCALATION_ENABLED", False)
+    assert models_for("validate_answer") == ["gpt-4o-mini"]
+
+def test_validation_stays_on_the_fast_model_when_its_reply_is_valid(fake_openai, openai_backend):
+    fake_openai.replies = ["False."]
+
+    assert asyncio.run(llm_service.validate_answer(openai_backend, "Fast tier?", "yes", "no")) is False
+    assert [request["model"] for request in fake_openai.requests] == ["gpt-4o-mini"]
+
+    stats = llm_metrics.stats()["validate_answer"]
+    assert stats["escalations"] == 0
+    assert stats["models"]["gpt-4o-mini"]["calls"] == 1
+    assert stats["models"]["gpt-4o-mini"]["cost_usd"] > 0
+
+def test_invalid_validation_reply_escalates_to_the_strong_model(fake_openai, openai_backend):
+    fake_openai.replies = ["It depends", "true"]
+
+    assert asyncio.run(llm_service.validate_answer(openai_backend, "Escalate?", "yes", "yes")) is True
+    assert [request["model"] for request in fake_openai.requests] == ["gpt-4o-mini", "gpt-4-turbo"]
+
+    stats = llm_metrics.stats()["validate_answer"]
+    assert stats["escalations"] == 1
+    assert stats["models"]["gpt-4o-mini"]["invalid"] == 1
+    assert stats["models"]["gpt-4-turbo"]["calls"] == 1
+
+def test_invalid_reply_shared_by_coalesced_calls_is_counted_once(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_COALESCING_ENABLED", True)
+    backend = ScriptedBackend({"gpt-4o-mini": "It depends", "gpt-4-turbo": "true"}, latency=0.01)
+
+    async def main():
+        return await asyncio.gather(*(
+            llm_service.validate_answer(backend, "Shared?", "yes", "yes") for _ in range(3)
+        ))
+
+    assert asyncio.run(main()) == [True, True, True]
+    assert backend.models == ["gpt-4o-mini", "gpt-4-turbo"]
+    stats = llm_metrics.stats()["validate_answer"]
+    assert stats["escalations"] == 1
+    assert stats["models"]["gpt-4o-mini"]["invalid"] == 1
+
+def test_invalid_question_on_the_fast_tier_escalates(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_GENERATION_TIER", "fast")
+    backend = ScriptedBackend({"gpt-4o-mini": "Sorry, I cannot help with that.", "gpt-4-turbo": VALID_QUESTION})
+
+    question = asyncio.run(llm_service.generate_question(backend, "RAG Systems", 2))
+
+    assert question.question_text == "What does RAG retrieve?"
+    assert backend.models == ["gpt-4o-mini", "gpt-4-turbo"]
+    stats = llm_metrics.stats()["generate_question"]
+    assert stats["escalations"] == 1
+    # Non-JSON output is a rejected answer, not a failed call
+    assert stats["models"]["gpt-4o-mini"]["errors"] == 0
+
+def test_estimate_cost_matches_the_longest_prefix():
+    assert estimate_cost("gpt-4o-mini-2024-07-18", 1_000_000, 0) == pytest.approx(0.15)
+    assert estimate_cost("gpt-4", 0, 1_000_000) == pytest.approx(60.0)
+    assert estimate_cost("my-local-model", 1000, 1000) is None
@@ -0,0 +1,62 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.quiz import Topic, User, UserResponse
+from app.core.auth import create_access_token
+from app.services.question_pool import build_question
+from app.services.quiz_stats import rebuild_user_topic_stats
+from conftest import make_question
+from tests.test_quiz import QUESTION_TEXTS
+
+def seed(db_session: Session):
+    user = User(email="plans@example.com", hashed_password="x", full_name="Plan User")
+    topic = Topic(name="Query Plans", description="", difficulty_level=3)
+    db_session.add_all([user, topic])
+    db_session.commit()
+    questions = [build_question(topic.id, make_question(text)) for text in QUESTION_TEXTS]
+    db_session.add_all(questions)
+    db_session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': user.email})}"}
+    return user, topic, questions, headers
+
+def test_quiz_endpoints_use_indexes(client: TestClient, db_session: Session, query_plan_audit):
+    user, topic, questions, headers = seed(db_session)
+
+    assert client.post(
+        "/api/quiz/session",
+        headers=headers,
+        json={"topic_id": topic.id, "number_of_questions": 2}
+    ).status_code == 200
+    assert client.post(
+        "/api/quiz/answer",
+        headers=headers,
+        json={"question_id": questions[0].id, "selected_answer": "A", "response_time": 3}
+    ).status_code == 200
+    assert client.post(
+        "/api/quiz/answers:batch",
+        headers=headers,
+        json={"answers": [
+            {"question_id": question.id, "selected_answer": "B", "response_time": 2}
+            for question in questions[1:3]
+        ]}
+    ).status_code == 200
+    assert client.get(f"/api/quiz/results/{topic.id}", headers=headers).status_code == 200
+    assert client.get(
+        f"/api/quiz/results/{topic.id}?by_difficulty=true&by_day=true",
+        headers=headers
+    ).status_code == 200
+    page = client.get(f"/api/quiz/questions/{topic.id}", params={"limit": 2}).json()
+    assert client.get(
+        f"/api/quiz/questions/{topic.id}",
+        params={"limit": 2, "cursor": page["next_cursor"]}
+    ).status_code == 200
+
+    assert query_plan_audit.statements > 0
+
+def test_scoped_stats_rebuild_uses_indexes(db_session: Session, run_db, query_plan_audit):
+    user, topic, questions, headers = seed(db_session)
+    db_session.add(UserResponse(user_id=user.id, question_id=questions[0].id, selected_answer="A",
+                                is_correct=True, response_time=1))
+    db_session.commit()
+
+    run_db(lambda db: rebuild_user_topic_stats(db, user_id=user.id))
@@ -1 +1,370 @@
- 
\ No newline at end of file
+import asyncio
+import json
+import pytest
+from datetime import datetime
+from unittest.mock import patch, AsyncMock
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.quiz import Question, UserResponse
+from app.core.config import settings
+from app.services import llm_service
+from app.services.llm_backend import StubLLMBackend
+from app.services.question_pool import QuestionPoolWorker, build_question, count_available, refill_pool
+from conftest import make_question, sse_response
+
+QUESTION_TEXTS = [
+    "What does the retriever return in RAG?",
+    "Why are documents chunked before embedding?",
+    "Which metric compares two embeddings?",
+    "When should search results be reranked?",
+    "How does temperature change sampling?",
+]
+
+# Most tests here mock generate_question, so skip the batched path
+pytestmark = pytest.mark.usefixtures("single_question_generation")
+
+def test_generate_questions_preserves_order():
+    calls = []
+
+    async def ordered_generate(client, topic, difficulty_level):
+        slot = len(calls)
+        calls.append(slot)
+        # Later slots finish first so ordering relies on gather, not completion
+        await asyncio.sleep(0.01 * (5 - slot))
+        return make_question(QUESTION_TEXTS[slot])
+
+    with patch.object(llm_service, "generate_question", side_effect=ordered_generate):
+        result = asyncio.run(llm_service.generate_questions(None, "RAG Systems", 3, 5))
+
+    assert [q.question_text for q in result] == QUESTION_TEXTS
+
+def test_generate_questions_retries_failed_slots():
+    mock_generate = AsyncMock(side_effect=[
+        Exception("API Error"),
+        make_question("Recovered"),
+    ])
+
+    with patch.object(llm_service, "generate_question", mock_generate):
+        result = asyncio.run(llm_service.generate_questions(None, "RAG Systems", 3, 1))
+
+    assert [q.question_text for q in result] == ["Recovered"]
+    assert mock_generate.await_count == 2
+
+def test_generate_questions_all_failed():
+    mock_generate = AsyncMock(side_effect=Exception("API Error"))
+
+    with patch.object(llm_service, "generate_question", mock_generate):
+        with pytest.raises(Exception) as exc_info:
+            asyncio.run(llm_service.generate_questions(None, "RAG Systems", 3, 2))
+
+    assert "all generation attempts failed" in str(exc_info.value)
+
+def test_generate_questions_batches_calls(monkeypatch):
+    monkeypatch.setattr(settings, "QUESTION_BATCH_SIZE", 5)
+    backend = StubLLMBackend()
+
+    result = asyncio.run(llm_service.generate_questions(backend, "RAG Systems", 3, 10))
+
+    assert len(result) == 10
+    assert backend.calls == 2
+
+def test_generate_questions_backfills_invalid_batch_entries(monkeypatch):
+    monkeypatch.setattr(settings, "QUESTION_BATCH_SIZE", 3)
+    async def partial_batch(client, topic, difficulty_level, count):
+        yield make_question("Batched 0")
+        yield make_question("Batched 1")
+
+    mock_generate = AsyncMock(return_value=make_question("Single"))
+
+    with patch.object(llm_service, "iter_question_batch", partial_batch), \
+            patch.object(llm_service, "generate_question", mock_generate):
+        result = asyncio.run(llm_service.generate_questions(None, "RAG Systems", 3, 3))
+
+    assert [q.question_text for q in result] == ["Batched 0", "Batched 1", "Single"]
+    assert mock_generate.await_count == 1
+
+def test_generate_question_batch_skips_invalid_and_duplicate_entries(fake_openai, openai_backend):
+    valid = make_question("What does the retriever return in RAG?").model_dump()
+    content = json.dumps({"questions": [
+        valid,
+        {"question_text": "Missing options"},
+        {**valid, "question_text": "What does the retriever return in RAG"},
+        make_question("Which index type suits cosine search?").model_dump(),
+    ]})
+    fake_openai.replies = [sse_response(content)]
+
+    result = asyncio.run(llm_service.generate_question_batch(openai_backend, "RAG Systems", 3, 4))
+
+    assert [q.question_text for q in result] == [
+        "What does the retriever return in RAG?",
+        "Which index type suits cosine search?"
+    ]
+
+def test_start_quiz_session(client: TestClient, db_session: Session, auth_headers, topic):
+    mock_generate = AsyncMock(side_effect=[make_question(text) for text in QUESTION_TEXTS[:3]])
+
+    with patch.object(llm_service, "generate_question", mock_generate):
+        response = client.post(
+            "/api/quiz/session",
+            headers=auth_headers,
+            json={"topic_id": topic.id, "number_of_questions": 3}
+        )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [q["question_text"] for q in data] == QUESTION_TEXTS[:3]
+    assert db_session.query(Question).filter(Question.topic_id == topic.id).count() == 3
+
+def test_start_quiz_session_generation_failure(client: TestClient, auth_headers, topic):
+    mock_generate = AsyncMock(side_effect=Exception("API Error"))
+
+    with patch.object(llm_service, "generate_question", mock_generate):
+        response = client.post(
+            "/api/quiz/session",
+            headers=auth_headers,
+            json={"topic_id": topic.id, "number_of_questions": 2}
+        )
+
+    assert response.status_code == 502
+
+def test_start_quiz_session_serves_pool_first(client: TestClient, db_session: Session, run_db, auth_headers, topic):
+    pooled = [
+        build_question(topic.id, make_question(f"Pooled {i}", topic.difficulty_level))
+        for i in range(2)
+    ]
+    db_session.add_all(pooled)
+    db_session.commit()
+    mock_generate = AsyncMock(return_value=make_question("Fresh", topic.difficulty_level))
+
+    with patch.object(llm_service, "generate_question", mock_generate):
+        response = client.post(
+            "/api/quiz/session",
+            headers=auth_headers,
+            json={"topic_id": topic.id, "number_of_questions": 3}
+        )
+
+    assert response.status_code == 200
+    assert [q["question_text"] for q in response.json()] == ["Pooled 0", "Pooled 1", "Fresh"]
+    assert mock_generate.await_count == 1
+    assert run_db(lambda db: count_available(db, topic.id, topic.difficulty_level)) == 0
+
+def test_refill_pool_tops_up_below_low_water(run_db, topic):
+    mock_generate = AsyncMock(side_effect=[make_question(text, topic.difficulty_level) for text in QUESTION_TEXTS])
+
+    with patch.object(llm_service, "generate_question", mock_generate), \
+            patch.object(settings, "QUESTION_POOL_TARGET", 4), \
+            patch.object(settings, "QUESTION_POOL_LOW_WATER", 2):
+        added = run_db(lambda db: refill_pool(None, db, topic, topic.difficulty_level))
+        assert added == 4
+        # Stock is now above the low-water mark, so nothing more is generated
+        assert run_db(lambda db: refill_pool(None, db, topic, topic.difficulty_level)) == 0
+
+    assert run_db(lambda db: count_available(db, topic.id, topic.difficulty_level)) == 4
+
+def test_refill_pool_never_shares_a_session_completion(async_session_factory, monkeypatch, topic):
+    monkeypatch.setattr(settings, "QUESTION_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "QUESTION_POOL_TARGET", 2)
+    backend = StubLLMBackend(latency_ms=50)
+
+    async def main():
+        async with async_session_factory() as db:
+            await asyncio.gather(
+                llm_service.generate_questions(backend, topic.name, topic.difficulty_level, 2),
+                refill_pool(backend, db, topic, topic.difficulty_level)
+            )
+
+    asyncio.run(main())
+    assert backend.calls == 2
+
+def test_pool_worker_survives_a_failed_refill_pass(caplog):
+    def session_factory():
+        raise ConnectionError("database is restarting")
+
+    async def main():
+        worker = QuestionPoolWorker(session_factory, None)
+        worker.start()
+        worker.notify(1, 3)
+        await asyncio.sleep(0.05)
+        alive = not worker._task.done()
+        await worker.stop()
+        return alive, worker._pending
+
+    alive, pending = asyncio.run(main())
+    assert alive
+    # The failed keys are kept for the next pass
+    assert pending == {(1, 3)}
+    assert "refill pass failed" in caplog.text
+
+def test_submit_answer_grades_locally(client: TestClient, db_session: Session, auth_headers, topic):
+    question = build_question(topic.id, make_question("Which is first?"))
+    db_session.add(question)
+    db_session.commit()
+    mock_validate = AsyncMock()
+
+    with patch("app.services.grading.validate_answer", mock_validate):
+        response = client.post(
+            "/api/quiz/answer",
+            headers=auth_headers,
+            json={"question_id": question.id, "selected_answer": "A) one", "response_time": 4}
+        )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["is_correct"] is True
+    assert data["grading_method"] == "local"
+    mock_validate.assert_not_awaited()
+
+def test_submit_answers_batch(client: TestClient, db_session: Session, auth_headers, topic):
+    questions = [build_question(topic.id, make_question(f"Question {i}")) for i in range(3)]
+    db_session.add_all(questions)
+    db_session.commit()
+    mock_validate = AsyncMock(return_value=True)
+
+    with patch("app.services.grading.validate_answer", mock_validate):
+        response = client.post(
+            "/api/quiz/answers:batch",
+            headers=auth_headers,
+            json={"answers": [
+                {"question_id": questions[0].id, "selected_answer": "A", "response_time": 3},
+                {"question_id": questions[1].id, "selected_answer": "B) two", "response_time": 5},
+                {"question_id": questions[2].id, "selected_answer": "the first one", "response_time": 7},
+            ]}
+        )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [r["is_correct"] for r in data] == [True, False, True]
+    assert [r["grading_method"] for r in data] == ["local", "local", "llm"]
+    assert mock_validate.await_count == 1
+    assert db_session.query(UserResponse).count() == 3
+
+def test_submit_answers_batch_unknown_question(client: TestClient, db_session: Session, auth_headers):
+    response = client.post(
+        "/api/quiz/answers:batch",
+        headers=auth_headers,
+        json={"answers": [{"question_id": 999, "selected_answer": "A", "response_time": 3}]}
+    )
+
+    assert response.status_code == 404
+    assert db_session.query(UserResponse).count() == 0
+
+def test_stream_quiz_session(client: TestClient, db_session: Session, auth_headers, topic):
+    db_session.add(build_question(topic.id, make_question(QUESTION_TEXTS[0], topic.difficulty_level)))
+    db_session.commit()
+    mock_generate = AsyncMock(side_effect=[make_question(text) for text in QUESTION_TEXTS[1:3]])
+
+    with patch.object(llm_service, "generate_question", mock_generate):
+        response = client.post(
+            "/api/quiz/session/stream",
+            headers=auth_headers,
+            json={"topic_id": topic.id, "number_of_questions": 3}
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [e["type"] for e in events] == ["question", "question", "question", "done"]
+    assert events[0]["question"]["question_text"] == QUESTION_TEXTS[0]
+    assert {e["question"]["question_text"] for e in events[1:3]} == set(QUESTION_TEXTS[1:3])
+    assert all(e["question"]["id"] for e in events[:3])
+    assert db_session.query(Question).filter(Question.topic_id == topic.id).count() == 3
+
+def test_stream_quiz_session_generation_failure(client: TestClient, auth_headers, topic):
+    mock_generate = AsyncMock(side_effect=Exception("API Error"))
+
+    with patch.object(llm_service, "generate_question", mock_generate):
+        response = client.post(
+            "/api/quiz/session/stream",
+            headers=auth_headers,
+            json={"topic_id": topic.id, "number_of_questions": 2}
+        )
+
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events == [{"type": "error", "detail": "Error generating questions: all generation attempts failed"}]
+
+def test_quiz_results_aggregates_in_sql(client: TestClient, db_session: Session, auth_headers, user, topic):
+    easy = build_question(topic.id, make_question(QUESTION_TEXTS[0], difficulty_level=1))
+    hard = build_question(topic.id, make_question(QUESTION_TEXTS[1], difficulty_level=4))
+    db_session.add_all([easy, hard])
+    db_session.commit()
+    db_session.add_all([
+        UserResponse(user_id=user.id, question_id=easy.id, selected_answer="A", is_correct=True,
+                     response_time=2, created_at=datetime(2024, 5, 1, 9)),
+        UserResponse(user_id=user.id, question_id=easy.id, selected_answer="B", is_correct=False,
+                     response_time=4, created_at=datetime(2024, 5, 1, 18)),
+        UserResponse(user_id=user.id, question_id=hard.id, selected_answer="A", is_correct=True,
+                     response_time=9, created_at=datetime(2024, 5, 2, 9)),
+    ])
+    db_session.commit()
+
+    response = client.get(
+        f"/api/quiz/results/{topic.id}?by_difficulty=true&by_day=true",
+        headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_questions"] == 3
+    assert data["correct_answers"] == 2
+    assert data["average_response_time"] == pytest.approx(5.0)
+    assert [(b["key"], b["total_questions"], b["correct_answers"]) for b in data["by_difficulty"]] == [
+        ("1", 2, 1), ("4", 1, 1)
+    ]
+    assert [(b["key"], b["average_response_time"]) for b in data["by_day"]] == [
+        ("2024-05-01", 3.0), ("2024-05-02", 9.0)
+    ]
+
+def test_quiz_results_without_answers(client: TestClient, auth_headers, topic):
+    response = client.get(f"/api/quiz/results/{topic.id}", headers=auth_headers)
+
+    assert response.status_code == 404
+
+def test_submit_answer_updates_topic_stats(client: TestClient, db_session: Session, auth_headers, topic):
+    question = build_question(topic.id, make_question(QUESTION_TEXTS[0]))
+    db_session.add(question)
+    db_session.commit()
+
+    for answer, seconds in [("A", 2), ("B", 6), ("A", 3), ("A", 5)]:
+        response = client.post(
+            "/api/quiz/answer",
+            headers=auth_headers,
+            json={"question_id": question.id, "selected_answer": answer, "response_time": seconds}
+        )
+        assert response.status_code == 200
+
+    response = client.get(f"/api/quiz/results/{topic.id}", headers=auth_headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_questions"] == 4
+    assert data["correct_answers"] == 3
+    assert data["average_response_time"] == pytest.approx(4.0)
+    assert data["streak"] == 2
+    assert data["last_seen"] is not None
+
+def test_questions_keyset_pagination(client: TestClient, db_session: Session, topic):
+    created_at = datetime(2024, 5, 1, 9)
+    # Two questions share a timestamp so the id tiebreak is exercised
+    questions = [build_question(topic.id, make_question(text)) for text in QUESTION_TEXTS]
+    for index, question in enumerate(questions):
+        question.created_at = created_at.replace(minute=min(index, 3))
+    db_session.add_all(questions)
+    db_session.commit()
+
+    seen, cursor = [], None
+    for _ in range(3):
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get(f"/api/quiz/questions/{topic.id}", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        seen.extend(q["question_text"] for q in page["items"])
+        cursor = page["next_cursor"]
+
+    assert seen == QUESTION_TEXTS
+    assert cursor is None
+
+def test_questions_pagination_rejects_bad_cursor(client: TestClient, topic):
+    response = client.get(f"/api/quiz/questions/{topic.id}", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
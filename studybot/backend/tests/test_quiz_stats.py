@@ -0,0 +1,75 @@
+from datetime import datetime
+from sqlalchemy.orm import Session
+
+from app.models.quiz import Question, Topic, User, UserResponse, UserTopicStats
+from app.services.quiz_stats import rebuild_user_topic_stats, record_answer
+
+def make_user_and_questions(db_session: Session):
+    user = User(email="stats@example.com", hashed_password="x", full_name="Stats User")
+    topics = [Topic(name=f"Stats Topic {i}", description="", difficulty_level=3) for i in range(2)]
+    db_session.add_all([user, *topics])
+    db_session.flush()
+    questions = [
+        Question(topic_id=topic.id, question_text="Q", options=["A) a", "B) b"], correct_answer="A", difficulty_level=3)
+        for topic in topics
+    ]
+    db_session.add_all(questions)
+    db_session.commit()
+    return user, topics, questions
+
+def snapshot(db_session: Session, user_id: int):
+    db_session.expire_all()
+    rows = db_session.query(UserTopicStats).filter(UserTopicStats.user_id == user_id).order_by(UserTopicStats.topic_id)
+    return [(r.topic_id, r.attempts, r.correct, r.total_response_time, r.streak, r.last_seen) for r in rows]
+
+def test_rebuild_matches_incremental_updates(db_session: Session, run_db):
+    user, topics, questions = make_user_and_questions(db_session)
+    answers = [(0, True, 3), (0, False, 5), (1, True, 2), (0, True, 4), (0, True, 1), (1, False, 7)]
+
+    async def answer_all(db):
+        for index, (slot, is_correct, seconds) in enumerate(answers):
+            answered_at = datetime(2024, 5, 1, 9, index)
+            db.add(UserResponse(
+                user_id=user.id,
+                question_id=questions[slot].id,
+                selected_answer="A" if is_correct else "B",
+                is_correct=is_correct,
+                response_time=seconds,
+                created_at=answered_at
+            ))
+            await record_answer(db, user.id, topics[slot].id, is_correct, seconds, answered_at)
+            await db.flush()
+        await db.commit()
+
+    run_db(answer_all)
+
+    incremental = snapshot(db_session, user.id)
+    assert incremental == [
+        (topics[0].id, 4, 3, 13, 2, datetime(2024, 5, 1, 9, 4)),
+        (topics[1].id, 2, 1, 9, 0, datetime(2024, 5, 1, 9, 5)),
+    ]
+
+    async def rebuild(db):
+        rows = await rebuild_user_topic_stats(db, user_id=user.id)
+        await db.commit()
+        return rows
+
+    db_session.query(UserTopicStats).delete()
+    assert run_db(rebuild) == 2
+    assert snapshot(db_session, user.id) == incremental
+
+def test_rebuild_limited_to_topic(db_session: Session, run_db):
+    user, topics, questions = make_user_and_questions(db_session)
+    for question in questions:
+        db_session.add(UserResponse(user_id=user.id, question_id=question.id, selected_answer="A",
+                                    is_correct=True, response_time=2))
+    db_session.commit()
+
+    async def rebuild(db):
+        rows = await rebuild_user_topic_stats(db, topic_id=topics[1].id)
+        await db.commit()
+        return rows
+
+    assert run_db(rebuild) == 1
+    rows = db_session.query(UserTopicStats).all()
+    assert [(r.topic_id, r.attempts, r.streak) for r in rows] == [(topics[1].id, 1, 1)]
@@ -0,0 +1,117 @@
+import asyncio
+import time
+import httpx
+import pytest
+
+from app.services.llm_client import OpenAIBackend
+from app.services.rate_limiter import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_NORMAL,
+    RateLimiter,
+    estimate_tokens,
+    llm_priority,
+    parse_duration,
+    priority_for
+)
+
+def test_estimate_counts_prompt_and_completion_budget():
+    messages = [{"role": "user", "content": "x" * 400}]
+
+    assert estimate_tokens(messages, 100) == 100 + 4 + 3 + 100
+
+@pytest.mark.parametrize("value, seconds", [("1s", 1), ("6m0s", 360), ("20ms", 0.02), ("1m30.5s", 90.5), ("2", 2), ("", None)])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == seconds
+
+def test_priority_follows_task_unless_overridden():
+    assert priority_for("validate_answer") == PRIORITY_INTERACTIVE
+    assert priority_for("generate_questions") == PRIORITY_NORMAL
+
+    async def background():
+        llm_priority.set(PRIORITY_BACKGROUND)
+        return priority_for("validate_answer")
+
+    assert asyncio.run(background()) == PRIORITY_BACKGROUND
+    assert priority_for("validate_answer") == PRIORITY_INTERACTIVE
+
+def test_requests_wait_for_the_bucket_to_refill():
+    # 6000 RPM with a 10 ms burst: one request now, the next after 10 ms
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=0, burst_seconds=0.01)
+
+    async def main():
+        start = time.monotonic()
+        for _ in range(3):
+            await limiter.acquire(100)
+        return time.monotonic() - start
+
+    assert asyncio.run(main()) >= 0.018
+    assert limiter.stats()["admitted"] == 3
+
+def test_interactive_calls_overtake_queued_background_work():
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=0, burst_seconds=0.01)
+    order = []
+
+    async def call(name, priority):
+        await limiter.acquire(10, priority)
+        order.append(name)
+
+    async def main():
+        await limiter.acquire(10)  # drain the bucket
+        background = [asyncio.create_task(call(f"background {i}", PRIORITY_BACKGROUND)) for i in range(2)]
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(call("interactive", PRIORITY_INTERACTIVE))
+        await asyncio.gather(*background, interactive)
+
+    asyncio.run(main())
+    assert order[0] == "interactive"
+
+def test_background_work_leaves_a_reserve():
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=60000, burst_seconds=1, background_reserve=0.5)
+    limiter.tokens.level = 700
+    # Capacity is 1000 tokens; taking 300 of the 700 left would eat into the 500 reserve
+    assert limiter._admission_delay(300, PRIORITY_BACKGROUND, time.monotonic()) > 0
+    assert limiter._admission_delay(300, PRIORITY_INTERACTIVE, time.monotonic()) == 0
+
+def test_headers_lower_the_budgets_and_429_pauses():
+    limiter = RateLimiter(requests_per_minute=500, tokens_per_minute=40000)
+
+    limiter.observe(200, {
+        "x-ratelimit-limit-requests": "200",
+        "x-ratelimit-limit-tokens": "90000",
+        "x-ratelimit-remaining-tokens": "150",
+    })
+    stats = limiter.stats()
+    assert stats["requests_per_minute"] == 200
+    assert stats["tokens_per_minute"] == 40000  # never above the configured budget
+    assert stats["tokens_available"] <= 151
+
+    limiter.observe(429, {"x-ratelimit-reset-tokens": "2s"})
+    stats = limiter.stats()
+    assert stats["throttled"] == 1
+    assert 1900 < stats["paused_for_ms"] <= 2000
+
+def test_backend_feeds_response_headers_to_the_limiter(fake_openai):
+    limiter = RateLimiter(requests_per_minute=500, tokens_per_minute=40000)
+    backend = OpenAIBackend(
+        api_key="test-key",
+        transport=httpx.MockTransport(fake_openai.handle),
+        backoff_base=0,
+        rate_limiter=limiter
+    )
+    fake_openai.replies = [
+        httpx.Response(429, json={"error": {"message": "Rate limited"}}, headers={"retry-after": "0.05"}),
+        "true",
+    ]
+
+    async def main():
+        try:
+            return await backend.chat([{"role": "user", "content": "Hi"}], "gpt-4", 0.3, 10, task="validate_answer")
+        finally:
+            await backend.aclose()
+
+    start = time.monotonic()
+    assert asyncio.run(main()) == "true"
+    assert time.monotonic() - start >= 0.05
+    assert limiter.stats()["throttled"] == 1
+    assert limiter.stats()["admitted"] == 2
@@ -0,0 +1,115 @@
+import asyncio
+import pytest
+
+from app.core.config import settings
+from app.services import llm_service
+from app.services.llm_backend import StubLLMBackend
+from app.services.single_flight import SingleFlight
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    runs = []
+
+    async def work(value):
+        runs.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    async def main():
+        return await asyncio.gather(
+            flights.call("a", lambda: work(1)),
+            flights.call("a", lambda: work(2)),
+            flights.call("b", lambda: work(3)),
+        )
+
+    assert asyncio.run(main()) == [1, 1, 3]
+    assert runs == [1, 3]
+    assert flights.stats() == {"flights": 2, "shared": 1, "in_flight": 0}
+
+def test_errors_reach_every_caller():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(
+            flights.call("a", fail),
+            flights.call("a", fail),
+            return_exceptions=True
+        )
+
+    assert [str(error) for error in asyncio.run(main())] == ["boom", "boom"]
+
+def test_late_stream_subscribers_replay_earlier_items():
+    flights = SingleFlight()
+    produced = []
+
+    async def numbers():
+        for number in range(3):
+            produced.append(number)
+            yield number
+            await asyncio.sleep(0.01)
+
+    async def collect(delay):
+        await asyncio.sleep(delay)
+        return [number async for number in flights.stream("n", numbers)]
+
+    async def main():
+        return await asyncio.gather(collect(0), collect(0.015))
+
+    assert asyncio.run(main()) == [[0, 1, 2], [0, 1, 2]]
+    assert produced == [0, 1, 2]
+
+def test_identical_validations_share_a_completion():
+    backend = StubLLMBackend(latency_ms=10)
+
+    async def main():
+        return await asyncio.gather(*(
+            llm_service.validate_answer(backend, "Coalesced?", "B", "b") for _ in range(5)
+        ))
+
+    assert asyncio.run(main()) == [True] * 5
+    assert backend.calls == 1
+
+def test_identical_generations_fan_out_copies():
+    backend = StubLLMBackend(latency_ms=10)
+
+    async def main():
+        return await asyncio.gather(*(
+            llm_service.generate_question(backend, "RAG Systems", 3) for _ in range(3)
+        ))
+
+    first, second, third = asyncio.run(main())
+    assert first == second == third
+    assert first is not second
+    assert backend.calls == 1
+
+def test_one_session_never_shares_its_own_batches(monkeypatch):
+    monkeypatch.setattr(settings, "QUESTION_BATCH_SIZE", 2)
+    backend = StubLLMBackend(latency_ms=10)
+
+    async def main():
+        return await asyncio.gather(
+            llm_service.generate_questions(backend, "RAG Systems", 3, 4),
+            llm_service.generate_questions(backend, "RAG Systems", 3, 4),
+        )
+
+    first, second = asyncio.run(main())
+    assert len({q.question_text for q in first}) == 4
+    assert first == second
+    assert backend.calls == 2
+
+@pytest.mark.parametrize("enabled, calls", [(True, 1), (False, 3)])
+def test_coalescing_can_be_disabled(monkeypatch, enabled, calls):
+    monkeypatch.setattr(settings, "LLM_COALESCING_ENABLED", enabled)
+    backend = StubLLMBackend(latency_ms=10)
+
+    async def main():
+        await asyncio.gather(*(
+            llm_service.generate_explanation(backend, f"Why chunk ({enabled})?", "Recall") for _ in range(3)
+        ))
+
+    asyncio.run(main())
+    assert backend.calls == calls
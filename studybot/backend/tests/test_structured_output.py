@@ -0,0 +1,77 @@
+import asyncio
+import json
+import pytest
+
+from app.services import llm_service
+from app.services.structured_output import (
+    JSONObjectStream,
+    StructuredOutputError,
+    parse_question,
+    repair_json
+)
+from conftest import sse_response
+
+QUESTION = {
+    "question_text": "What does RAG add to an LLM?",
+    "options": ["A) Retrieval", "B) Fine-tuning", "C) Quantization", "D) Distillation"],
+    "correct_answer": "A",
+    "explanation": "RAG retrieves documents before generating.",
+    "difficulty_level": 3
+}
+
+def test_parse_question_accepts_clean_json():
+    question = parse_question(json.dumps(QUESTION))
+
+    assert question.question_text == QUESTION["question_text"]
+    assert question.correct_answer == "A"
+
+def test_parse_question_repairs_common_mistakes():
+    text = "Here you go:\n```json\n" + json.dumps(QUESTION)[:-1] + ",}\n```"
+    text = text.replace('"question_text"', '"question"')
+
+    assert parse_question(text).question_text == QUESTION["question_text"]
+
+def test_repair_json_strips_fences_and_trailing_commas():
+    assert json.loads(repair_json('```json\n{"a": [1, 2,],}\n```')) == {"a": [1, 2]}
+
+@pytest.mark.parametrize("text", [
+    "not json at all",
+    json.dumps({**QUESTION, "options": ["Only one"]}),
+    json.dumps([QUESTION]),
+    "__import__('os').system('echo unsafe')",
+])
+def test_parse_question_rejects_invalid_output(text):
+    with pytest.raises(StructuredOutputError) as exc_info:
+        parse_question(text)
+
+    assert "Invalid response format" in str(exc_info.value)
+
+def test_stream_emits_objects_as_they_close():
+    stream = JSONObjectStream()
+    text = json.dumps({"questions": [QUESTION, {**QUESTION, "question_text": 'Escaped "}" brace'}]})
+
+    emitted = []
+    for start in range(0, len(text), 7):
+        emitted.extend(stream.feed(text[start:start + 7]))
+
+    assert [json.loads(item)["question_text"] for item in emitted] == [
+        QUESTION["question_text"],
+        'Escaped "}" brace'
+    ]
+
+def test_stream_gives_up_on_output_without_json():
+    stream = JSONObjectStream()
+
+    with pytest.raises(StructuredOutputError):
+        stream.feed("I'm sorry, " * 30)
+
+def test_generate_question_parses_streamed_json(fake_openai, openai_backend):
+    content = json.dumps(QUESTION)
+    fake_openai.replies = [sse_response(content, chunk_size=10)]
+
+    question = asyncio.run(llm_service.generate_question(openai_backend, "RAG Systems", 4))
+
+    assert question.question_text == QUESTION["question_text"]
+    assert question.difficulty_level == 4
+    assert fake_openai.requests[0]["stream"] is True
+    assert fake_openai.requests[0]["response_format"] == {"type": "json_object"}
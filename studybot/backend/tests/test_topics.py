@@ -0,0 +1,64 @@
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.quiz import Topic
+from app.services.topic_catalog import topic_catalog
+
+def test_topics_keyset_pagination(client: TestClient, db_session: Session):
+    db_session.add_all([
+        Topic(name=f"Topic {index}", description="", difficulty_level=3, created_at=datetime(2024, 5, 1, 9, index))
+        for index in range(5)
+    ])
+    db_session.commit()
+
+    first = client.get("/api/topics/", params={"limit": 3}).json()
+    second = client.get("/api/topics/", params={"limit": 3, "cursor": first["next_cursor"]}).json()
+
+    assert [t["name"] for t in first["items"]] == ["Topic 0", "Topic 1", "Topic 2"]
+    assert [t["name"] for t in second["items"]] == ["Topic 3", "Topic 4"]
+    assert second["next_cursor"] is None
+
+def test_topic_reads_are_served_from_the_catalog(client: TestClient, topic):
+    client.get("/api/topics/")
+    loads = topic_catalog.loads
+
+    assert client.get(f"/api/topics/{topic.id}").json()["name"] == topic.name
+    assert client.get("/api/quiz/topics").json()[0]["name"] == topic.name
+    assert topic_catalog.loads == loads
+
+def test_topic_reads_honour_if_none_match(client: TestClient, topic):
+    for url in ["/api/topics/", f"/api/topics/{topic.id}", "/api/quiz/topics"]:
+        response = client.get(url)
+        etag = response.headers["etag"]
+        assert "max-age" in response.headers["cache-control"]
+
+        not_modified = client.get(url, headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304
+        assert not_modified.headers["etag"] == etag
+        assert not_modified.content == b""
+
+        assert client.get(url, headers={"If-None-Match": 'W/"stale"'}).status_code == 200
+
+def test_topic_writes_invalidate_the_catalog(client: TestClient, auth_headers, topic):
+    etag = client.get("/api/quiz/topics").headers["etag"]
+
+    client.put(
+        f"/api/topics/{topic.id}",
+        json={"name": "Vector Embeddings", "description": "Vectors", "difficulty_level": 2},
+        headers=auth_headers
+    )
+    response = client.get("/api/quiz/topics", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()[0]["name"] == "Vector Embeddings"
+
+    client.post(
+        "/api/topics/",
+        json={"name": "Chunking", "description": "Splitting", "difficulty_level": 1},
+        headers=auth_headers
+    )
+    assert [t["name"] for t in client.get("/api/topics/").json()["items"]] == ["Vector Embeddings", "Chunking"]
+
+    client.delete(f"/api/topics/{topic.id}", headers=auth_headers)
+    assert client.get(f"/api/topics/{topic.id}").status_code == 404
@@ -0,0 +1,32 @@
+import asyncio
+import logging
+import signal
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, async_engine
+from app.core.migrations import check_schema_version
+from app.services.generation_jobs import GenerationJobWorker
+from app.services.llm_backend import create_llm_backend
+
+async def main() -> None:
+    """Run queued question generation jobs until interrupted."""
+    if settings.DB_SCHEMA_CHECK:
+        await check_schema_version(async_engine)
+    
+    backend = create_llm_backend()
+    worker = GenerationJobWorker(AsyncSessionLocal, backend, settings.GENERATION_JOB_WORKERS)
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    
+    worker.start()
+    await stopping.wait()
+    
+    await worker.stop()
+    await backend.aclose()
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -13,6 +13,17 @@ interface Question {
   difficulty_level: number;
 }
 
+type SessionEvent =
+  | { type: 'question'; question: Question }
+  | { type: 'done'; count: number }
+  | { type: 'error'; detail: string };
+
+interface AnswerSubmission {
+  question_id: number;
+  selected_answer: string;
+  response_time: number;
+}
+
 interface QuizResult {
   total_questions: number;
   correct_answers: number;
@@ -21,6 +32,8 @@ interface QuizResult {
   completed_at: string;
 }
 
+const NUMBER_OF_QUESTIONS = 10;
+
 const Quiz: React.FC = () => {
   const { topicId } = useParams<{ topicId: string }>();
   const navigate = useNavigate();
@@ -29,28 +42,77 @@ const Quiz: React.FC = () => {
   const [startTime, setStartTime] = useState<number | null>(null);
   const [showExplanation, setShowExplanation] = useState(false);
   const [selectedAnswer, setSelectedAnswer] = useState<string | null>(null);
+  const [answers, setAnswers] = useState<AnswerSubmission[]>([]);
+  const [questions, setQuestions] = useState<Question[]>([]);
+  const [isStreaming, setIsStreaming] = useState(true);
+  const [streamError, setStreamError] = useState<string | null>(null);
 
-  // Fetch questions for the topic
-  const { data: questions, isLoading: isLoadingQuestions } = useQuery<Question[]>({
-    queryKey: ['questions', topicId],
-    queryFn: async () => {
-      const response = await axios.post(`http://localhost:8000/api/quiz/session`, {
-        topic_id: parseInt(topicId || '0'),
-        number_of_questions: 10
-      });
-      return response.data;
-    },
-    enabled: !!topicId
-  });
+  // Stream questions for the topic so the first one renders while the rest are generated
+  useEffect(() => {
+    if (!topicId) return;
+    const controller = new AbortController();
+
+    const streamQuestions = async () => {
+      setQuestions([]);
+      setIsStreaming(true);
+      setStreamError(null);
+      try {
+        const token = localStorage.getItem('token');
+        const response = await fetch('http://localhost:8000/api/quiz/session/stream', {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+            ...(token ? { Authorization: `Bearer ${token}` } : {})
+          },
+          body: JSON.stringify({
+            topic_id: parseInt(topicId),
+            number_of_questions: NUMBER_OF_QUESTIONS
+          }),
+          signal: controller.signal
+        });
+        if (!response.ok || !response.body) {
+          setStreamError('Failed to load questions');
+          return;
+        }
 
-  // Submit answer mutation
-  const submitAnswerMutation = useMutation({
-    mutationFn: async (answer: { question_id: number; selected_answer: string; response_time: number }) => {
-      const response = await axios.post('http://localhost:8000/api/quiz/answer', answer);
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+          const { done, value } = await reader.read();
+          if (done) break;
+          buffer += decoder.decode(value, { stream: true });
+          const lines = buffer.split('\n');
+          buffer = lines.pop() || '';
+          for (const line of lines) {
+            if (!line.trim()) continue;
+            const event: SessionEvent = JSON.parse(line);
+            if (event.type === 'question') {
+              setQuestions(prev => [...prev, event.question]);
+            } else if (event.type === 'error') {
+              setStreamError(event.detail);
+            }
+          }
+        }
+      } catch (error) {
+        if (!controller.signal.aborted) {
+          console.error('Failed to load questions', error);
+          setStreamError('Failed to load the remaining questions');
+        }
+      } finally {
+        if (!controller.signal.aborted) setIsStreaming(false);
+      }
+    };
+
+    streamQuestions();
+    return () => controller.abort();
+  }, [topicId]);
+
+  // Submit all answers for the session in one request
+  const submitAnswersMutation = useMutation({
+    mutationFn: async (batch: AnswerSubmission[]) => {
+      const response = await axios.post('http://localhost:8000/api/quiz/answers:batch', { answers: batch });
       return response.data;
-    },
-    onSuccess: () => {
-      setShowExplanation(true);
     }
   });
 
@@ -61,40 +123,63 @@ const Quiz: React.FC = () => {
       const response = await axios.get(`http://localhost:8000/api/quiz/results/${topicId}`);
       return response.data;
     },
-    enabled: !!topicId && showExplanation
+    enabled: !!topicId && submitAnswersMutation.isSuccess
   });
 
+  const isCurrentQuestionReady = currentQuestionIndex < questions.length;
+  const hasNextQuestion = currentQuestionIndex < questions.length - 1 || (isStreaming && !streamError);
+
   useEffect(() => {
-    if (questions && currentQuestionIndex < questions.length) {
+    if (isCurrentQuestionReady) {
+      // A question returned to after the stream ended keeps its answer
+      const previous = answers.find(answer => answer.question_id === questions[currentQuestionIndex].id);
       setStartTime(Date.now());
-      setShowExplanation(false);
-      setSelectedAnswer(null);
+      setShowExplanation(!!previous);
+      setSelectedAnswer(previous ? previous.selected_answer : null);
+    }
+  }, [currentQuestionIndex, isCurrentQuestionReady]);
+
+  // The stream may end with fewer questions than requested; stop at the last one that arrived
+  useEffect(() => {
+    if (isStreaming || questions.length === 0 || currentQuestionIndex < questions.length) return;
+    setCurrentQuestionIndex(questions.length - 1);
+  }, [isStreaming, questions.length, currentQuestionIndex]);
+
+  // After a stream error, submit what was answered once no arrived question is left open
+  useEffect(() => {
+    if (!streamError || isStreaming || answers.length === 0 || answers.length < questions.length) return;
+    if (submitAnswersMutation.isIdle) {
+      submitAnswersMutation.mutate(answers);
     }
-  }, [currentQuestionIndex, questions]);
+  }, [streamError, isStreaming, answers, questions.length]);
 
-  const handleAnswerSelect = async (answer: string) => {
-    if (!questions || !startTime) return;
+  const handleAnswerSelect = (answer: string) => {
+    if (!isCurrentQuestionReady || !startTime) return;
 
     const responseTime = Math.floor((Date.now() - startTime) / 1000);
     setSelectedAnswer(answer);
-
-    await submitAnswerMutation.mutateAsync({
-      question_id: questions[currentQuestionIndex].id,
-      selected_answer: answer,
-      response_time: responseTime
-    });
+    setShowExplanation(true);
+    setAnswers(prev => [
+      ...prev,
+      {
+        question_id: questions[currentQuestionIndex].id,
+        selected_answer: answer,
+        response_time: responseTime
+      }
+    ]);
   };
 
-  const handleNextQuestion = () => {
-    if (!questions) return;
-    if (currentQuestionIndex < questions.length - 1) {
+  const handleNextQuestion = async () => {
+    if (hasNextQuestion) {
       setCurrentQuestionIndex(prev => prev + 1);
-    } else {
+    } else if (submitAnswersMutation.isSuccess) {
       navigate('/topics');
+    } else {
+      await submitAnswersMutation.mutateAsync(answers);
     }
   };
 
-  if (isLoadingQuestions) {
+  if (isStreaming && !isCurrentQuestionReady) {
     return (
       <div className="flex justify-center items-center h-64">
         <div className="animate-spin rounded-full h-12 w-12 border-b-2 border-indigo-600"></div>
@@ -102,24 +187,31 @@ const Quiz: React.FC = () => {
     );
   }
 
-  if (!questions || questions.length === 0) {
+  if (questions.length === 0) {
     return (
       <div className="text-center">
         <h2 className="text-2xl font-bold text-gray-900">No questions available</h2>
-        <p className="mt-2 text-gray-600">Please try another topic.</p>
+        <p className="mt-2 text-gray-600">{streamError || 'Please try another topic.'}</p>
       </div>
     );
   }
 
-  const currentQuestion = questions[currentQuestionIndex];
+  // Until the effect above clamps the index, render the last question that arrived
+  const currentQuestion = questions[Math.min(currentQuestionIndex, questions.length - 1)];
 
   return (
     <div className="max-w-3xl mx-auto">
       <div className="bg-white shadow rounded-lg p-6">
+        {streamError && (
+          <div className="mb-4 p-4 bg-red-50 rounded-lg text-red-700">
+            {streamError}. Your answers so far will still be submitted.
+          </div>
+        )}
+
         <div className="mb-4">
           <div className="flex justify-between items-center">
             <span className="text-sm text-gray-500">
-              Question {currentQuestionIndex + 1} of {questions.length}
+              Question {Math.min(currentQuestionIndex, questions.length - 1) + 1} of {isStreaming && !streamError ? NUMBER_OF_QUESTIONS : questions.length}
             </span>
             <span className="text-sm text-gray-500">
               Difficulty: {currentQuestion.difficulty_level}/5
@@ -161,9 +253,14 @@ const Quiz: React.FC = () => {
           <div className="mt-6 flex justify-end">
             <button
               onClick={handleNextQuestion}
+              disabled={submitAnswersMutation.isLoading}
               className="px-4 py-2 bg-indigo-600 text-white rounded-md hover:bg-indigo-700"
             >
-              {currentQuestionIndex < questions.length - 1 ? 'Next Question' : 'Finish Quiz'}
+              {hasNextQuestion
+                ? 'Next Question'
+                : submitAnswersMutation.isSuccess
+                  ? 'Back to Topics'
+                  : 'Finish Quiz'}
             </button>
           </div>
         )}
@@ -10,12 +10,17 @@ interface Topic {
   difficulty_level: number;
 }
 
+interface Page<T> {
+  items: T[];
+  next_cursor: string | null;
+}
+
 const Topics: React.FC = () => {
   const { data: topics, isLoading, error } = useQuery<Topic[]>({
     queryKey: ['topics'],
     queryFn: async () => {
-      const response = await axios.get('http://localhost:8000/api/topics');
-      return response.data;
+      const response = await axios.get<Page<Topic>>('http://localhost:8000/api/topics');
+      return response.data.items;
     }
   });
 